@@ -13,25 +13,10 @@ import time
 import json
 import logging
 from datetime import datetime
-import win32gui
-import win32process
-import psutil
 
-# Windows控制台编码修复
-if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
+from desktop_snapshot import get_desktop_snapshot
+from logging_setup import load_logging_settings, setup_logging
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('auto_report.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class AutoReportSystem:
@@ -93,19 +78,14 @@ class AutoReportSystem:
             logger.info("查找微信主进程...")
             
             main_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'exe', 'memory_info']):
-                try:
-                    if proc.info['name'].lower() in ['weixin.exe', 'wechat.exe']:
-                        exe_path = str(proc.info.get('exe', '')).lower()
-                        # 排除小程序进程
-                        if 'wechatappex' not in exe_path:
-                            main_processes.append({
-                                'pid': proc.info['pid'],
-                                'name': proc.info['name'],
-                                'memory_mb': round(proc.info['memory_info'].rss / 1024 / 1024, 1)
-                            })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            for proc in get_desktop_snapshot().find_processes(['weixin.exe', 'wechat.exe'], exact=True):
+                # 排除小程序进程
+                if 'wechatappex' not in proc.exe.lower():
+                    main_processes.append({
+                        'pid': proc.pid,
+                        'name': proc.name,
+                        'memory_mb': round(proc.memory_mb, 1)
+                    })
             
             if not main_processes:
                 logger.error("未找到微信主进程")
@@ -133,23 +113,10 @@ class AutoReportSystem:
         try:
             logger.info(f"查找PID {pid} 的微信窗口...")
             
-            windows = []
-            def enum_windows_callback(hwnd, param):
-                if win32gui.IsWindowVisible(hwnd):
-                    try:
-                        _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                        if window_pid == pid:
-                            title = win32gui.GetWindowText(hwnd)
-                            class_name = win32gui.GetClassName(hwnd)
-                            windows.append({
-                                'hwnd': hwnd,
-                                'title': title,
-                                'class': class_name
-                            })
-                    except:
-                        pass
-            
-            win32gui.EnumWindows(enum_windows_callback, None)
+            windows = [
+                {'hwnd': w.hwnd, 'title': w.title, 'class': w.class_name}
+                for w in get_desktop_snapshot().windows_for_pid(pid, visible_only=True)
+            ]
             
             # 过滤出可能的群聊窗口（排除主窗口"微信"）
             chat_windows = [w for w in windows if w['title'] and w['title'] != '微信']
@@ -392,6 +359,15 @@ def main():
     """主程序入口"""
     import sys
     
+    # Windows控制台编码修复
+    if sys.platform == 'win32':
+        import codecs
+        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
+        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
+    
+    # 配置日志
+    setup_logging('auto_report.log', load_logging_settings("auto_report_config.json"))
+    
     system = AutoReportSystem()
     
     if len(sys.argv) < 2:
@@ -12,42 +12,65 @@ import os
 import time
 import json
 import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
 # 导入新的发送器接口
 from message_sender_interface import MessageSenderInterface, MessageSenderFactory
-from wechat_sender_v3 import WeChatSenderV3
-from wxwork_adapter import WXWorkSenderAdapter
+from cli_profiler import add_profile_arguments, run_profiled
+from logging_setup import load_logging_settings, setup_logging
+from delivery_queue import DeliveryItem, DeliveryQueue, DeliveryState, content_hash, default_owner
+from delivery_router import Destination, build_destinations
+from send_ledger import SendLedger
+from sender_pool import SenderPool
+from rate_limiter import RateLimiter
+from sender_health import SenderHealthTracker
+from standby_keeper import StandbyKeeper
+import wxbot_metrics
 
-# 注册发送器到工厂
-MessageSenderFactory.register_sender("wechat", WeChatSenderV3)
-MessageSenderFactory.register_sender("wxwork", WXWorkSenderAdapter)
+# 注册发送器到工厂（按需导入，config/status 等命令不会加载 pyautogui/win32/psutil）
+MessageSenderFactory.register_lazy_sender("wechat", "wechat_sender_v3:WeChatSenderV3")
+MessageSenderFactory.register_lazy_sender("wxwork", "wxwork_adapter:WXWorkSenderAdapter")
+MessageSenderFactory.register_lazy_sender("fake", "fake_desktop:FakeDesktopSender")
 
-# Windows控制台编码修复
-if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('auto_report.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+
+def setup_console_and_logging():
+    """修复 Windows 控制台编码并配置日志（仅在命令行入口调用，导入模块时无副作用）"""
+    # Windows控制台编码修复
+    if sys.platform == 'win32':
+        import codecs
+        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
+        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
+
+    # 配置日志（队列异步写入，JSON 结构化滚动文件）
+    setup_logging('auto_report.log', load_logging_settings("auto_report_config.json"))
+
 class AutoReportSystemV2:
-    def __init__(self):
-        """初始化自动化系统 v2.0"""
+    def __init__(self, force_resend: bool = False):
+        """
+        初始化自动化系统 v2.0
+
+        Args:
+            force_resend: 忽略发送账本，强制重新发送未变化的报告
+        """
         self.config_file = "auto_report_config.json"
         self.config = self.load_config()
         self.available_senders = {}
+        # 多账号发送器池：账号发送器 "<发送器>@<账号>" 的运行时配置（不写回配置文件）
+        self.sender_pool: Optional[SenderPool] = None
+        self.pool_configs: Dict[str, Dict[str, Any]] = {}
         self.active_sender = None
+        self.delivery_queue = None
+        self.send_ledger = None
+        self.force_resend = force_resend
+        self.rate_limiter = RateLimiter(self.config.get("rate_limits"))
+        routing_config = self.config.get("adaptive_routing", {})
+        self.sender_health = SenderHealthTracker(routing_config) if routing_config.get("enabled", True) else None
         
     def load_config(self) -> Dict[str, Any]:
         """加载配置文件 - 支持新旧格式"""
@@ -57,6 +80,11 @@ class AutoReportSystemV2:
             "default_sender": "wechat",
             "sender_priority": ["wechat", "wxwork"],
             "fallback_enabled": True,
+            "group_aliases": [],
+            "standby": {
+                "enabled": True,
+                "refresh_seconds": 30
+            },
             "senders": {
                 "wechat": {
                     "type": "wechat",
@@ -87,10 +115,85 @@ class AutoReportSystemV2:
                     ]
                 }
             },
+            "sender_pool": {
+                "enabled": False,
+                "accounts": []
+            },
             "message_settings": {
                 "add_timestamp": True,
                 "add_sender_info": True,
                 "format_style": "emoji"
+            },
+            "metrics": {
+                "enabled": True,
+                "textfile": "metrics/wxbot.prom",
+                "http_port": None
+            },
+            "delivery_queue": {
+                "db_path": "delivery_queue.db",
+                "lease_seconds": 600,
+                "max_attempts": 3,
+                "retry_backoff_seconds": 60,
+                "purge_after_days": 30
+            },
+            "send_ledger": {
+                "enabled": True,
+                "db_path": "send_ledger.db",
+                "dedupe_window_hours": 24,
+                "purge_after_days": 90
+            },
+            "service": {
+                "host": "127.0.0.1",
+                "port": 8765,
+                "db_path": "service_queue.db",
+                "warm_senders": None,
+                "poll_interval": 1.0,
+                "token": None
+            },
+            "coordinator": {
+                "host": "127.0.0.1",
+                "port": 8770,
+                "db_path": "coordinator_queue.db",
+                "token": None,
+                "lease_seconds": 120,
+                "heartbeat_seconds": 5,
+                "worker_timeout": 20,
+                "prefetch": 2,
+                "work_stealing": True,
+                "long_poll_seconds": 5
+            },
+            "webhook": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 8766,
+                "coalesce_seconds": 5.0,
+                "max_batch_messages": 20,
+                "max_batch_chars": 3000,
+                "separator": "\n\n",
+                "keys": {}
+            },
+            "adaptive_routing": {
+                "enabled": True,
+                "state_file": "sender_health.json",
+                "window": 50,
+                "max_age_days": 14,
+                "failure_cooldown": 3,
+                "cooldown_minutes": 30,
+                "exploration_rate": 0.1,
+                "latency_reference_seconds": 30
+            },
+            "rate_limits": {
+                "global": {"per_minute": 20, "burst": 5},
+                "per_sender": {"default": {"per_minute": 12, "burst": 3}},
+                "per_group": {"default": {"per_minute": 4, "burst": 1}}
+            },
+            "logging": {
+                "level": "INFO",
+                "json": True,
+                "max_bytes": 10 * 1024 * 1024,
+                "backup_count": 5,
+                "rotate_when": None,
+                "module_levels": {}
             }
         }
         
@@ -170,33 +273,56 @@ class AutoReportSystemV2:
         except Exception as e:
             logger.error(f"保存配置文件失败: {e}")
     
+    def _initialize_sender(self, sender_type: str, sender_config: Dict[str, Any]) -> Optional[MessageSenderInterface]:
+        """创建并初始化单个发送器（在线程池中执行）"""
+        try:
+            # 创建发送器实例
+            sender = MessageSenderFactory.create_sender(sender_type, sender_config)
+            if not sender:
+                logger.error(f"❌ 无法创建发送器: {sender_type}")
+                return None
+            
+            # 尝试初始化（只做进程/窗口发现，多个发送器共享同一份桌面快照）
+            started = time.perf_counter()
+            if sender.initialize():
+                logger.info(f"✅ 发送器 {sender_type} 初始化成功 ({time.perf_counter() - started:.2f}s)")
+                return sender
+            logger.warning(f"⚠️ 发送器 {sender_type} 初始化失败")
+            return None
+            
+        except Exception as e:
+            logger.error(f"初始化发送器 {sender_type} 时出错: {e}")
+            return None
+    
     def initialize_senders(self) -> bool:
-        """初始化所有可用的发送器"""
+        """并行初始化所有可用的发送器"""
         try:
             logger.info("🔧 初始化发送器...")
             
             self.available_senders = {}
+            self.sender_pool = None
+            self.pool_configs = {}
             
+            enabled = []
             for sender_type, sender_config in self.config["senders"].items():
                 if not sender_config.get("enabled", True):
                     logger.info(f"跳过禁用的发送器: {sender_type}")
                     continue
-                
-                try:
-                    # 创建发送器实例
-                    sender = MessageSenderFactory.create_sender(sender_type, sender_config)
-                    if sender:
-                        # 尝试初始化
-                        if sender.initialize():
+                enabled.append((sender_type, sender_config))
+            
+            if enabled:
+                with ThreadPoolExecutor(max_workers=len(enabled), thread_name_prefix="sender-init") as pool:
+                    futures = [(sender_type, pool.submit(self._initialize_sender, sender_type, sender_config))
+                               for sender_type, sender_config in enabled]
+                    # 按配置顺序收集，保持 available_senders 的顺序稳定
+                    for sender_type, future in futures:
+                        sender = future.result()
+                        if sender:
                             self.available_senders[sender_type] = sender
-                            logger.info(f"✅ 发送器 {sender_type} 初始化成功")
-                        else:
-                            logger.warning(f"⚠️ 发送器 {sender_type} 初始化失败")
-                    else:
-                        logger.error(f"❌ 无法创建发送器: {sender_type}")
-                        
-                except Exception as e:
-                    logger.error(f"初始化发送器 {sender_type} 时出错: {e}")
+            
+            pool_settings = self.config.get("sender_pool", {})
+            if pool_settings.get("enabled") and pool_settings.get("accounts"):
+                self._initialize_sender_pool(pool_settings)
             
             if not self.available_senders:
                 logger.error("❌ 没有可用的发送器")
@@ -209,27 +335,65 @@ class AutoReportSystemV2:
             logger.error(f"初始化发送器失败: {e}")
             return False
     
+    def _initialize_sender_pool(self, settings: Dict[str, Any]):
+        """发现同一台机器上的多个已登录实例，为每个账号创建绑定到其实例的发送器"""
+        self.sender_pool = SenderPool.from_config(settings, self.config["senders"])
+        self.sender_pool.discover()
+        created = self.sender_pool.create_senders(self.config["senders"], MessageSenderFactory.create_sender)
+        for sender_key, (sender, sender_config) in created.items():
+            if sender.initialize():
+                self.available_senders[sender_key] = sender
+                self.pool_configs[sender_key] = sender_config
+                logger.info(f"✅ 账号发送器 {sender_key} 初始化成功")
+            else:
+                logger.warning(f"⚠️ 账号发送器 {sender_key} 初始化失败")
+    
+    def _senders_config(self) -> Dict[str, Dict[str, Any]]:
+        """
+        配置中的发送器加上账号发送器；账号负责的群聊从其基础发送器中移除，避免从错误的账号发出。
+        未匹配到实例或初始化失败的账号同样列出（不在可用发送器中），其群聊由 _unrouted_destinations 记为未送达
+        """
+        if self.sender_pool is None:
+            return self.config["senders"]
+        senders = {}
+        for sender_type, sender_config in self.config["senders"].items():
+            routed = set(self.sender_pool.routed_groups(sender_type))
+            if routed:
+                sender_config = dict(sender_config, target_groups=[
+                    group for group in sender_config.get("target_groups", []) if group["name"] not in routed])
+            senders[sender_type] = sender_config
+        for account in self.sender_pool.accounts:
+            senders[account.key] = self.pool_configs.get(account.key) or \
+                self.sender_pool.sender_config(account, self.config["senders"])
+        return senders
+    
+    def _priority_order(self) -> List[str]:
+        """sender_priority，启用发送器池时在每个发送器之前插入其账号发送器"""
+        order = self.config.get("sender_priority", ["wechat", "wxwork"])
+        return self.sender_pool.expand_order(order) if self.sender_pool else list(order)
+    
+    def rank_senders(self, static_order: List[str]) -> List[str]:
+        """按健康分数调整发送器顺序（未启用自适应路由时保持静态顺序），只返回已初始化的发送器"""
+        candidates = [t for t in dict.fromkeys(static_order) if t in self.available_senders]
+        if self.sender_health is None or len(candidates) < 2:
+            return candidates
+        ranked = self.sender_health.rank(candidates)
+        for sender_type in candidates:
+            wxbot_metrics.SENDER_HEALTH_SCORE.set(self.sender_health.stats(sender_type).score, sender=sender_type)
+        if ranked != candidates:
+            logger.info(f"🧭 自适应发送器顺序: {ranked}（静态顺序: {candidates}）")
+        return ranked
+    
     def select_best_sender(self) -> Optional[MessageSenderInterface]:
-        """根据配置和优先级选择最佳发送器"""
+        """根据配置、优先级和健康分数选择最佳发送器"""
         try:
-            # 首先尝试默认发送器
+            # 默认发送器优先，其次按优先级顺序；启用自适应路由时按健康分数重新排序
             default_sender = self.config.get("default_sender", "wechat")
-            if default_sender in self.available_senders:
-                logger.info(f"✅ 使用默认发送器: {default_sender}")
-                return self.available_senders[default_sender]
-            
-            # 按优先级顺序尝试
-            priority_list = self.config.get("sender_priority", ["wechat", "wxwork"])
-            for sender_type in priority_list:
-                if sender_type in self.available_senders:
-                    logger.info(f"✅ 使用优先级发送器: {sender_type}")
-                    return self.available_senders[sender_type]
-            
-            # 如果都不可用，使用第一个可用的
-            if self.available_senders:
-                sender_type = list(self.available_senders.keys())[0]
-                logger.info(f"✅ 使用第一个可用发送器: {sender_type}")
-                return self.available_senders[sender_type]
+            priority_list = self._priority_order()
+            ranked = self.rank_senders([default_sender] + priority_list + list(self.available_senders))
+            if ranked:
+                logger.info(f"✅ 使用发送器: {ranked[0]}")
+                return self.available_senders[ranked[0]]
             
             logger.error("❌ 没有可用的发送器")
             return None
@@ -267,8 +431,133 @@ class AutoReportSystemV2:
             logger.error(f"执行存储统计失败: {e}")
             return False
     
+    def open_delivery_queue(self) -> DeliveryQueue:
+        """打开持久化发送队列，并恢复上次运行中断时未确认的条目"""
+        if self.delivery_queue is None:
+            queue_config = self.config.get("delivery_queue", {})
+            self.delivery_queue = DeliveryQueue.from_config(queue_config)
+            self.delivery_queue.recover()
+            self.delivery_queue.purge(float(queue_config.get("purge_after_days", 30)))
+        return self.delivery_queue
+    
+    def open_send_ledger(self) -> Optional[SendLedger]:
+        """打开发送账本（配置禁用时返回 None）"""
+        ledger_config = self.config.get("send_ledger", {})
+        if not ledger_config.get("enabled", True):
+            return None
+        if self.send_ledger is None:
+            self.send_ledger = SendLedger.from_config(ledger_config)
+        return self.send_ledger
+    
+    def purge_send_ledger(self) -> int:
+        """
+        删除超过 purge_after_days 的账本记录（每批次开始时调用）。保留期不短于去重窗口；
+        去重不限时间（dedupe_window_hours 为 0）时记录需要一直保留，不清理
+        """
+        ledger = self.open_send_ledger()
+        if ledger is None or ledger.dedupe_window_hours <= 0:
+            return 0
+        retention = max(float(self.config.get("send_ledger", {}).get("purge_after_days", 90)),
+                        ledger.dedupe_window_hours / 24)
+        purged = ledger.purge(retention)
+        if purged:
+            logger.info(f"🧹 发送账本清理了 {purged} 条超过 {retention:g} 天的记录")
+        return purged
+    
+    def _enabled_sender_order(self) -> List[str]:
+        """按 sender_priority 列出已启用的发送器"""
+        senders = self._senders_config()
+        return [t for t in dict.fromkeys(self._priority_order()) if senders.get(t, {}).get("enabled", True)]
+    
+    def _pending_destinations(self, digest: str, sender_order: List[str]) -> List[Destination]:
+        """
+        列出仍需发送的投递目标，任一候选 (发送器, 群聊) 已在去重窗口内发送过相同内容的目标会被排除
+        """
+        destinations = build_destinations(self._senders_config(), sender_order,
+                                          self.config.get("group_aliases", []))
+        ledger = None if self.force_resend else self.open_send_ledger()
+        if not ledger:
+            return destinations
+        return [d for d in destinations if len(ledger.filter_pending(d.candidates, digest)) == len(d.candidates)]
+    
+    def _unrouted_destinations(self, digest: str) -> List[Destination]:
+        """不可用的账号发送器负责的、仍需发送的群聊（不改由其他账号发送）"""
+        if self.sender_pool is None:
+            return []
+        unavailable = [account.key for account in self.sender_pool.accounts
+                       if account.key not in self.available_senders]
+        return self._pending_destinations(digest, unavailable) if unavailable else []
+    
+    def report_already_sent(self) -> bool:
+        """今日报告已存在且内容已发送到全部目标时返回 True（只读文件和账本，不触碰桌面）"""
+        if self.force_resend:
+            return False
+        report_file = self._find_latest_report()
+        if not report_file:
+            return False
+        with open(report_file, 'r', encoding='utf-8') as f:
+            digest = content_hash(f.read())
+        return not self._pending_destinations(digest, self._enabled_sender_order())
+    
+    def _send_item(self, sender_type: str, item: DeliveryItem, report_date: str) -> bool:
+        """通过指定发送器投递一个已领取的队列条目，记录队列状态、账本、健康度和指标"""
+        sender = self.available_senders[sender_type]
+        group_name = item.group_name
+        # 同一账号可配置给多个发送器，按账号共享限流桶
+        account = self._senders_config()[sender_type].get("account", sender_type)
+        
+        # 按全局 / 账号 / 群聊令牌桶等待最短的合法间隔
+        decision = self.rate_limiter.acquire(account, group_name)
+        if decision.limit:
+            level = decision.limit.split(":", 1)[0]
+            wxbot_metrics.RATE_LIMIT_WAIT.observe(decision.waited, limit=level)
+            logger.info(f"⏳ 受 {decision.limit} 限制等待 {decision.waited:.1f}s")
+        
+        wxbot_metrics.SENDS_ATTEMPTED.inc(sender=sender_type, group=group_name)
+        send_started = time.perf_counter()
+        log_fields = {"send_id": uuid.uuid4().hex[:12], "sender": sender_type,
+                      "group": group_name, "stage": "send", "attempt": item.attempts,
+                      "rate_wait": decision.waited, "rate_limit": decision.limit}
+        
+        try:
+            sent = sender.send_message(item.content, group_name)
+            duration = time.perf_counter() - send_started
+            log_fields["duration"] = round(duration, 3)
+            wxbot_metrics.SEND_DURATION.observe(duration, sender=sender_type)
+            if self.sender_health:
+                self.sender_health.record(sender_type, bool(sent), duration)
+            if sent:
+                self.delivery_queue.mark_sent(item.id)
+                if self.send_ledger:
+                    self.send_ledger.record(sender_type, group_name, item.content_hash, report_date)
+                logger.info(f"✅ 成功发送到 {sender_type}:{group_name}",
+                            extra=dict(log_fields, result="success"))
+                wxbot_metrics.SENDS_SUCCEEDED.inc(sender=sender_type, group=group_name)
+                return True
+            
+            state = self.delivery_queue.mark_failed(item.id, "send_message returned False")
+            logger.error(f"❌ 发送到 {sender_type}:{group_name} 失败 ({state})",
+                         extra=dict(log_fields, result="failed"))
+            
+        except Exception as e:
+            if self.sender_health:
+                self.sender_health.record(sender_type, False, time.perf_counter() - send_started)
+            self.delivery_queue.mark_failed(item.id, str(e))
+            logger.error(f"发送到 {sender_type}:{group_name} 时出错: {e}",
+                         extra=dict(log_fields, result="error"))
+        
+        wxbot_metrics.SENDS_FAILED.inc(sender=sender_type, group=group_name)
+        return False
+    
     def send_reports_with_fallback(self) -> bool:
-        """使用回退机制发送报告"""
+        """
+        逐条路由发送报告
+
+        每个投递目标按发送器顺序尝试候选群聊：某个候选失败立即换下一个发送器，成功后不再通过其他发送器重复发送。
+        每个 发送器×群聊 作为队列条目持久化，中断后重跑只补发未送达的目标
+        """
+        standby = None
+        pool_session = ExitStack()
         try:
             logger.info("📤 开始发送报告...")
             
@@ -282,55 +571,109 @@ class AutoReportSystemV2:
             with open(report_file, 'r', encoding='utf-8') as f:
                 report_content = f.read()
             
+            # 按优先级排列发送器（启用自适应路由时，健康、更快的发送器排在前面）
+            sender_order = self.rank_senders(self._priority_order())
+            fallback_enabled = self.config.get("fallback_enabled", True)
+            
+            content_digest = content_hash(report_content)
+            destinations = self._pending_destinations(content_digest, sender_order)
+            unrouted = self._unrouted_destinations(content_digest)
+            for destination in unrouted:
+                logger.error(f"❌ 账号发送器 {destination.candidates[0][0]} 不可用，{destination.name} 未发送")
+            if not destinations:
+                if unrouted:
+                    logger.error(f"❌ 未送达的群聊: {', '.join(d.name for d in unrouted)}")
+                    return False
+                logger.info("⏭️ 报告内容未变化，且已发送到全部群聊，跳过发送（使用 --force 强制重发）")
+                return True
+            
+            # 同一天、同一内容的报告属于同一批次，重跑时已确认发送的条目不会重复发送
+            queue = self.open_delivery_queue()
+            self.purge_send_ledger()
+            report_date = datetime.now().strftime('%Y%m%d')
+            batch_id = f"{report_date}:{content_digest[:16]}"
+            if self.force_resend:
+                batch_id += f":force-{uuid.uuid4().hex[:8]}"
+            owner = default_owner()
+            delivered = {(item.sender, item.group_name) for item in queue.get_items(batch_id, DeliveryState.SENT)}
+            
+            # 主发送器工作期间，后台保持备用发送器的窗口句柄/进程/登录状态已验证，回退时无需冷启动
+            standby_config = self.config.get("standby", {})
+            if fallback_enabled and standby_config.get("enabled", True):
+                standby = StandbyKeeper(self.available_senders, sender_order[1:],
+                                        float(standby_config.get("refresh_seconds", 30)))
+                standby.start()
+            
             success_count = 0
             total_attempts = 0
+            undelivered = [destination.name for destination in unrouted]
             
-            # 按优先级尝试发送器
-            sender_priority = self.config.get("sender_priority", ["wechat", "wxwork"])
-            fallback_enabled = self.config.get("fallback_enabled", True)
+            # 多账号时同一实例的目标排在一起，在一次桌面锁会话内连续发送，不再为每条消息重新排队/发现
+            pool_sender = None
+            if self.sender_pool:
+                rank = {sender_type: index for index, sender_type in enumerate(sender_order)}
+                destinations.sort(key=lambda d: rank.get(d.candidates[0][0], len(rank)))
             
-            for sender_type in sender_priority:
-                if sender_type not in self.available_senders:
+            for destination in destinations:
+                if delivered.intersection(destination.candidates):
+                    queue.supersede(batch_id, destination.candidates, "delivered by another sender")
                     continue
                 
-                sender = self.available_senders[sender_type]
-                sender_config = self.config["senders"][sender_type]
-                target_groups = sender_config.get("target_groups", [])
-                
-                logger.info(f"📨 尝试使用 {sender_type} 发送器...")
+                if self.sender_pool and destination.candidates[0][0] != pool_sender:
+                    pool_session.close()
+                    pool_sender = destination.candidates[0][0]
+                    pool_session.enter_context(self.sender_pool.batch_session(pool_sender))
                 
-                sender_success = False
-                for group_config in target_groups:
-                    if not group_config.get("enabled", True):
+                done = False
+                previous_sender = None
+                candidates = destination.candidates
+                if self.sender_health:
+                    # 本次运行中进入冷却的发送器排到最后，仍作为最后的候选尝试（不跳过）
+                    candidates = sorted(candidates, key=lambda c: self.sender_health.in_cooldown(c[0]))
+                for sender_type, group_name in candidates:
+                    if self.sender_health and self.sender_health.in_cooldown(sender_type):
+                        logger.warning(f"🧊 {sender_type} 冷却中，{destination.name} 仍由其兜底尝试")
+                    queue.enqueue(batch_id, sender_type, group_name, report_content)
+                    leased = queue.lease(owner, limit=1, sender=sender_type, batch_id=batch_id,
+                                         group_name=group_name)
+                    if not leased:
+                        # 本批次中该候选已失败且未到重试时间，或已超过最大尝试次数
                         continue
+                    if previous_sender:
+                        wxbot_metrics.FALLBACK_EVENTS.inc(from_sender=previous_sender, to_sender=sender_type)
+                        warm = "热备就绪" if standby and standby.is_ready(sender_type) else "冷启动"
+                        logger.info(f"↪️ {destination.name} 改由 {sender_type}:{group_name} 发送（{warm}）")
+                    previous_sender = sender_type
                     
-                    group_name = group_config["name"]
                     total_attempts += 1
-                    
-                    try:
-                        if sender.send_message(report_content, group_name):
-                            logger.info(f"✅ 成功发送到 {sender_type}:{group_name}")
-                            success_count += 1
-                            sender_success = True
-                        else:
-                            logger.error(f"❌ 发送到 {sender_type}:{group_name} 失败")
-                        
-                        # 发送间隔
-                        time.sleep(2)
-                        
-                    except Exception as e:
-                        logger.error(f"发送到 {sender_type}:{group_name} 时出错: {e}")
+                    if self._send_item(sender_type, leased[0], report_date):
+                        success_count += 1
+                        done = True
+                        break
+                    if not fallback_enabled:
+                        break
                 
-                # 如果当前发送器成功发送了至少一条消息，且不启用回退，则停止
-                if sender_success and not fallback_enabled:
-                    break
+                if done:
+                    queue.supersede(batch_id, destination.candidates, "delivered by another sender")
+                else:
+                    undelivered.append(destination.name)
             
-            logger.info(f"📊 发送完成: {success_count}/{total_attempts} 条消息发送成功")
-            return success_count > 0
+            if undelivered:
+                logger.error(f"❌ 未送达的群聊: {', '.join(undelivered)}")
+            batch_counts = queue.counts(batch_id)
+            logger.info(f"📊 发送完成: 本次 {success_count}/{total_attempts} 条消息发送成功，"
+                        f"批次 {batch_id} 状态: {batch_counts}")
+            return batch_counts.get(DeliveryState.SENT, 0) > 0
             
         except Exception as e:
             logger.error(f"发送报告失败: {e}")
             return False
+        finally:
+            pool_session.close()
+            if standby:
+                standby.stop()
+            if self.sender_health:
+                self.sender_health.save()
     
     def _find_latest_report(self) -> Optional[str]:
         """查找最新的报告文件"""
@@ -351,27 +694,43 @@ class AutoReportSystemV2:
     
     def run_full_automation(self) -> bool:
         """运行完整的自动化流程"""
+        success = False
+        self.start_metrics_endpoint()
         try:
             logger.info("🚀 开始执行完整自动化流程 v2.0")
             logger.info("=" * 70)
             
-            # 步骤1: 初始化发送器
-            if not self.initialize_senders():
-                logger.error("❌ 初始化发送器失败，终止流程")
-                return False
+            # 步骤1+2: 存储统计（子进程）与发送器初始化并行执行，关键路径为两者中较慢的一个
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-stats") as pool:
+                stats_future = pool.submit(self._timed_storage_statistics)
+                with wxbot_metrics.STAGE_DURATION.time(stage="initialize_senders"):
+                    initialized = self.initialize_senders()
+                stats_ok = stats_future.result()
             
-            # 步骤2: 执行存储统计
-            if not self.run_storage_statistics():
+            if not stats_ok:
                 logger.error("❌ 存储统计失败，终止流程")
                 return False
             
+            # 报告内容未变化且已发送到全部群聊时直接结束（初始化只做发现，尚未触碰鼠标键盘）
+            if self.report_already_sent():
+                logger.info("⏭️ 报告内容未变化，且已发送到全部群聊，跳过发送（使用 --force 强制重发）")
+                success = True
+                return True
+            
+            if not initialized:
+                logger.error("❌ 初始化发送器失败，终止流程")
+                return False
+            
             # 步骤3: 发送报告
-            if not self.send_reports_with_fallback():
+            with wxbot_metrics.STAGE_DURATION.time(stage="send_reports"):
+                sent_ok = self.send_reports_with_fallback()
+            if not sent_ok:
                 logger.error("❌ 所有发送器都失败")
                 return False
             
             logger.info("=" * 70)
             logger.info("🎉 自动化流程执行完成！")
+            success = True
             return True
             
         except Exception as e:
@@ -380,6 +739,29 @@ class AutoReportSystemV2:
         finally:
             # 清理资源
             self.cleanup()
+            self.export_metrics(success)
+    
+    def _timed_storage_statistics(self) -> bool:
+        with wxbot_metrics.STAGE_DURATION.time(stage="storage_statistics"):
+            return self.run_storage_statistics()
+    
+    def start_metrics_endpoint(self):
+        """按配置启动本地 /metrics 端点"""
+        metrics_config = self.config.get("metrics", {})
+        port = metrics_config.get("http_port")
+        if metrics_config.get("enabled", True) and port:
+            wxbot_metrics.REGISTRY.start_http_server(int(port))
+    
+    def export_metrics(self, success: bool):
+        """写出本次运行的 Prometheus 指标文件"""
+        metrics_config = self.config.get("metrics", {})
+        if not metrics_config.get("enabled", True):
+            return
+        wxbot_metrics.LAST_RUN_SUCCESS.set(1 if success else 0)
+        wxbot_metrics.LAST_RUN_TIMESTAMP.set(time.time())
+        textfile = metrics_config.get("textfile")
+        if textfile:
+            wxbot_metrics.REGISTRY.write_textfile(textfile)
     
     def cleanup(self):
         """清理所有发送器资源"""
@@ -395,6 +777,13 @@ class AutoReportSystemV2:
             self.available_senders.clear()
             self.active_sender = None
             
+            if self.delivery_queue is not None:
+                self.delivery_queue.close()
+                self.delivery_queue = None
+            if self.send_ledger is not None:
+                self.send_ledger.close()
+                self.send_ledger = None
+            
         except Exception as e:
             logger.error(f"清理资源失败: {e}")
     
@@ -408,7 +797,7 @@ class AutoReportSystemV2:
         print("📱 发送器状态:")
         print("-" * 50)
         
-        for sender_type, sender_config in self.config["senders"].items():
+        for sender_type, sender_config in self._senders_config().items():
             enabled = sender_config.get("enabled", True)
             initialized = sender_type in self.available_senders
             
@@ -419,6 +808,29 @@ class AutoReportSystemV2:
                 groups = sender_config.get("target_groups", [])
                 enabled_groups = [g["name"] for g in groups if g.get("enabled", True)]
                 print(f"   目标群聊: {', '.join(enabled_groups) if enabled_groups else '无'}")
+                if self.sender_health:
+                    print(f"   健康度: {self.sender_health.stats(sender_type).describe()}")
+    
+    def show_queue_status(self):
+        """显示持久化发送队列的状态"""
+        queue_config = self.config.get("delivery_queue", {})
+        db_path = queue_config.get("db_path", "delivery_queue.db")
+        if not os.path.exists(db_path):
+            print(f"📭 发送队列为空: {db_path}")
+            return
+        queue = DeliveryQueue.from_config(queue_config)
+        try:
+            print(f"📬 发送队列: {db_path}")
+            print("-" * 50)
+            print(f"总计: {queue.counts()}")
+            for item in queue.get_items():
+                if item.state in (DeliveryState.SENT, DeliveryState.SUPERSEDED):
+                    continue
+                error = f" | {item.last_error}" if item.last_error else ""
+                print(f"  [{item.state}] {item.batch_id} {item.sender}:{item.group_name} "
+                      f"尝试 {item.attempts} 次{error}")
+        finally:
+            queue.close()
     
     def test_senders(self):
         """测试所有发送器"""
@@ -431,10 +843,12 @@ class AutoReportSystemV2:
             
             test_message = f"🧪 发送器测试消息\n发送时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n这是一条测试消息，用于验证发送器功能。"
             
+            # 包含账号发送器 "<发送器>@<账号>"，其默认群聊为账号负责的第一个群聊
+            senders_config = self._senders_config()
             for sender_type, sender in self.available_senders.items():
                 print(f"\n🧪 测试 {sender_type} 发送器:")
                 
-                sender_config = self.config["senders"][sender_type]
+                sender_config = senders_config[sender_type]
                 default_group = sender_config.get("default_group")
                 
                 if default_group:
@@ -463,14 +877,27 @@ def main():
     
     parser = argparse.ArgumentParser(description="自动化存储统计报告系统 v2.0")
     parser.add_argument('command', nargs='?', default='run', 
-                       choices=['run', 'config', 'status', 'test', 'migrate'],
+                       choices=['run', 'config', 'status', 'test', 'migrate', 'queue'],
                        help='执行的命令')
     parser.add_argument('--sender', type=str, help='指定使用的发送器类型')
     parser.add_argument('--group', type=str, help='指定目标群聊')
+    parser.add_argument('--force', action='store_true', help='忽略发送账本，强制重发未变化的报告')
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
+    setup_console_and_logging()
     
-    system = AutoReportSystemV2()
+    if args.profile:
+        run_profiled(run_command, args, name=f"auto_daily_report_v2_{args.command}",
+                     output_dir=args.profile_dir, top=args.profile_top,
+                     interval=args.profile_interval)
+    else:
+        run_command(args)
+
+
+def run_command(args):
+    """执行命令行指定的命令"""
+    system = AutoReportSystemV2(force_resend=args.force)
     
     if args.command == 'run':
         # 执行完整自动化流程
@@ -490,14 +917,15 @@ def main():
         success = system.test_senders()
         sys.exit(0 if success else 1)
         
+    elif args.command == 'queue':
+        # 显示发送队列状态
+        system.show_queue_status()
+        
     elif args.command == 'migrate':
         # 手动触发配置迁移
         print("🔄 重新加载并迁移配置...")
         system.load_config()
         print("✅ 配置迁移完成")
-        
-    else:
-        parser.print_help()
 
 
 if __name__ == "__main__":
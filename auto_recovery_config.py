@@ -6,6 +6,8 @@
 
 import json
 import logging
+import os
+import threading
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
@@ -15,9 +17,15 @@ logger = logging.getLogger(__name__)
 class AutoRecoveryConfig:
     """自动恢复配置管理器"""
 
+    # 同一配置文件在进程内共用一把锁：看门狗回调在后台线程中清除句柄，与主线程的更新互斥
+    _file_locks: Dict[str, threading.RLock] = {}
+    _file_locks_guard = threading.Lock()
+
     def __init__(self, config_file: str = "auto_report_config.json"):
         self.config_file = config_file
         self.config = {}
+        with self._file_locks_guard:
+            self._lock = self._file_locks.setdefault(os.path.abspath(config_file), threading.RLock())
         self.load_config()
 
     def load_config(self):
@@ -62,42 +70,79 @@ class AutoRecoveryConfig:
         }
         self.save_config()
 
-    def save_config(self):
-        """保存配置文件"""
+    def _reload(self):
+        """修改前重新读取配置文件，保留其他进程写入的内容（读取失败时沿用内存中的配置）"""
         try:
-            self.config["last_update"] = datetime.now().isoformat()
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-            logger.info(f"配置已保存到: {self.config_file}")
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                self.config = json.load(f)
         except Exception as e:
-            logger.error(f"保存配置文件失败: {e}")
+            logger.debug(f"重新读取配置文件失败，沿用内存中的配置: {e}")
+
+    def save_config(self):
+        """保存配置文件（先写临时文件再替换，中途失败也不会留下写了一半的配置）"""
+        with self._lock:
+            tmp_path = f"{self.config_file}.{os.getpid()}.tmp"
+            try:
+                self.config["last_update"] = datetime.now().isoformat()
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.config, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.config_file)
+                logger.info(f"配置已保存到: {self.config_file}")
+            except Exception as e:
+                logger.error(f"保存配置文件失败: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
 
     def invalidate_all_handles(self):
         """清除所有窗口句柄（强制重新检测）"""
         logger.info("清除所有窗口句柄，强制重新检测...")
 
-        for sender_name, sender_config in self.config.get("senders", {}).items():
-            if "target_groups" in sender_config:
-                for group in sender_config["target_groups"]:
+        with self._lock:
+            self._reload()
+            for sender_name in self.config.get("senders", {}):
+                self._clear_handles(sender_name)
+
+            # 同时清除旧版兼容配置
+            if "legacy_compatibility" in self.config:
+                for group in self.config["legacy_compatibility"].get("target_groups", []):
                     if "hwnd" in group:
                         old_hwnd = group["hwnd"]
                         group["hwnd"] = None
-                        logger.info(f"清除 {sender_name}.{group.get('name', 'Unknown')} 句柄: {old_hwnd} → None")
-
-        # 同时清除旧版兼容配置
-        if "legacy_compatibility" in self.config:
-            for group in self.config["legacy_compatibility"].get("target_groups", []):
-                if "hwnd" in group:
-                    old_hwnd = group["hwnd"]
-                    group["hwnd"] = None
-                    logger.info(f"清除 legacy.{group.get('name', 'Unknown')} 句柄: {old_hwnd} → None")
-
-        self.save_config()
+                        logger.info(f"清除 legacy.{group.get('name', 'Unknown')} 句柄: {old_hwnd} → None")
+
+            self.save_config()
+
+    def invalidate_handles(self, sender_type: str) -> bool:
+        """清除单个发送器的窗口句柄（看门狗发现进程退出/重启时调用）"""
+        with self._lock:
+            self._reload()
+            if not self._clear_handles(sender_type):
+                return False
+            self.save_config()
+            return True
+
+    def _clear_handles(self, sender_type: str) -> bool:
+        """清除发送器下所有群聊的句柄，返回是否有句柄被清除"""
+        cleared = False
+        sender_config = self.config.get("senders", {}).get(sender_type, {})
+        for group in sender_config.get("target_groups", []):
+            if group.get("hwnd") is not None:
+                logger.info(f"清除 {sender_type}.{group.get('name', 'Unknown')} 句柄: {group['hwnd']} → None")
+                group["hwnd"] = None
+                cleared = True
+        return cleared
 
     def update_window_handle(self, sender_type: str, group_name: str, new_hwnd: int):
         """更新窗口句柄"""
         logger.info(f"更新 {sender_type}.{group_name} 窗口句柄: {new_hwnd}")
 
+        with self._lock:
+            self._reload()
+            return self._update_window_handle(sender_type, group_name, new_hwnd)
+
+    def _update_window_handle(self, sender_type: str, group_name: str, new_hwnd: int) -> bool:
         # 确保发送器配置存在
         if sender_type not in self.config.get("senders", {}):
             logger.warning(f"发送器 {sender_type} 不存在于配置中")
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+命令行性能剖析工具
+版本：v1.0.0
+创建日期：2026-10-19
+功能：为各个 CLI 入口提供统一的 --profile 开关，
+      同时使用 cProfile 统计函数耗时、使用采样线程记录调用栈，
+      输出 .prof 统计文件和火焰图可用的 collapsed-stack 文件，并打印热点函数
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_SAMPLE_INTERVAL = 0.005
+DEFAULT_TOP_N = 25
+
+# 热点归类规则：(分类名, 文件路径/函数名中出现的关键字)
+HOTSPOT_CATEGORIES = [
+    ("paddleocr", ("paddleocr", "paddle")),
+    ("PIL", ("PIL",)),
+    ("psutil", ("psutil",)),
+    ("win32", ("win32gui", "win32process", "win32api")),
+    ("pyautogui", ("pyautogui", "pyscreeze", "pymsgbox")),
+    ("sleep", ("time.sleep",)),
+]
+
+
+class StackSampler(threading.Thread):
+    """定时采样目标线程的调用栈，生成 collapsed-stack 统计"""
+
+    def __init__(self, target_thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name="wxbot-stack-sampler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = max(0.001, float(interval))
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            # collapsed 格式要求从根到叶，且不能包含分号
+            self.samples[";".join(reversed(stack)).replace(" ", "_")] += 1
+            self.sample_count += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1.0)
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.samples.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """向 argparse 解析器注册统一的性能剖析参数"""
+    group = parser.add_argument_group("性能剖析")
+    group.add_argument('--profile', action='store_true',
+                       help='使用 cProfile + 栈采样运行命令，并输出统计文件')
+    group.add_argument('--profile-dir', type=str, default=DEFAULT_PROFILE_DIR,
+                       help=f'剖析结果输出目录（默认: {DEFAULT_PROFILE_DIR}）')
+    group.add_argument('--profile-top', type=int, default=DEFAULT_TOP_N,
+                       help=f'打印的热点函数数量（默认: {DEFAULT_TOP_N}）')
+    group.add_argument('--profile-interval', type=float, default=DEFAULT_SAMPLE_INTERVAL,
+                       help=f'栈采样间隔秒数（默认: {DEFAULT_SAMPLE_INTERVAL}）')
+
+
+def extract_profile_options(argv: List[str]) -> Tuple[argparse.Namespace, List[str]]:
+    """
+    从原始命令行参数中剥离剖析参数
+
+    供直接读取 sys.argv 的入口使用，剩余参数原样返回。
+
+    Args:
+        argv: 命令行参数（不含程序名）
+
+    Returns:
+        Tuple: (剖析参数, 剩余参数)
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    add_profile_arguments(parser)
+    return parser.parse_known_args(argv)
+
+
+def categorize_hotspots(stats: Any) -> Dict[str, float]:
+    """按第三方库/睡眠归类函数自身耗时（tottime）"""
+    totals: Dict[str, float] = {name: 0.0 for name, _ in HOTSPOT_CATEGORIES}
+    totals["other"] = 0.0
+    for (filename, _line, func_name), (_cc, _nc, tottime, _ct, _callers) in stats.stats.items():
+        location = f"{filename} {func_name}"
+        for name, keywords in HOTSPOT_CATEGORIES:
+            if any(keyword in location for keyword in keywords):
+                totals[name] += tottime
+                break
+        else:
+            totals["other"] += tottime
+    return totals
+
+
+def run_profiled(func: Callable[..., Any], *args: Any,
+                 name: str = "wxbot",
+                 output_dir: str = DEFAULT_PROFILE_DIR,
+                 top: int = DEFAULT_TOP_N,
+                 interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 **kwargs: Any) -> Any:
+    """
+    在剖析器下执行函数，结束后（包括 sys.exit 退出）写出结果
+
+    Args:
+        func: 要执行的函数
+        name: 输出文件名前缀，一般为命令名
+        output_dir: 输出目录
+        top: 打印的热点函数数量
+        interval: 栈采样间隔
+
+    Returns:
+        func 的返回值
+    """
+    # cProfile/pstats 只在真正剖析时导入，不增加普通启动的开销
+    import cProfile
+
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base_path = os.path.join(output_dir, f"{name}_{stamp}")
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), interval)
+    sampler.start()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        _write_profile_report(profiler, sampler, base_path, elapsed, top)
+
+
+def _write_profile_report(profiler: Any, sampler: StackSampler,
+                          base_path: str, elapsed: float, top: int) -> None:
+    """写出统计文件并打印热点摘要"""
+    import io
+    import pstats
+
+    try:
+        stats_path = f"{base_path}.prof"
+        collapsed_path = f"{base_path}.collapsed"
+        profiler.dump_stats(stats_path)
+        sampler.write_collapsed(collapsed_path)
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(top)
+
+        print("\n" + "=" * 70)
+        print(f"⏱️ 性能剖析: 总耗时 {elapsed:.3f}s, 栈采样 {sampler.sample_count} 次")
+        print("按类别的函数自身耗时:")
+        for category, seconds in sorted(categorize_hotspots(stats).items(),
+                                        key=lambda item: item[1], reverse=True):
+            if seconds > 0:
+                share = seconds / elapsed * 100 if elapsed > 0 else 0.0
+                print(f"  {category:<10} {seconds:8.3f}s  {share:5.1f}%")
+        print(f"热点函数（按累计耗时，前 {top} 个）:")
+        print(buffer.getvalue())
+        print(f"统计文件: {stats_path}")
+        print(f"火焰图栈文件: {collapsed_path}  (可用 flamegraph.pl / speedscope 打开)")
+        print("=" * 70)
+    except Exception as e:
+        logger.error(f"写出性能剖析结果失败: {e}")
+
+
+def profile_cli(entry: Callable[[], Any], name: str) -> Any:
+    """
+    为直接读取 sys.argv 的 main() 提供 --profile 支持
+
+    剖析参数会先从 sys.argv 中移除，再调用 entry。
+    输出文件名为 "<name>_<子命令>_<时间戳>"。
+
+    Args:
+        entry: 原始入口函数
+        name: 输出文件名前缀
+
+    Returns:
+        entry 的返回值
+    """
+    options, remaining = extract_profile_options(sys.argv[1:])
+    sys.argv = [sys.argv[0]] + remaining
+    if not options.profile:
+        return entry()
+    if remaining and remaining[0].replace("-", "_").isidentifier():
+        name = f"{name}_{remaining[0].lower()}"
+    return run_profiled(entry, name=name, output_dir=options.profile_dir,
+                        top=options.profile_top, interval=options.profile_interval)
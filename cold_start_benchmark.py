@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+冷启动与导入耗时基准
+版本：v1.0.0
+创建日期：2026-10-19
+功能：以 `python -X importtime` 的方式统计各 CLI 模块的导入耗时，
+      并测量每个命令从进程启动到退出的冷启动时间，结果追加到历史文件以便追踪回归
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY_FILE = "cold_start_history.json"
+
+# 基准目标：name 用于历史对比；module 用于导入耗时；argv 为实际执行的命令（None 表示只测导入）
+DEFAULT_TARGETS = [
+    {"name": "auto_daily_report_v2 config", "module": "auto_daily_report_v2",
+     "argv": ["auto_daily_report_v2.py", "config"]},
+    {"name": "auto_daily_report_v2 status", "module": "auto_daily_report_v2",
+     "argv": ["auto_daily_report_v2.py", "status"]},
+    {"name": "wechat_sender_v4 usage", "module": "wechat_sender_v4",
+     "argv": ["wechat_sender_v4.py"]},
+    {"name": "wxwork_adapter import", "module": "wxwork_adapter", "argv": None},
+    {"name": "wechat_sender_v3 import", "module": "wechat_sender_v3", "argv": None},
+]
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        List[Dict]: 每个导入的 {module, depth, self_us, cumulative_us}
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, raw_name = line[len("import time:"):].split("|", 2)
+            module = raw_name.strip()
+            depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+            entries.append({
+                "module": module,
+                "depth": max(0, depth),
+                "self_us": int(self_us.strip()),
+                "cumulative_us": int(cumulative_us.strip()),
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def measure_import(module: str, python: str = sys.executable) -> Dict[str, Any]:
+    """在全新解释器中导入模块，返回导入耗时和最重的依赖"""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True, encoding="utf-8", errors="replace",
+    )
+    entries = parse_importtime(result.stderr)
+    target_index = next(
+        (i for i, item in enumerate(entries) if item["module"] == module and item["depth"] == 0), None
+    )
+    target = entries[target_index] if target_index is not None else None
+    # 目标模块直接导入的依赖（深度 1）最能说明“谁拖慢了启动”。importtime 按后序输出：子模块位于
+    # 目标自身那一行之前、上一个深度 0 条目之后；更早的是解释器启动时的导入（encodings、codecs 等）
+    children = []
+    if target_index is not None:
+        start = target_index
+        while start > 0 and entries[start - 1]["depth"] > 0:
+            start -= 1
+        children = sorted(
+            (item for item in entries[start:target_index] if item["depth"] == 1),
+            key=lambda item: item["cumulative_us"], reverse=True,
+        )
+    error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    return {
+        "ok": result.returncode == 0,
+        "import_ms": round(target["cumulative_us"] / 1000, 2) if target else None,
+        "heaviest_imports": [
+            {"module": item["module"], "cumulative_ms": round(item["cumulative_us"] / 1000, 2)}
+            for item in children[:8]
+        ],
+        "error": error_lines[-1] if result.returncode != 0 and error_lines else None,
+    }
+
+
+def measure_command(argv: List[str], repeat: int, timeout: float,
+                    python: str = sys.executable) -> Dict[str, Any]:
+    """重复执行命令，返回冷启动耗时（毫秒）的中位数与最小值"""
+    durations = []
+    returncode = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                [python] + argv, cwd=BASE_DIR, capture_output=True,
+                stdin=subprocess.DEVNULL, timeout=timeout,
+            )
+            returncode = completed.returncode
+        except subprocess.TimeoutExpired:
+            returncode = "timeout"
+            break
+        durations.append((time.perf_counter() - started) * 1000)
+    return {
+        "returncode": returncode,
+        "wall_ms_median": round(statistics.median(durations), 2) if durations else None,
+        "wall_ms_min": round(min(durations), 2) if durations else None,
+    }
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """读取历史记录"""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        logger.error(f"读取基准历史失败: {e}")
+        return []
+
+
+def save_history(path: str, history: List[Dict[str, Any]]) -> None:
+    """原子写入历史记录"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(history, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare_with_previous(current: Dict[str, Any], previous: Optional[Dict[str, Any]],
+                          threshold: float) -> List[str]:
+    """与上一次结果对比，返回超出阈值的回归描述"""
+    regressions = []
+    if not previous:
+        return regressions
+    for name, result in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if not old:
+            continue
+        for key in ("import_ms", "wall_ms_median"):
+            new_value, old_value = result.get(key), old.get(key)
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value * 100
+            if change > threshold:
+                regressions.append(f"{name} {key}: {old_value}ms → {new_value}ms (+{change:.1f}%)")
+    return regressions
+
+
+def run_benchmark(targets: List[Dict[str, Any]], repeat: int, timeout: float) -> Dict[str, Any]:
+    """执行全部基准"""
+    results = {}
+    for target in targets:
+        logger.info(f"⏱️ 基准: {target['name']}")
+        result = measure_import(target["module"])
+        if target.get("argv"):
+            result.update(measure_command(target["argv"], repeat, timeout))
+        results[target["name"]] = result
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "results": results,
+    }
+
+
+def print_report(run: Dict[str, Any], regressions: List[str]) -> None:
+    """打印基准结果"""
+    print(f"\n📊 冷启动基准 ({run['timestamp']}, Python {run['python']})")
+    print("-" * 70)
+    for name, result in run["results"].items():
+        import_ms = result.get("import_ms")
+        wall_ms = result.get("wall_ms_median")
+        status = "🟢" if result.get("ok") else "🔴"
+        print(f"{status} {name}")
+        print(f"   导入: {import_ms if import_ms is not None else '-'} ms"
+              f" | 冷启动: {wall_ms if wall_ms is not None else '-'} ms")
+        if result.get("heaviest_imports"):
+            heaviest = ", ".join(f"{item['module']}={item['cumulative_ms']}ms"
+                                 for item in result["heaviest_imports"][:5])
+            print(f"   最重依赖: {heaviest}")
+        if result.get("error"):
+            print(f"   错误: {result['error']}")
+    if regressions:
+        print("\n⚠️ 相比上次出现回归:")
+        for line in regressions:
+            print(f"   {line}")
+
+
+def main():
+    """主程序入口"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="CLI 冷启动与导入耗时基准")
+    parser.add_argument('--repeat', type=int, default=5, help='每个命令重复执行次数')
+    parser.add_argument('--timeout', type=float, default=60.0, help='单次命令超时秒数')
+    parser.add_argument('--history', type=str, default=DEFAULT_HISTORY_FILE, help='历史记录文件')
+    parser.add_argument('--threshold', type=float, default=20.0, help='回归报警阈值（百分比）')
+    parser.add_argument('--only', type=str, help='只运行名称包含该字符串的目标')
+    parser.add_argument('--no-save', action='store_true', help='不写入历史记录')
+    parser.add_argument('--fail-on-regression', action='store_true', help='出现回归时以非零状态退出')
+    args = parser.parse_args()
+
+    targets = [t for t in DEFAULT_TARGETS if not args.only or args.only in t["name"]]
+    run = run_benchmark(targets, max(1, args.repeat), args.timeout)
+
+    history = load_history(args.history)
+    regressions = compare_with_previous(run, history[-1] if history else None, args.threshold)
+    print_report(run, regressions)
+
+    if not args.no_save:
+        history.append(run)
+        save_history(args.history, history)
+        print(f"\n结果已追加到: {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
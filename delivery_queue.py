@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+持久化发送队列
+版本：v1.0.0
+创建日期：2026-10-19
+功能：基于 SQLite（WAL 模式）的发送任务队列，记录每个 (批次, 发送器, 群聊) 的投递状态。
+      状态：pending → in_flight → sent / failed（可重试）→ dead（超过最大次数）；
+      同一投递目标已由其他发送器送达的条目标记为 superseded，不再领取。
+      通过租约超时和启动时恢复，进程中途被杀后重跑只会重发未确认的条目（至少一次投递）
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryState:
+    """投递状态常量"""
+    PENDING = "pending"
+    IN_FLIGHT = "in_flight"
+    SENT = "sent"
+    FAILED = "failed"
+    DEAD = "dead"
+    SUPERSEDED = "superseded"
+
+
+@dataclass
+class DeliveryItem:
+    id: int
+    batch_id: str
+    sender: str
+    group_name: str
+    content_hash: str
+    state: str
+    attempts: int
+    lease_owner: Optional[str]
+    lease_until: Optional[float]
+    last_error: Optional[str]
+    created_at: float
+    updated_at: float
+    content: Optional[str] = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contents (
+    content_hash TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (batch_id, sender, group_name)
+);
+CREATE INDEX IF NOT EXISTS idx_items_state ON items (state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_items_batch ON items (batch_id, sender);
+"""
+
+_ITEM_COLUMNS = ("id, batch_id, sender, group_name, content_hash, state, attempts, "
+                 "lease_owner, lease_until, last_error, created_at, updated_at")
+
+
+def content_hash(content: str) -> str:
+    """计算消息内容的 SHA-256"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def default_owner() -> str:
+    """当前进程的租约持有者标识：主机名:PID"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        return True  # 无 psutil 时无法可靠判断，交给租约超时处理
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def local_owner_alive(owner: str) -> bool:
+    """判断租约持有者是否仍存活（只能判断本机进程，其他主机一律视为存活）"""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    return _pid_alive(int(pid))
+
+
+class DeliveryQueue:
+    """SQLite 持久化投递队列"""
+
+    def __init__(self, db_path: str = "delivery_queue.db", lease_seconds: float = 600.0,
+                 max_attempts: int = 3, retry_backoff: float = 60.0):
+        """
+        Args:
+            db_path: 数据库文件路径，":memory:" 用于临时队列
+            lease_seconds: 默认租约时长，超时未确认的条目会重新变为可领取
+            max_attempts: 最大尝试次数，超过后进入 dead 状态
+            retry_backoff: 失败后再次可领取前的等待秒数
+        """
+        self.db_path = db_path
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        self.retry_backoff = float(retry_backoff)
+        self._lock = threading.RLock()
+        if db_path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(db_path))
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "DeliveryQueue":
+        """根据配置文件中的 delivery_queue 段创建队列"""
+        return cls(
+            db_path=config.get("db_path", "delivery_queue.db"),
+            lease_seconds=float(config.get("lease_seconds", 600)),
+            max_attempts=int(config.get("max_attempts", 3)),
+            retry_backoff=float(config.get("retry_backoff_seconds", 60)),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE 事务，保证多进程领取时不会重复领取同一条目"""
+        queue = self
+
+        class _Tx:
+            def __enter__(self_inner):
+                queue._lock.acquire()
+                queue._conn.execute("BEGIN IMMEDIATE")
+                return queue._conn
+
+            def __exit__(self_inner, exc_type, exc, tb):
+                try:
+                    queue._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+                finally:
+                    queue._lock.release()
+                return False
+
+        return _Tx()
+
+    @staticmethod
+    def _row_to_item(row) -> DeliveryItem:
+        return DeliveryItem(*row)
+
+    def enqueue(self, batch_id: str, sender: str, group_name: str, content: str) -> int:
+        """
+        加入一条投递任务（同一批次、发送器、群聊只会存在一条）
+
+        Returns:
+            int: 条目 ID
+        """
+        digest = content_hash(content)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO contents (content_hash, body, created_at) VALUES (?, ?, ?)",
+                         (digest, content, now))
+            conn.execute(
+                "INSERT OR IGNORE INTO items (batch_id, sender, group_name, content_hash, state, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (batch_id, sender, group_name, digest, DeliveryState.PENDING, now, now),
+            )
+            row = conn.execute("SELECT id FROM items WHERE batch_id = ? AND sender = ? AND group_name = ?",
+                               (batch_id, sender, group_name)).fetchone()
+        return int(row[0])
+
+    def lease(self, owner: str, limit: int = 1, sender: Optional[str] = None,
+              batch_id: Optional[str] = None, lease_seconds: Optional[float] = None,
+              group_name: Optional[str] = None) -> List[DeliveryItem]:
+        """
+        领取可投递的条目并加租约
+
+        可领取：pending、到达重试时间的 failed、租约已过期的 in_flight。
+
+        Args:
+            owner: 租约持有者
+            limit: 最多领取条数
+            sender: 只领取指定发送器的条目
+            batch_id: 只领取指定批次的条目
+            group_name: 只领取指定群聊的条目
+
+        Returns:
+            List[DeliveryItem]: 已领取的条目（含消息内容）
+        """
+        now = time.time()
+        lease_until = now + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        conditions = ["((state IN (?, ?) AND next_attempt_at <= ?) OR (state = ? AND lease_until < ?))"]
+        params: List[Any] = [DeliveryState.PENDING, DeliveryState.FAILED, now, DeliveryState.IN_FLIGHT, now]
+        if sender is not None:
+            conditions.append("sender = ?")
+            params.append(sender)
+        if batch_id is not None:
+            conditions.append("batch_id = ?")
+            params.append(batch_id)
+        if group_name is not None:
+            conditions.append("group_name = ?")
+            params.append(group_name)
+
+        with self._transaction() as conn:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id FROM items WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?",
+                params + [int(limit)],
+            )]
+            items = []
+            for item_id in ids:
+                conn.execute(
+                    "UPDATE items SET state = ?, attempts = attempts + 1, lease_owner = ?, "
+                    "lease_until = ?, updated_at = ? WHERE id = ?",
+                    (DeliveryState.IN_FLIGHT, owner, lease_until, now, item_id),
+                )
+                row = conn.execute(
+                    f"SELECT {_ITEM_COLUMNS}, (SELECT body FROM contents WHERE contents.content_hash = items.content_hash) "
+                    "FROM items WHERE id = ?",
+                    (item_id,),
+                ).fetchone()
+                items.append(self._row_to_item(row))
+        return items
+
+    def heartbeat(self, item_id: int, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        """延长租约，返回 False 表示租约已不属于 owner"""
+        lease_until = time.time() + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET lease_until = ?, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (lease_until, time.time(), item_id, DeliveryState.IN_FLIGHT, owner),
+            )
+        return cursor.rowcount == 1
+
+    def mark_sent(self, item_id: int) -> None:
+        """确认投递成功"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET state = ?, lease_owner = NULL, lease_until = NULL, last_error = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (DeliveryState.SENT, time.time(), item_id),
+            )
+
+    def mark_failed(self, item_id: int, error: str = "", retry_delay: Optional[float] = None) -> str:
+        """
+        记录投递失败
+
+        Returns:
+            str: 新状态（failed 或 dead）
+        """
+        now = time.time()
+        delay = self.retry_backoff if retry_delay is None else retry_delay
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM items WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                return DeliveryState.DEAD
+            state = DeliveryState.DEAD if row[0] >= self.max_attempts else DeliveryState.FAILED
+            conn.execute(
+                "UPDATE items SET state = ?, lease_owner = NULL, lease_until = NULL, last_error = ?, "
+                "next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (state, str(error)[:500], now + delay, now, item_id),
+            )
+        return state
+
+    def supersede(self, batch_id: str, targets: List[Tuple[str, str]], reason: str = "") -> int:
+        """
+        把批次中尚未送达的 (发送器, 群聊) 条目标记为 superseded（同一目标已通过其他发送器送达）
+
+        正在投递（in_flight）的条目不受影响
+
+        Returns:
+            int: 标记的条目数
+        """
+        now = time.time()
+        marked = 0
+        with self._transaction() as conn:
+            for sender, group_name in targets:
+                cursor = conn.execute(
+                    "UPDATE items SET state = ?, lease_owner = NULL, lease_until = NULL, last_error = ?, "
+                    "updated_at = ? WHERE batch_id = ? AND sender = ? AND group_name = ? AND state IN (?, ?)",
+                    (DeliveryState.SUPERSEDED, str(reason)[:500], now, batch_id, sender, group_name,
+                     DeliveryState.PENDING, DeliveryState.FAILED),
+                )
+                marked += cursor.rowcount
+        return marked
+
+    def release(self, item_id: int, owner: Optional[str] = None) -> bool:
+        """
+        放弃租约但不计为失败（例如被限流或被其他工作者接管），尝试次数回退一次
+
+        Args:
+            owner: 给定时只在租约仍属于 owner 时释放
+
+        Returns:
+            bool: 是否释放了条目
+        """
+        sql = ("UPDATE items SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+               "lease_until = NULL, updated_at = ? WHERE id = ? AND state = ?")
+        params: List[Any] = [DeliveryState.PENDING, time.time(), item_id, DeliveryState.IN_FLIGHT]
+        if owner is not None:
+            sql += " AND lease_owner = ?"
+            params.append(owner)
+        with self._transaction() as conn:
+            cursor = conn.execute(sql, params)
+        return cursor.rowcount == 1
+
+    def reassign(self, item_id: int, from_owner: str, to_owner: str,
+                 lease_seconds: Optional[float] = None) -> Optional[DeliveryItem]:
+        """
+        把仍由 from_owner 持有的 in_flight 条目转交给 to_owner（工作窃取），尝试次数不变
+
+        Returns:
+            Optional[DeliveryItem]: 转交后的条目（含消息内容），租约已不属于 from_owner 时返回 None
+        """
+        now = time.time()
+        lease_until = now + (lease_seconds if lease_seconds is not None else self.lease_seconds)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET lease_owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND state = ? AND lease_owner = ?",
+                (to_owner, lease_until, now, item_id, DeliveryState.IN_FLIGHT, from_owner),
+            )
+            if cursor.rowcount != 1:
+                return None
+            row = conn.execute(
+                f"SELECT {_ITEM_COLUMNS}, (SELECT body FROM contents WHERE contents.content_hash = items.content_hash) "
+                "FROM items WHERE id = ?",
+                (item_id,),
+            ).fetchone()
+        return self._row_to_item(row)
+
+    def recover(self, owner_alive: Callable[[str], bool] = local_owner_alive) -> int:
+        """
+        启动时恢复：租约过期或持有进程已退出的 in_flight 条目重新变为 pending
+
+        Returns:
+            int: 恢复的条目数
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT id, lease_owner, lease_until FROM items WHERE state = ?",
+                                (DeliveryState.IN_FLIGHT,)).fetchall()
+            recovered = [item_id for item_id, owner, lease_until in rows
+                         if (lease_until or 0) < now or not owner or not owner_alive(owner)]
+            for item_id in recovered:
+                conn.execute(
+                    "UPDATE items SET state = ?, lease_owner = NULL, lease_until = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (DeliveryState.PENDING, now, item_id),
+                )
+        if recovered:
+            logger.warning(f"♻️ 恢复 {len(recovered)} 条未确认的投递任务（上次运行中断）")
+        return len(recovered)
+
+    def counts(self, batch_id: Optional[str] = None, sender: Optional[str] = None) -> Dict[str, int]:
+        """按状态统计条目数"""
+        conditions, params = [], []
+        if batch_id is not None:
+            conditions.append("batch_id = ?")
+            params.append(batch_id)
+        if sender is not None:
+            conditions.append("sender = ?")
+            params.append(sender)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT state, COUNT(*) FROM items {where} GROUP BY state",
+                                      params).fetchall()
+        return {state: count for state, count in rows}
+
+    def get_items(self, batch_id: Optional[str] = None, state: Optional[str] = None) -> List[DeliveryItem]:
+        """查询条目（不含消息内容）"""
+        conditions, params = [], []
+        if batch_id is not None:
+            conditions.append("batch_id = ?")
+            params.append(batch_id)
+        if state is not None:
+            conditions.append("state = ?")
+            params.append(state)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_ITEM_COLUMNS} FROM items {where} ORDER BY id",
+                                      params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def purge(self, older_than_days: float = 30.0) -> int:
+        """删除早于指定天数的 sent/dead/superseded 条目及不再引用的内容"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._transaction() as conn:
+            cursor = conn.execute("DELETE FROM items WHERE state IN (?, ?, ?) AND updated_at < ?",
+                                  (DeliveryState.SENT, DeliveryState.DEAD, DeliveryState.SUPERSEDED, cutoff))
+            conn.execute("DELETE FROM contents WHERE content_hash NOT IN (SELECT content_hash FROM items)")
+        return cursor.rowcount
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+逐条投递路由
+版本：v1.0.0
+创建日期：2026-10-19
+功能：把各发送器配置的目标群聊归并为"投递目标"（同名群聊，或 group_aliases 中声明为同一受众的群聊），
+      每个投递目标按发送器顺序列出候选 (发送器, 群聊)。发送时某个候选失败立即换下一个候选，
+      任一候选成功后该目标即完成，不会再通过其他发送器重复发送
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Target = Tuple[str, str]
+
+
+@dataclass
+class Destination:
+    """一个投递目标：同一受众在不同发送器上的群聊"""
+    name: str
+    candidates: List[Target] = field(default_factory=list)
+
+    def serves(self, sender: str) -> bool:
+        return any(candidate_sender == sender for candidate_sender, _ in self.candidates)
+
+
+def build_alias_map(group_aliases: Iterable[Sequence[str]]) -> Dict[str, str]:
+    """
+    把 group_aliases（每项为一组等价群聊名）展开为 群聊名 → 规范名，重叠的组会合并
+
+    规范名取所在组（合并后）中最先出现的名字
+    """
+    parent: Dict[str, str] = {}
+
+    def find(name: str) -> str:
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for names in group_aliases or []:
+        names = [name for name in names if name]
+        for name in names:
+            parent.setdefault(name, name)
+        for name in names[1:]:
+            root, other = find(names[0]), find(name)
+            if root != other:
+                parent[other] = root
+    return {name: find(name) for name in parent}
+
+
+def build_destinations(senders_config: Dict[str, Dict[str, Any]], sender_order: Sequence[str],
+                       group_aliases: Iterable[Sequence[str]] = ()) -> List[Destination]:
+    """
+    按发送器顺序生成投递目标
+
+    Args:
+        senders_config: 配置文件中的 senders 段
+        sender_order: 发送器顺序（已按优先级/健康分数排好，只含可用的发送器）
+        group_aliases: 等价群聊名列表
+
+    Returns:
+        List[Destination]: 按首次出现顺序排列的投递目标，候选按 sender_order 排列
+    """
+    aliases = build_alias_map(group_aliases)
+    destinations: Dict[str, Destination] = {}
+    for sender_type in sender_order:
+        sender_config = senders_config.get(sender_type, {})
+        for group_config in sender_config.get("target_groups", []):
+            if not group_config.get("enabled", True):
+                continue
+            group_name = group_config["name"]
+            key = aliases.get(group_name, group_name)
+            destination = destinations.setdefault(key, Destination(key))
+            if (sender_type, group_name) not in destination.candidates:
+                destination.candidates.append((sender_type, group_name))
+    return list(destinations.values())
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+跨进程桌面输入锁
+版本：v1.0.0
+创建日期：2026-10-19
+功能：所有操作鼠标、键盘和剪贴板的发送流程在同一把系统级文件锁下串行执行
+      （Windows 使用 msvcrt.locking，其他平台使用 fcntl.flock）。
+      等待者按排队票据先来先服务，支持超时，并可查询当前持有者和排队情况
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_DIR = os.environ.get("WXBOT_LOCK_DIR") or os.path.join(tempfile.gettempdir(), "wxbot_locks")
+DEFAULT_LOCK_TIMEOUT = 600.0
+
+
+class DesktopLockTimeout(Exception):
+    """在超时时间内未能获得桌面锁"""
+
+    def __init__(self, owner: str, timeout: float, holder: Optional[Dict[str, Any]]):
+        self.owner = owner
+        self.timeout = timeout
+        self.holder = holder
+        holder_text = (f"{holder.get('owner')} (pid {holder.get('pid')}, 自 {holder.get('acquired_at')})"
+                       if holder else "未知")
+        super().__init__(f"{owner} 等待桌面锁超过 {timeout:g}s，当前持有者: {holder_text}")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _try_lock_file(fd: int) -> bool:
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    import fcntl
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock_file(fd: int) -> None:
+    if os.name == "nt":
+        import msvcrt
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class DesktopLock:
+    """带先来先服务排队的跨进程锁（同一线程可重入）"""
+
+    def __init__(self, name: str = "desktop", lock_dir: str = DEFAULT_LOCK_DIR, poll_interval: float = 0.1):
+        """
+        Args:
+            name: 锁名称，同名锁互斥
+            lock_dir: 锁文件目录（需在所有进程间共享，默认系统临时目录）
+            poll_interval: 排队时的轮询间隔（秒）
+        """
+        self.name = name
+        self.lock_dir = lock_dir
+        self.poll_interval = poll_interval
+        self.lock_path = os.path.join(lock_dir, f"{name}.lock")
+        self.holder_path = os.path.join(lock_dir, f"{name}.holder.json")
+        self.queue_dir = os.path.join(lock_dir, f"{name}.queue")
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+        os.makedirs(self.queue_dir, exist_ok=True)
+
+    def _identity(self, owner: str) -> Dict[str, Any]:
+        return {
+            "owner": owner,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "thread": threading.current_thread().name,
+            "command": " ".join(sys.argv[:3]),
+        }
+
+    def _tickets(self) -> List[str]:
+        try:
+            return sorted(name for name in os.listdir(self.queue_dir) if name.endswith(".ticket"))
+        except FileNotFoundError:
+            return []
+
+    def _drop_stale_tickets(self, tickets: List[str]) -> List[str]:
+        """删除已退出进程遗留的票据"""
+        alive = []
+        for ticket in tickets:
+            try:
+                pid = int(ticket.split("_")[1])
+            except (IndexError, ValueError):
+                pid = None
+            if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                try:
+                    os.remove(os.path.join(self.queue_dir, ticket))
+                except OSError:
+                    pass
+                continue
+            alive.append(ticket)
+        return alive
+
+    def acquire(self, owner: str = "", timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT) -> bool:
+        """
+        排队获取锁
+
+        Args:
+            owner: 持有者描述（写入 holder 文件，便于排查）
+            timeout: 超时秒数，None 表示一直等待
+
+        Returns:
+            bool: 是否获得锁
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+            return False
+        if self._depth > 0:
+            self._depth += 1
+            return True
+
+        ticket = f"{time.time_ns():020d}_{os.getpid()}_{threading.get_ident()}.ticket"
+        ticket_path = os.path.join(self.queue_dir, ticket)
+        identity = self._identity(owner)
+        try:
+            os.makedirs(self.queue_dir, exist_ok=True)
+            _write_json(ticket_path, dict(identity, queued_at=datetime.now().isoformat()))
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            waited_logged = False
+            while True:
+                tickets = self._drop_stale_tickets(self._tickets())
+                if tickets and tickets[0] == ticket and _try_lock_file(fd):
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    return self._abandon(ticket_path)
+                if not waited_logged:
+                    holder = self.current_holder()
+                    ahead = tickets.index(ticket) if ticket in tickets else len(tickets)
+                    logger.info(f"⏳ {owner or '当前进程'} 等待桌面锁（前面还有 {ahead} 个），"
+                                f"持有者: {holder.get('owner') if holder else '无'}")
+                    waited_logged = True
+                time.sleep(self.poll_interval)
+        except Exception:
+            self._abandon(ticket_path)
+            raise
+
+        self._fd = fd
+        self._depth = 1
+        try:
+            os.remove(ticket_path)
+        except OSError:
+            pass
+        _write_json(self.holder_path, dict(identity, acquired_at=datetime.now().isoformat()))
+        return True
+
+    def _abandon(self, ticket_path: str) -> bool:
+        try:
+            os.remove(ticket_path)
+        except OSError:
+            pass
+        self._thread_lock.release()
+        return False
+
+    def release(self) -> None:
+        """释放锁（与 acquire 成对调用）"""
+        if self._depth <= 0:
+            raise RuntimeError("释放未持有的桌面锁")
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                os.remove(self.holder_path)
+            except OSError:
+                pass
+            fd, self._fd = self._fd, None
+            try:
+                _unlock_file(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    @property
+    def held(self) -> bool:
+        """当前进程是否持有锁"""
+        return self._depth > 0
+
+    def current_holder(self) -> Optional[Dict[str, Any]]:
+        """当前持有者信息（持有进程已退出时返回 None）"""
+        holder = _read_json(self.holder_path)
+        if not holder:
+            return None
+        pid = holder.get("pid")
+        if holder.get("host") == socket.gethostname() and isinstance(pid, int) and not _pid_alive(pid):
+            return None
+        return holder
+
+    def waiters(self) -> List[Dict[str, Any]]:
+        """排队中的等待者（按先后顺序）"""
+        result = []
+        for ticket in self._drop_stale_tickets(self._tickets()):
+            info = _read_json(os.path.join(self.queue_dir, ticket))
+            if info:
+                result.append(info)
+        return result
+
+    @contextmanager
+    def session(self, owner: str = "", timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT) -> Iterator[None]:
+        """获取锁的上下文，超时抛出 DesktopLockTimeout"""
+        if not self.acquire(owner, timeout):
+            raise DesktopLockTimeout(owner, timeout or 0, self.current_holder())
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_default_lock: Optional[DesktopLock] = None
+_default_lock_guard = threading.Lock()
+
+
+def get_desktop_lock() -> DesktopLock:
+    """进程内共享的桌面锁"""
+    global _default_lock
+    with _default_lock_guard:
+        if _default_lock is None:
+            _default_lock = DesktopLock()
+        return _default_lock
+
+
+def desktop_session(owner: str, timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT):
+    """在桌面锁下执行一段桌面操作：with desktop_session("wechat_v4"): ..."""
+    return get_desktop_lock().session(owner, timeout)
+
+
+def holds_desktop_lock(owner: str, failure_result: Any = False) -> Callable:
+    """
+    发送方法装饰器：在桌面锁下执行，等待超时时记录持有者并返回 failure_result
+
+    超时时间取实例 config 中的 desktop_lock_timeout（秒），未配置时为 DEFAULT_LOCK_TIMEOUT
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            config = getattr(self, "config", None)
+            timeout = DEFAULT_LOCK_TIMEOUT
+            if isinstance(config, dict) and config.get("desktop_lock_timeout") is not None:
+                timeout = float(config["desktop_lock_timeout"])
+            try:
+                with desktop_session(owner, timeout):
+                    return func(self, *args, **kwargs)
+            except DesktopLockTimeout as e:
+                logger.error(f"❌ {e}")
+                return failure_result
+        return wrapper
+    return decorator
+
+
+def main():
+    """查看桌面锁状态"""
+    parser = argparse.ArgumentParser(description="查看跨进程桌面锁状态")
+    parser.add_argument('--lock-dir', type=str, default=DEFAULT_LOCK_DIR, help='锁文件目录')
+    args = parser.parse_args()
+
+    lock = DesktopLock(lock_dir=args.lock_dir)
+    holder = lock.current_holder()
+    print(f"🔒 锁目录: {args.lock_dir}")
+    if holder:
+        print(f"持有者: {holder.get('owner')} | pid {holder.get('pid')} | 自 {holder.get('acquired_at')}"
+              f" | {holder.get('command')}")
+    else:
+        print("持有者: 无")
+    waiters = lock.waiters()
+    print(f"排队: {len(waiters)}")
+    for index, waiter in enumerate(waiters, 1):
+        print(f"  {index}. {waiter.get('owner')} | pid {waiter.get('pid')} | 排队于 {waiter.get('queued_at')}")
+
+
+if __name__ == "__main__":
+    main()
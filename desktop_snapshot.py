@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+共享进程/窗口索引
+版本：v1.1.0
+创建日期：2026-10-19
+功能：进程按 (pid, create_time)、顶层窗口按句柄建立共享索引，供多个发送器和工具共享。
+      刷新是增量的：已索引的进程只核对创建时间（PID 被复用时按新进程重新读取），只为新出现的进程读取名称、
+      只为新出现的窗口读取所属进程和类名；
+      内存、可执行文件路径、窗口标题和可见性等开销较大或易变的属性只在按名称匹配到的进程上按需读取。
+      "微信/企业微信主窗口"查询的结果会被缓存，之后每次只做句柄、进程和创建时间的有效性检查即可直接返回
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 2.0
+
+
+@dataclass
+class ProcessInfo:
+    pid: int
+    name: str
+    create_time: float
+    memory_mb: float = 0.0
+    exe: str = ""
+
+    @property
+    def key(self) -> Tuple[int, float]:
+        return (self.pid, self.create_time)
+
+
+@dataclass
+class WindowInfo:
+    hwnd: int
+    pid: int
+    class_name: str
+    title: str = ""
+    visible: bool = False
+
+
+def _load_process(pid: int) -> Optional[ProcessInfo]:
+    """读取进程的名称和创建时间（廉价属性）"""
+    import psutil
+
+    try:
+        info = psutil.Process(pid).as_dict(['name', 'create_time'], ad_value=None)
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    return ProcessInfo(pid=pid, name=info.get('name') or "", create_time=info.get('create_time') or 0.0)
+
+
+def _create_time(pid: int) -> Optional[float]:
+    """进程的创建时间，进程已退出时返回 None（无权限读取时为 0.0，与 _load_process 一致）"""
+    import psutil
+
+    try:
+        return psutil.Process(pid).create_time()
+    except (psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except psutil.AccessDenied:
+        return 0.0
+
+
+class DesktopSnapshot:
+    """增量刷新的进程/窗口索引（线程安全）"""
+
+    def __init__(self):
+        self._processes: Dict[int, ProcessInfo] = {}
+        self._windows: Dict[int, WindowInfo] = {}
+        self._window_order: List[int] = []
+        self._main_windows: Dict[tuple, Tuple[ProcessInfo, WindowInfo]] = {}
+        self._lock = threading.RLock()
+        self.taken_at = 0.0
+        self.duration = 0.0
+
+    @property
+    def processes(self) -> List[ProcessInfo]:
+        with self._lock:
+            return list(self._processes.values())
+
+    @property
+    def windows(self) -> List[WindowInfo]:
+        with self._lock:
+            return [self._windows[hwnd] for hwnd in self._window_order]
+
+    def refresh(self) -> None:
+        """增量刷新：进程列表和顶层窗口列表各遍历一次，只为新增（含 PID 被复用的）条目读取属性"""
+        started = time.perf_counter()
+        with self._lock:
+            new_processes = self._refresh_processes()
+            new_windows = self._refresh_windows()
+            self.taken_at = time.monotonic()
+        self.duration = time.perf_counter() - started
+        logger.debug(f"桌面索引刷新: {len(self._processes)} 个进程 (+{new_processes}), "
+                     f"{len(self._window_order)} 个窗口 (+{new_windows}), 耗时 {self.duration * 1000:.0f}ms")
+
+    def _refresh_processes(self) -> int:
+        import psutil
+
+        pids = set(psutil.pids())
+        for pid in [pid for pid in self._processes if pid not in pids]:
+            del self._processes[pid]
+        added = 0
+        for pid in pids:
+            known = self._processes.get(pid)
+            if known is not None:
+                # 同一 PID 的创建时间变化说明进程已退出、PID 被新进程复用，旧的名称和路径作废
+                create_time = _create_time(pid)
+                if create_time == known.create_time:
+                    continue
+                del self._processes[pid]
+                if create_time is None:
+                    continue
+            info = _load_process(pid)
+            if info is not None:
+                self._processes[pid] = info
+                added += 1
+        return added
+
+    def _refresh_windows(self) -> int:
+        try:
+            import win32gui
+            import win32process
+        except ImportError:
+            return 0
+
+        order: List[int] = []
+
+        def collect(hwnd, _):
+            order.append(hwnd)
+            return True
+
+        win32gui.EnumWindows(collect, None)
+        alive = set(order)
+        for hwnd in [hwnd for hwnd in self._windows if hwnd not in alive]:
+            del self._windows[hwnd]
+        added = 0
+        for hwnd in order:
+            if hwnd in self._windows:
+                continue
+            try:
+                _, pid = win32process.GetWindowThreadProcessId(hwnd)
+                self._windows[hwnd] = WindowInfo(hwnd=hwnd, pid=pid, class_name=win32gui.GetClassName(hwnd))
+                added += 1
+            except Exception:
+                continue
+        self._window_order = [hwnd for hwnd in order if hwnd in self._windows]
+        return added
+
+    def _validate_process(self, info: ProcessInfo, details: bool) -> Optional[ProcessInfo]:
+        """确认 PID 未被复用，并按需读取内存和可执行文件路径"""
+        import psutil
+
+        try:
+            proc = psutil.Process(info.pid)
+            with proc.oneshot():
+                if info.create_time and proc.create_time() != info.create_time:
+                    info = _load_process(info.pid)
+                    if info is None:
+                        self._processes.pop(proc.pid, None)
+                        return None
+                    self._processes[info.pid] = info
+                if details:
+                    info.memory_mb = proc.memory_info().rss / 1024 / 1024
+                    if not info.exe:
+                        try:
+                            info.exe = proc.exe() or ""
+                        except psutil.AccessDenied:
+                            pass
+            return info
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            self._processes.pop(info.pid, None)
+            return None
+        except psutil.AccessDenied:
+            return info
+
+    def find_processes(self, names: Iterable[str], exact: bool = False, details: bool = True) -> List[ProcessInfo]:
+        """
+        按进程名查找进程（不区分大小写）
+
+        Args:
+            names: 进程名列表
+            exact: True 为完整匹配，False 为包含匹配（与各发送器原逻辑一致）
+            details: 是否为匹配到的进程读取内存占用和可执行文件路径
+        """
+        lowered = [name.lower() for name in names]
+
+        def matches(info: ProcessInfo) -> bool:
+            name = info.name.lower()
+            return any(name == n if exact else n in name for n in lowered)
+
+        with self._lock:
+            found = []
+            for info in [info for info in self._processes.values() if matches(info)]:
+                info = self._validate_process(info, details)
+                if info is not None and matches(info):
+                    found.append(info)
+            return found
+
+    @staticmethod
+    def _read_window(window: WindowInfo) -> bool:
+        """重新读取易变属性（标题、可见性），同时确认句柄仍属于原进程"""
+        try:
+            import win32gui
+            import win32process
+
+            if not win32gui.IsWindow(window.hwnd):
+                return False
+            if win32process.GetWindowThreadProcessId(window.hwnd)[1] != window.pid:
+                return False
+            window.title = win32gui.GetWindowText(window.hwnd)
+            window.visible = bool(win32gui.IsWindowVisible(window.hwnd))
+            return True
+        except Exception:
+            return False
+
+    def windows_for_pid(self, pid: int, visible_only: bool = False) -> List[WindowInfo]:
+        """某进程的顶层窗口（保持 EnumWindows 的 Z 序），标题和可见性为查询时的最新值"""
+        with self._lock:
+            windows = []
+            for hwnd in self._window_order:
+                window = self._windows[hwnd]
+                if window.pid != pid:
+                    continue
+                if not self._read_window(window):
+                    del self._windows[hwnd]
+                    continue
+                if window.visible or not visible_only:
+                    windows.append(window)
+            self._window_order = [hwnd for hwnd in self._window_order if hwnd in self._windows]
+            return windows
+
+    def cached_main_window(self, key: tuple) -> Optional[Tuple[ProcessInfo, WindowInfo]]:
+        """返回仍然有效的缓存主窗口（句柄存在、属于同一进程、进程创建时间未变），否则 None"""
+        with self._lock:
+            cached = self._main_windows.get(key)
+            if cached is None:
+                return None
+            process, window = cached
+            current = self._validate_process(process, details=False)
+            if current is not None and current.key == process.key and self._read_window(window):
+                return cached
+            del self._main_windows[key]
+            return None
+
+    def find_main_window(self, process_names: Sequence[str], class_names: Sequence[str],
+                         title: Optional[str] = None, exact: bool = False) -> Optional[Tuple[ProcessInfo, WindowInfo]]:
+        """
+        查找程序主窗口
+
+        按内存从大到小遍历名称匹配的进程，在第一个拥有指定类名窗口的进程中按
+        可见（+20）、标题等于 title（+10）、标题非空（+2）打分选出主窗口。结果会被缓存，
+        再次查询时只做有效性检查
+
+        Args:
+            process_names: 进程名列表
+            class_names: 主窗口类名（不区分大小写、完整匹配）
+            title: 主窗口的标准标题（可选）
+            exact: 进程名是否完整匹配
+
+        Returns:
+            Optional[Tuple[ProcessInfo, WindowInfo]]: (主进程, 主窗口)
+        """
+        key = (tuple(process_names), tuple(class_names), title, exact)
+        cached = self.cached_main_window(key)
+        if cached is not None:
+            return cached
+
+        lowered_classes = {name.lower() for name in class_names}
+        with self._lock:
+            processes = sorted(self.find_processes(process_names, exact=exact), key=lambda p: -p.memory_mb)
+            for process in processes:
+                candidates = [w for w in self.windows_for_pid(process.pid) if w.class_name.lower() in lowered_classes]
+                if not candidates:
+                    continue
+                best = max(candidates, key=lambda w: (20 if w.visible else 0)
+                           + (10 if title is not None and w.title == title else 0)
+                           + (2 if w.title.strip() else 0))
+                self._main_windows[key] = (process, best)
+                return process, best
+        return None
+
+
+def take_snapshot() -> DesktopSnapshot:
+    """立即全量建立一个独立的索引"""
+    snapshot = DesktopSnapshot()
+    snapshot.refresh()
+    return snapshot
+
+
+_snapshot = DesktopSnapshot()
+_snapshot_lock = threading.Lock()
+
+
+def get_desktop_snapshot(max_age: float = DEFAULT_MAX_AGE) -> DesktopSnapshot:
+    """
+    获取共享索引；超过 max_age 秒才增量刷新。并发调用者等待同一次刷新完成后共享结果
+
+    Args:
+        max_age: 允许的索引最大年龄（秒），0 表示立即刷新
+    """
+    with _snapshot_lock:
+        if not _snapshot.taken_at or max_age <= 0 or time.monotonic() - _snapshot.taken_at > max_age:
+            _snapshot.refresh()
+        return _snapshot
+
+
+def find_main_window(process_names: Sequence[str], class_names: Sequence[str], title: Optional[str] = None,
+                     exact: bool = False, max_age: float = DEFAULT_MAX_AGE) -> Optional[Tuple[ProcessInfo, WindowInfo]]:
+    """
+    查找程序主窗口：缓存的结果仍然有效时直接返回（不刷新索引），否则按 max_age 刷新后重新查找
+
+    参数含义见 DesktopSnapshot.find_main_window
+    """
+    key = (tuple(process_names), tuple(class_names), title, exact)
+    cached = _snapshot.cached_main_window(key)
+    if cached is not None:
+        return cached
+    return get_desktop_snapshot(max_age).find_main_window(process_names, class_names, title, exact)
+
+
+def invalidate_desktop_snapshot() -> None:
+    """下次查询时强制刷新（例如刚启动/关闭了目标程序），同时丢弃缓存的主窗口"""
+    with _snapshot_lock:
+        with _snapshot._lock:
+            _snapshot.taken_at = 0.0
+            _snapshot._main_windows.clear()
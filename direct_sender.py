@@ -16,8 +16,10 @@ import os
 import logging
 from datetime import datetime
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from logging_setup import setup_logging
+from desktop_lock import holds_desktop_lock
+from window_activation import activate_window
+
 logger = logging.getLogger(__name__)
 
 class DirectSender:
@@ -39,25 +41,14 @@ class DirectSender:
             window_class = win32gui.GetClassName(hwnd)
             logger.info(f"激活窗口: {window_title} (类: {window_class})")
             
-            # 检查窗口是否最小化
-            if win32gui.IsIconic(hwnd):
-                logger.info("窗口已最小化，正在恢复...")
-                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                time.sleep(0.5)
-            
-            # 激活窗口
-            win32gui.SetForegroundWindow(hwnd)
-            time.sleep(0.5)
-            
-            # 验证窗口是否成功激活
-            current_hwnd = win32gui.GetForegroundWindow()
-            if current_hwnd == hwnd:
-                logger.info("✅ 窗口激活成功")
-                return True
+            # 激活窗口：到达前台即返回，最多等待 3 秒
+            result = activate_window(hwnd, sender="direct")
+            if result.success:
+                logger.info(f"✅ 窗口激活{result.describe()}")
             else:
-                logger.warning(f"窗口激活可能失败，当前前台窗口: {current_hwnd}")
-                return True  # 继续尝试，可能仍然可用
-                
+                logger.warning(f"窗口激活可能{result.describe()}，当前前台窗口: {win32gui.GetForegroundWindow()}")
+            return True  # 继续尝试，可能仍然可用
+
         except Exception as e:
             logger.error(f"激活窗口失败: {e}")
             return False
@@ -86,6 +77,7 @@ class DirectSender:
             logger.error(f"获取窗口中心失败: {e}")
             return None, None
     
+    @holds_desktop_lock("direct_sender")
     def send_message_to_window(self, hwnd, message):
         """直接向指定窗口句柄发送消息"""
         try:
@@ -284,6 +276,7 @@ def main():
     """主程序入口"""
     import sys
     
+    setup_logging()
     sender = DirectSender()
     
     if len(sys.argv) < 2:
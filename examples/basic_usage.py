@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from direct_sender import DirectSender
 from window_inspector import WindowInspector
+from logging_setup import setup_logging
 
 def example_1_find_wechat_windows():
     """示例1: 查找微信窗口"""
@@ -101,6 +102,7 @@ def example_4_custom_automation():
 
 def main():
     """主菜单"""
+    setup_logging()
     while True:
         print("\n" + "="*50)
         print("🤖 wxbot 使用示例")
@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from direct_sender import DirectSender
 from window_inspector import WindowInspector
+from logging_setup import setup_logging
 
 class ScheduledBot:
     def __init__(self):
@@ -198,6 +199,7 @@ def interactive_test(bot):
 
 def main():
     """主程序"""
+    setup_logging()
     print("🤖 wxbot 定时消息发送器")
     print("=" * 50)
     
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+发送失败现场快照
+版本：v1.0.0
+创建日期：2026-10-19
+功能：在内存中用环形缓冲保存当前发送过程最近 N 帧截图（zlib 压缩），
+      发送失败时交给后台写线程异步落盘到按日期划分的目录，连同 OCR 结果和区域坐标一起保存，
+      并按总大小和保存天数清理旧快照
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "failure_snapshots")
+
+
+@dataclass
+class SnapshotFrame:
+    label: str
+    timestamp: float
+    mode: str
+    size: Tuple[int, int]
+    data: bytes
+    region: Optional[Tuple[int, int, int, int]] = None
+    ocr: List[Dict[str, Any]] = field(default_factory=list)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_image(self):
+        from PIL import Image
+
+        return Image.frombytes(self.mode, self.size, zlib.decompress(self.data))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "time": datetime.fromtimestamp(self.timestamp).isoformat(timespec="milliseconds"),
+            "size": list(self.size),
+            "region": list(self.region) if self.region else None,
+            "ocr": self.ocr,
+            "extra": self.extra,
+        }
+
+
+def _describe_matches(matches) -> List[Dict[str, Any]]:
+    described = []
+    for item in matches or []:
+        described.append({
+            "text": getattr(item, "text", str(item)),
+            "score": round(float(getattr(item, "score", 0.0)), 4),
+            "box": [list(point) for point in getattr(item, "box", [])],
+        })
+    return described
+
+
+def _slugify(value: str) -> str:
+    slug = re.sub(r'[\\/:*?"<>|\s]+', "_", str(value)).strip("_")
+    return slug[:40] or "send"
+
+
+class SnapshotWriter:
+    """后台写快照线程，负责落盘和保留策略"""
+
+    def __init__(self, base_dir: str = DEFAULT_SNAPSHOT_DIR,
+                 max_total_mb: float = 200.0, max_age_days: float = 7.0):
+        self.base_dir = base_dir
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 86400
+        self._queue: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="wxbot-snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit_bundle(self, frames: List[SnapshotFrame], context: Dict[str, Any], reason: str) -> str:
+        """
+        提交一组失败快照，立即返回目标目录（实际写入在后台完成）
+
+        Returns:
+            str: 快照目录
+        """
+        now = datetime.now()
+        directory = os.path.join(
+            self.base_dir, now.strftime("%Y%m%d"),
+            f"{now.strftime('%H%M%S_%f')[:10]}_{_slugify(context.get('group', 'send'))}",
+        )
+        self._queue.put(("bundle", (directory, list(frames), dict(context), reason)))
+        return directory
+
+    def submit_image(self, image, path: str) -> str:
+        """异步保存单张图片（调试命令使用）"""
+        self._queue.put(("image", (image.copy(), path)))
+        return path
+
+    def close(self, timeout: float = 10.0) -> None:
+        """等待队列中的写入任务完成"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            kind, payload = task
+            try:
+                if kind == "bundle":
+                    self._write_bundle(*payload)
+                    self.enforce_retention()
+                elif kind == "image":
+                    image, path = payload
+                    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                    image.save(path)
+            except Exception as e:
+                logger.error(f"写入快照失败: {e}")
+
+    def _write_bundle(self, directory: str, frames: List[SnapshotFrame],
+                      context: Dict[str, Any], reason: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        described = []
+        for index, frame in enumerate(frames):
+            file_name = f"{index:02d}_{_slugify(frame.label)}.png"
+            frame.to_image().save(os.path.join(directory, file_name))
+            described.append(dict(frame.describe(), file=file_name))
+        meta = {"reason": reason, "context": context, "frames": described}
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"📸 失败快照已保存: {directory} ({len(frames)} 帧)")
+
+    def enforce_retention(self) -> None:
+        """删除过期快照，并在总大小超限时从最旧的开始删除"""
+        if not os.path.isdir(self.base_dir):
+            return
+        bundles = []
+        for day in sorted(os.listdir(self.base_dir)):
+            day_dir = os.path.join(self.base_dir, day)
+            if not os.path.isdir(day_dir):
+                continue
+            for name in sorted(os.listdir(day_dir)):
+                path = os.path.join(day_dir, name)
+                if not os.path.isdir(path):
+                    continue
+                size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+                bundles.append((os.path.getmtime(path), path, size))
+
+        bundles.sort()
+        total = sum(size for _, _, size in bundles)
+        now = time.time()
+        for mtime, path, size in bundles:
+            if now - mtime <= self.max_age_seconds and total <= self.max_total_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logger.info(f"🧹 清理旧快照: {path}")
+
+        for day in os.listdir(self.base_dir):
+            day_dir = os.path.join(self.base_dir, day)
+            if os.path.isdir(day_dir) and not os.listdir(day_dir):
+                os.rmdir(day_dir)
+
+
+class SnapshotRing:
+    """当前发送过程的截图环形缓冲"""
+
+    def __init__(self, capacity: int = 12, writer: Optional[SnapshotWriter] = None):
+        self.capacity = max(1, int(capacity))
+        self.writer = writer
+        self._frames: Deque[SnapshotFrame] = deque(maxlen=self.capacity)
+        self._context: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, **context: Any) -> None:
+        """开始一次新的发送，丢弃上一次的帧"""
+        with self._lock:
+            self._frames.clear()
+            self._context = dict(context, started_at=datetime.now().isoformat())
+
+    def capture(self, label: str, image, region: Optional[Tuple[int, int, int, int]] = None,
+                matches=None, **extra: Any) -> None:
+        """压缩保存一帧（只在内存中）"""
+        try:
+            frame = SnapshotFrame(
+                label=label,
+                timestamp=time.time(),
+                mode=image.mode,
+                size=image.size,
+                data=zlib.compress(image.tobytes(), 1),
+                region=tuple(region) if region else None,
+                ocr=_describe_matches(matches),
+                extra=extra,
+            )
+        except Exception as e:
+            logger.debug(f"记录快照帧失败: {e}")
+            return
+        with self._lock:
+            self._frames.append(frame)
+
+    @property
+    def frames(self) -> List[SnapshotFrame]:
+        with self._lock:
+            return list(self._frames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self._context = {}
+
+    def flush(self, reason: str) -> Optional[str]:
+        """
+        把当前帧交给后台线程写盘，并清空缓冲
+
+        Args:
+            reason: 失败原因
+
+        Returns:
+            Optional[str]: 快照目录，没有帧或没有写线程时返回 None
+        """
+        with self._lock:
+            frames = list(self._frames)
+            context = dict(self._context)
+            self._frames.clear()
+        if not frames or self.writer is None:
+            return None
+        return self.writer.submit_bundle(frames, context, reason)
+
+
+_default_writers: Dict[str, SnapshotWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_snapshot_writer(base_dir: str = DEFAULT_SNAPSHOT_DIR, max_total_mb: float = 200.0,
+                        max_age_days: float = 7.0) -> SnapshotWriter:
+    """按目录共享写线程，进程退出时等待剩余快照写完"""
+    key = os.path.abspath(base_dir)
+    with _writers_lock:
+        writer = _default_writers.get(key)
+        if writer is None:
+            writer = SnapshotWriter(base_dir, max_total_mb, max_age_days)
+            _default_writers[key] = writer
+        return writer
+
+
+def _close_writers() -> None:
+    for writer in list(_default_writers.values()):
+        writer.close()
+
+
+atexit.register(_close_writers)
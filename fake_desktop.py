@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+模拟桌面发送器
+版本：v1.0.0
+创建日期：2026-10-19
+功能：不操作真实窗口的发送器实现，用于在 Linux / CI 上测试服务、队列、限流和桌面锁。
+      可配置初始化耗时、单次发送耗时、失败群聊，已发送的消息保存在内存中并可追加写入 JSONL 文件
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from desktop_lock import holds_desktop_lock
+from message_sender_interface import MessageSenderInterface
+
+logger = logging.getLogger(__name__)
+
+
+class FakeDesktopSender(MessageSenderInterface):
+    """模拟发送器
+
+    配置项：
+        init_delay: 初始化耗时（秒），模拟导入/发现窗口/加载 OCR 的冷启动成本
+        send_delay: 单次发送耗时（秒）
+        fail_groups: 总是发送失败的群聊名称列表
+        unavailable: 为 True 时初始化失败
+        outbox: 已发送消息追加写入的 JSONL 文件路径（可选）
+    """
+
+    def __init__(self, config: Dict[str, Any] = None):
+        super().__init__(config)
+        self.sender_type = "fake"
+        self.current_group = None
+        self.sent_messages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def initialize(self) -> bool:
+        if self.config.get("unavailable"):
+            logger.warning("模拟发送器配置为不可用")
+            return False
+        time.sleep(float(self.config.get("init_delay", 0.0)))
+        self.is_initialized = True
+        logger.info("✅ 模拟发送器初始化完成")
+        return True
+
+    def find_target_process(self) -> bool:
+        return not self.config.get("unavailable")
+
+    def activate_application(self) -> bool:
+        return self.is_initialized
+
+    def search_group(self, group_name: str) -> bool:
+        if not self.is_initialized:
+            return False
+        self.current_group = group_name
+        return True
+
+    @holds_desktop_lock("fake")
+    def send_message(self, message: str, target_group: str = None) -> bool:
+        target_group = target_group or self.config.get("default_group", "")
+        if not self.search_group(target_group):
+            return False
+        time.sleep(float(self.config.get("send_delay", 0.0)))
+        if target_group in self.config.get("fail_groups", []):
+            logger.error(f"❌ 模拟发送失败: {target_group}")
+            return False
+
+        record = {"group": target_group, "message": message, "time": datetime.now().isoformat()}
+        with self._lock:
+            self.sent_messages.append(record)
+            outbox = self.config.get("outbox")
+            if outbox:
+                os.makedirs(os.path.dirname(os.path.abspath(outbox)), exist_ok=True)
+                with open(outbox, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        logger.info(f"✅ 模拟发送到: {target_group}")
+        return True
+
+    def cleanup(self) -> bool:
+        self.is_initialized = False
+        return True
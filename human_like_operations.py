@@ -4,21 +4,35 @@
 避免被企业微信风控系统检测到
 """
 
+import logging
 import time
 import random
 import pyautogui
 import pyperclip
 import math
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional
+
+from keystroke_timeline import TimelineReport, TypingModel, run_timeline
+
+logger = logging.getLogger(__name__)
 
 class HumanLikeOperations:
     """人性化操作类"""
 
-    def __init__(self):
+    def __init__(self, typing_seed: Optional[int] = None, typing_settings: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            typing_seed: 打字模型的随机种子（便于复现按键时间表），None 表示随机
+            typing_settings: 覆盖 keystroke_timeline.DEFAULT_TYPING_SETTINGS 的打字模型参数（发送器配置的 typing 段）
+        """
         # 禁用pyautogui的failsafe，但保留人工安全检查
         pyautogui.FAILSAFE = False
         pyautogui.PAUSE = 0
 
+        # 短文本按预先生成的按键时间表输入
+        self.typing_model = TypingModel(typing_settings, seed=typing_seed)
+        self.last_typing_report: Optional[TimelineReport] = None
+
     def human_delay(self, base_time: float = 1.0, variance: float = 0.3) -> None:
         """
         人性化延迟 - 模拟真人的不规律停顿
@@ -91,13 +105,20 @@ class HumanLikeOperations:
         # 按键后停顿
         self.human_delay(0.3, 0.1)
 
-    def human_type_text(self, text: str, use_clipboard: bool = True) -> None:
+    def _paste(self, text: str) -> None:
+        pyperclip.copy(text)
+        pyautogui.hotkey('ctrl', 'v')
+
+    def human_type_text(self, text: str, use_clipboard: bool = True) -> Optional[TimelineReport]:
         """
         人性化文本输入
 
         Args:
             text: 要输入的文本
             use_clipboard: 是否使用剪贴板（长文本推荐）
+
+        Returns:
+            Optional[TimelineReport]: 逐键输入时的计划/实际耗时，走剪贴板时为 None
         """
         if use_clipboard and len(text) > 20:
             # 长文本使用剪贴板，但添加人性化元素
@@ -114,12 +135,15 @@ class HumanLikeOperations:
             # 粘贴
             pyautogui.hotkey('ctrl', 'v')
             self.human_delay(0.5, 0.2)
-        else:
-            # 短文本模拟打字
-            for char in text:
-                pyautogui.write(char)
-                # 打字速度随机化
-                self.human_delay(0.05, 0.03)
+            return None
+
+        # 短文本模拟打字：整段的击键间隔按打字模型预先生成（随前后键位变化），再按时间表精确执行；
+        # 中文等不能直接击键的字符段直接粘贴
+        timeline = self.typing_model.plan(text)
+        report = run_timeline(timeline, press=pyautogui.press, paste=self._paste)
+        self.last_typing_report = report
+        logger.debug(f"键入 {len(text)} 个字符: {report.describe()}")
+        return report
 
     def human_search_and_enter(self, search_text: str) -> None:
         """
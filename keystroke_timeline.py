@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+预计算的按键时间线
+版本：v1.0.0
+创建日期：2026-10-19
+功能：按真人打字模型一次性生成整段文本的按键时间表（击键间隔服从对数正态分布，按前后两个键的
+      左右手 / 手指 / 行距调整，可设随机种子复现），再由紧凑的输入循环配合精确睡眠按时间表执行，
+      报告计划耗时与实际耗时。不能直接击键的字符（中文等）合并为一次粘贴
+"""
+
+import math
+import random
+import string
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 默认按熟练打字者校准（约 100 词/分钟）：8 个字母的群名计划耗时约 0.5s
+DEFAULT_TYPING_SETTINGS = {
+    "median_interval": 0.06,        # 同手不同指两个小写字母之间的中位击键间隔（秒）
+    "sigma": 0.3,                   # 对数正态分布的形状参数
+    "min_interval": 0.02,
+    "max_interval": 0.35,
+    "shift_penalty": 0.03,          # 需要 Shift 的字符额外耗时
+    "word_pause_probability": 0.04, # 空格后停顿思考的概率
+    "word_pause_median": 0.25,
+    "paste_median": 0.05,           # 粘贴段与前一次输入之间的中位间隔（不模拟输入法拼写耗时）
+}
+
+# 两个键之间的间隔倍率
+DIGRAPH_FACTORS = {
+    "repeat": 0.95,       # 同一个键连按
+    "alternate": 0.80,    # 左右手交替
+    "same_hand": 1.00,    # 同手不同指
+    "same_finger": 1.40,  # 同指不同键
+    "space": 0.95,        # 涉及拇指（空格）
+    "unknown": 1.10,      # 不在键位表中的字符
+}
+ROW_JUMP_PENALTY = 0.15  # 同手跨两行以上
+
+# 标准指法：列 → 手指（0-3 左手小指→食指，6-9 右手食指→小指），数字行整体左移一列
+_FINGERS_BY_COLUMN = (0, 1, 2, 3, 3, 6, 6, 7, 8, 9, 9, 9, 9)
+_ROWS = (("`1234567890-=", -1), ("qwertyuiop[]\\", 0), ("asdfghjkl;'", 0), ("zxcvbnm,./", 0))
+_SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+TYPEABLE_CHARS = frozenset(string.ascii_letters + string.digits + string.punctuation + " \t\n")
+
+
+def _build_key_positions() -> Dict[str, Tuple[int, int]]:
+    positions = {}
+    for row, (keys, offset) in enumerate(_ROWS):
+        for column, key in enumerate(keys):
+            finger = _FINGERS_BY_COLUMN[min(max(column + offset, 0), len(_FINGERS_BY_COLUMN) - 1)]
+            positions[key] = (finger, row)
+    return positions
+
+
+_KEY_POSITIONS = _build_key_positions()
+
+
+def key_position(char: str) -> Optional[Tuple[int, int, bool]]:
+    """字符的 (手指, 行, 是否需要 Shift)，不在键位表中时返回 None"""
+    shifted = char.isupper() or char in _SHIFTED
+    base = _SHIFTED.get(char, char.lower())
+    position = _KEY_POSITIONS.get(base)
+    if position is None:
+        return None
+    return position[0], position[1], shifted
+
+
+def digraph_factor(previous: str, current: str) -> float:
+    """前后两个字符的击键间隔倍率"""
+    if previous.lower() == current.lower():
+        return DIGRAPH_FACTORS["repeat"]
+    if previous.isspace() or current.isspace():
+        return DIGRAPH_FACTORS["space"]
+    first, second = key_position(previous), key_position(current)
+    if first is None or second is None:
+        return DIGRAPH_FACTORS["unknown"]
+    if (first[0] < 5) != (second[0] < 5):
+        return DIGRAPH_FACTORS["alternate"]
+    factor = DIGRAPH_FACTORS["same_finger"] if first[0] == second[0] else DIGRAPH_FACTORS["same_hand"]
+    if abs(first[1] - second[1]) >= 2:
+        factor += ROW_JUMP_PENALTY
+    return factor
+
+
+@dataclass
+class KeyEvent:
+    offset: float  # 相对开始时刻的秒数
+    text: str
+    paste: bool = False
+
+
+@dataclass
+class KeystrokeTimeline:
+    events: List[KeyEvent]
+
+    @property
+    def planned_duration(self) -> float:
+        return self.events[-1].offset if self.events else 0.0
+
+
+class TypingModel:
+    """真人打字模型：给定种子时同一段文本总是生成相同的时间表"""
+
+    def __init__(self, settings: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        self.settings = dict(DEFAULT_TYPING_SETTINGS)
+        self.settings.update(settings or {})
+        self.random = random.Random(seed)
+
+    def _lognormal(self, median: float) -> float:
+        return self.random.lognormvariate(math.log(median), float(self.settings["sigma"]))
+
+    def interval(self, previous: str, current: str) -> float:
+        """previous 之后按下 current 的间隔"""
+        settings = self.settings
+        gap = self._lognormal(float(settings["median_interval"]) * digraph_factor(previous, current))
+        position = key_position(current)
+        if position is not None and position[2]:
+            gap += float(settings["shift_penalty"])
+        gap = min(max(gap, float(settings["min_interval"])), float(settings["max_interval"]))
+        if previous == " " and self.random.random() < float(settings["word_pause_probability"]):
+            gap += self._lognormal(float(settings["word_pause_median"]))
+        return gap
+
+    def plan(self, text: str, typeable: Callable[[str], bool] = TYPEABLE_CHARS.__contains__) -> KeystrokeTimeline:
+        """
+        生成整段文本的按键时间表
+
+        Args:
+            text: 要输入的文本
+            typeable: 判断字符能否直接击键；连续的不可击键字符合并为一次粘贴
+        """
+        segments: List[Tuple[str, bool]] = []
+        for char in text:
+            if typeable(char):
+                segments.append((char, False))
+            elif segments and segments[-1][1]:
+                segments[-1] = (segments[-1][0] + char, True)
+            else:
+                segments.append((char, True))
+
+        events: List[KeyEvent] = []
+        offset = 0.0
+        for segment, paste in segments:
+            if events and paste:
+                offset += self._lognormal(float(self.settings["paste_median"]))
+            elif events:
+                offset += self.interval(events[-1].text[-1], segment)
+            events.append(KeyEvent(offset, segment, paste))
+        return KeystrokeTimeline(events)
+
+
+class PreciseSleeper:
+    """
+    精确睡眠：先用 time.sleep 睡到离目标时刻 spin_threshold 以内，剩余部分自旋等待
+
+    Windows 上进入上下文时把系统计时器精度提高到 1ms（timeBeginPeriod），退出时恢复
+    """
+
+    def __init__(self, spin_threshold: Optional[float] = None, clock: Callable[[], float] = time.perf_counter):
+        self.spin_threshold = spin_threshold
+        self.clock = clock
+        self._period_set = False
+
+    def __enter__(self) -> "PreciseSleeper":
+        if sys.platform == "win32":
+            try:
+                import ctypes
+
+                self._period_set = ctypes.windll.winmm.timeBeginPeriod(1) == 0
+            except Exception:
+                self._period_set = False
+        if self.spin_threshold is None:
+            # 未能提高精度时 Windows 的 sleep 粒度约 15.6ms
+            coarse = sys.platform == "win32" and not self._period_set
+            self.spin_threshold = 0.02 if coarse else 0.002
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._period_set:
+            import ctypes
+
+            ctypes.windll.winmm.timeEndPeriod(1)
+            self._period_set = False
+        return False
+
+    def sleep_until(self, deadline: float) -> None:
+        threshold = self.spin_threshold if self.spin_threshold is not None else 0.002
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return
+            if remaining > threshold:
+                time.sleep(remaining - threshold)
+
+
+@dataclass
+class TimelineReport:
+    planned: float
+    actual: float
+    max_lag: float  # 按键实际时刻晚于计划时刻的最大值
+    events: int
+
+    def describe(self) -> str:
+        return (f"{self.events} 次输入，计划 {self.planned * 1000:.0f}ms，实际 {self.actual * 1000:.0f}ms，"
+                f"最大滞后 {self.max_lag * 1000:.1f}ms")
+
+
+def run_timeline(timeline: KeystrokeTimeline, press: Callable[[str], None], paste: Callable[[str], None],
+                 sleeper: Optional[PreciseSleeper] = None) -> TimelineReport:
+    """
+    按时间表执行输入
+
+    Args:
+        timeline: 预先生成的时间表
+        press: 击键函数（单个字符）
+        paste: 粘贴函数（不可击键的字符段）
+        sleeper: 精确睡眠器，默认新建 PreciseSleeper
+    """
+    sleeper = sleeper or PreciseSleeper()
+    max_lag = 0.0
+    with sleeper:
+        clock = sleeper.clock
+        started = clock()
+        for event in timeline.events:
+            due = started + event.offset
+            sleeper.sleep_until(due)
+            max_lag = max(max_lag, clock() - due)
+            (paste if event.paste else press)(event.text)
+        actual = clock() - started
+    return TimelineReport(timeline.planned_duration, actual, max_lag, len(timeline.events))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+统一日志配置
+版本：v1.0.0
+创建日期：2026-10-19
+功能：基于 QueueHandler/QueueListener 的非阻塞日志管道。
+      自动化线程只把日志记录放入内存队列，由后台线程写入滚动文件（JSON 结构化）和控制台，
+      避免磁盘/杀毒软件扫描带来的写入延迟进入点击/输入时序
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 通过 logger.info(..., extra={...}) 传入、会写入 JSON 日志的结构化字段
+STRUCTURED_FIELDS = ("send_id", "sender", "group", "stage", "duration", "attempt", "result",
+                     "rate_wait", "rate_limit")
+
+DEFAULT_LOGGING_SETTINGS = {
+    "level": "INFO",
+    "json": True,
+    "max_bytes": 10 * 1024 * 1024,
+    "backup_count": 5,
+    "rotate_when": None,
+    "console": True,
+    "module_levels": {},
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    保留异常字段的 QueueHandler
+
+    标准实现在入队前把堆栈格式化进 msg 并清空 exc_info/exc_text，JsonFormatter 就拿不到异常；
+    这里只把堆栈预先格式化为 exc_text（traceback 对象不能跨线程保留），msg 仍是原始消息
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _build_file_handler(log_file: str, settings: Dict[str, Any]) -> logging.Handler:
+    """按配置创建按大小或按时间滚动的文件处理器"""
+    if settings.get("rotate_when"):
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=settings["rotate_when"],
+            backupCount=int(settings.get("backup_count", 5)), encoding="utf-8",
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=int(settings.get("max_bytes", 0)),
+            backupCount=int(settings.get("backup_count", 5)), encoding="utf-8",
+        )
+    handler.setFormatter(JsonFormatter() if settings.get("json", True) else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def load_logging_settings(config_file: str = "auto_report_config.json") -> Dict[str, Any]:
+    """读取配置文件中的 logging 段，缺失的键使用默认值"""
+    settings = dict(DEFAULT_LOGGING_SETTINGS)
+    try:
+        with open(config_file, "r", encoding="utf-8") as file:
+            settings.update(json.load(file).get("logging", {}))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"读取日志配置失败，使用默认配置: {e}", file=sys.stderr)
+    return settings
+
+
+def setup_logging(log_file: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> None:
+    """
+    安装全局日志管道（可重复调用，后一次调用会替换前一次的配置）
+
+    Args:
+        log_file: 日志文件路径，None 表示只输出到控制台
+        settings: 日志设置，键同 DEFAULT_LOGGING_SETTINGS
+    """
+    global _listener, _queue_handler
+
+    merged = dict(DEFAULT_LOGGING_SETTINGS)
+    merged.update(settings or {})
+
+    shutdown_logging()
+
+    handlers = []
+    if merged.get("console", True):
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console)
+    if log_file:
+        handlers.append(_build_file_handler(log_file, merged))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    _queue_handler = StructuredQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(str(merged.get("level", "INFO")).upper())
+
+    for module_name, level in (merged.get("module_levels") or {}).items():
+        logging.getLogger(module_name).setLevel(str(level).upper())
+
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """停止后台写日志线程并刷出队列中剩余的记录"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
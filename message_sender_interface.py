@@ -8,6 +8,7 @@
 
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
+import importlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -93,6 +94,28 @@ class MessageSenderInterface(ABC):
         """
         pass
     
+    def refresh_standby(self) -> bool:
+        """
+        热备刷新：在不抢占前台的前提下确认目标程序仍可立即发送（由后台热备线程低频调用）
+        
+        Returns:
+            bool: 是否处于可立即发送的状态
+        """
+        return self.find_target_process()
+
+    def bind_instance(self, pid: int, hwnd: int) -> bool:
+        """
+        绑定到指定的程序实例（同一台机器运行多个账号时由发送器池调用），之后只操作该实例、不再查找其他实例
+
+        Args:
+            pid: 实例进程ID
+            hwnd: 实例主窗口句柄
+
+        Returns:
+            bool: 发送器是否支持绑定
+        """
+        return False
+
     def get_sender_info(self) -> Dict[str, Any]:
         """
         获取发送器信息
@@ -153,6 +176,7 @@ class MessageSenderFactory:
     """消息发送器工厂类"""
     
     _senders = {}
+    _lazy_senders = {}
     
     @classmethod
     def register_sender(cls, sender_type: str, sender_class: type):
@@ -164,8 +188,45 @@ class MessageSenderFactory:
             sender_class: 发送器类
         """
         cls._senders[sender_type] = sender_class
+        cls._lazy_senders.pop(sender_type, None)
         logger.info(f"已注册消息发送器: {sender_type}")
     
+    @classmethod
+    def register_lazy_sender(cls, sender_type: str, import_path: str):
+        """
+        以字符串形式注册消息发送器，首次创建时才导入模块
+        
+        用于避免 config/status 等命令在启动时导入 pyautogui、win32、psutil 等重依赖。
+        
+        Args:
+            sender_type: 发送器类型名称
+            import_path: "模块名:类名"，例如 "wechat_sender_v3:WeChatSenderV3"
+        """
+        if ":" not in import_path:
+            raise ValueError(f"发送器导入路径格式应为 '模块:类名': {import_path}")
+        if sender_type in cls._senders:
+            return
+        cls._lazy_senders[sender_type] = import_path
+        logger.debug(f"已登记延迟加载发送器: {sender_type} -> {import_path}")
+    
+    @classmethod
+    def _resolve_sender_class(cls, sender_type: str) -> Optional[type]:
+        """获取发送器类，必要时导入延迟注册的模块"""
+        if sender_type in cls._senders:
+            return cls._senders[sender_type]
+        
+        import_path = cls._lazy_senders.get(sender_type)
+        if not import_path:
+            return None
+        
+        module_name, class_name = import_path.split(":", 1)
+        module = importlib.import_module(module_name)
+        sender_class = getattr(module, class_name)
+        cls._senders[sender_type] = sender_class
+        cls._lazy_senders.pop(sender_type, None)
+        logger.info(f"已加载延迟注册的发送器: {sender_type}")
+        return sender_class
+    
     @classmethod
     def create_sender(cls, sender_type: str, config: Dict[str, Any] = None) -> Optional[MessageSenderInterface]:
         """
@@ -178,12 +239,12 @@ class MessageSenderFactory:
         Returns:
             MessageSenderInterface: 发送器实例，如果类型不存在则返回None
         """
-        if sender_type not in cls._senders:
+        if sender_type not in cls._senders and sender_type not in cls._lazy_senders:
             logger.error(f"未知的发送器类型: {sender_type}")
             return None
         
         try:
-            sender_class = cls._senders[sender_type]
+            sender_class = cls._resolve_sender_class(sender_type)
             return sender_class(config)
         except Exception as e:
             logger.error(f"创建发送器失败: {e}")
@@ -197,7 +258,9 @@ class MessageSenderFactory:
         Returns:
             List[str]: 发送器类型列表
         """
-        return list(cls._senders.keys())
+        return list(cls._senders.keys()) + [
+            sender_type for sender_type in cls._lazy_senders if sender_type not in cls._senders
+        ]
 
 
 # 发送结果枚举
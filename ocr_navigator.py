@@ -0,0 +1,497 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 界面导航
+版本：v1.0.0
+创建日期：2026-10-19
+功能：个人微信 v4 与企业微信发送器共用的 OCR 基础设施：
+      进程内共享的 PaddleOCR 识别器（模型只加载一次），并按截图内容缓存识别结果；
+      以窗口相对比例描述的区域/锚点标定、搜索结果行定位、聊天标题复核，
+      以及轮询界面直到目标状态出现的等待，替代固定延时
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import wxbot_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# numpy / paddleocr 体积较大，推迟到首次使用时再导入，
+# 避免 test、debug 等命令在冷启动时就支付 OCR 模型栈的导入成本。
+_OCR_IMPORTS: Optional[Tuple[Any, Any]] = None
+
+
+def _import_ocr_stack() -> Tuple[Any, Any]:
+    """按需导入 (PaddleOCR, numpy)，缺失时返回 (None, None)。"""
+    global _OCR_IMPORTS
+    if _OCR_IMPORTS is None:
+        try:
+            import numpy as np
+            from paddleocr import PaddleOCR
+            _OCR_IMPORTS = (PaddleOCR, np)
+        except ImportError:  # pragma: no cover - optional dependency
+            _OCR_IMPORTS = (None, None)
+    return _OCR_IMPORTS
+
+
+@dataclass
+class OCRMatch:
+    text: str
+    score: float
+    box: List[Tuple[float, float]]
+
+
+class PaddleOCRRecognizer:
+    """对固定区域截图执行 OCR；内容完全相同的截图直接返回缓存的识别结果。"""
+
+    def __init__(self, use_angle_cls: bool = False, lang: str = "ch", cache_size: int = 64):
+        self.use_angle_cls = use_angle_cls
+        self.lang = lang
+        self.cache_size = cache_size
+        self._ocr = None
+        self._np = None
+        self._loaded = False
+        self._available = False
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple, List[OCRMatch]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def available(self) -> bool:
+        """首次访问时才加载 PaddleOCR 模型。"""
+        with self._lock:
+            if not self._loaded:
+                self._load_engine()
+        return self._available
+
+    def _load_engine(self) -> None:
+        self._loaded = True
+        paddle_ocr_cls, np = _import_ocr_stack()
+        if paddle_ocr_cls is None or np is None:
+            return
+        try:
+            self._ocr = paddle_ocr_cls(use_angle_cls=self.use_angle_cls, lang=self.lang, show_log=False)
+            self._np = np
+            self._available = True
+        except Exception as exc:
+            logger.error("初始化 PaddleOCR 失败: %s", exc)
+
+    @staticmethod
+    def _cache_key(image) -> Tuple:
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).digest()
+        return image.mode, image.size, digest
+
+    def recognize(self, image) -> List[OCRMatch]:
+        if not self.available or self._ocr is None:
+            raise RuntimeError("PaddleOCR 不可用，请先安装 paddleocr 和 numpy")
+
+        rgb = image.convert("RGB")
+        key = self._cache_key(rgb)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return list(cached)
+            self.cache_misses += 1
+            # PaddleOCR 推理不是线程安全的，同一识别器上的调用串行执行
+            result = self._ocr.ocr(self._np.array(rgb), cls=False)
+
+        matches: List[OCRMatch] = []
+        if result:
+            lines = result[0] if isinstance(result[0], list) else result
+            for item in lines or []:
+                if not item or len(item) < 2:
+                    continue
+                box = item[0]
+                text, score = item[1]
+                matches.append(
+                    OCRMatch(
+                        text=str(text).strip(),
+                        score=float(score),
+                        box=[(float(x), float(y)) for x, y in box],
+                    )
+                )
+
+        with self._lock:
+            self._cache[key] = matches
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(matches)
+
+
+_recognizers: Dict[Tuple[bool, str], PaddleOCRRecognizer] = {}
+_recognizers_lock = threading.Lock()
+
+
+def get_shared_recognizer(use_angle_cls: bool = False, lang: str = "ch") -> PaddleOCRRecognizer:
+    """进程内共享的识别器：同一参数组合只加载一次模型，识别结果缓存也由所有发送器共享"""
+    key = (bool(use_angle_cls), lang)
+    with _recognizers_lock:
+        recognizer = _recognizers.get(key)
+        if recognizer is None:
+            recognizer = PaddleOCRRecognizer(use_angle_cls=use_angle_cls, lang=lang)
+            _recognizers[key] = recognizer
+        return recognizer
+
+
+def normalize_text(value: str) -> str:
+    return "".join(str(value).strip().lower().split())
+
+
+def normalize_chat_title(value: str) -> str:
+    """去掉群标题末尾的成员数，如 "蓝光统计(12)" → "蓝光统计" """
+    return re.sub(r"[\(（]\d+[\)）]$", "", normalize_text(value))
+
+
+def box_bounds(box: List[Tuple[float, float]]) -> Tuple[int, int, int, int]:
+    xs = [int(point[0]) for point in box]
+    ys = [int(point[1]) for point in box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def clamp(value: int, lower: int, upper: int) -> int:
+    return max(lower, min(value, upper))
+
+
+DEFAULT_RESULT_TUNING = {
+    "left_expand_ratio": 1.8,
+    "left_expand_min": 90.0,
+    "top_expand_ratio": 1.1,
+    "top_expand_min": 18.0,
+    "bottom_expand_ratio": 1.1,
+    "bottom_expand_min": 18.0,
+    "click_x_ratio": 0.22,
+    "click_y_ratio": 0.5,
+}
+
+
+def is_valid_region(region: Dict[str, float]) -> bool:
+    try:
+        x = float(region["x"])
+        y = float(region["y"])
+        width = float(region["width"])
+        height = float(region["height"])
+    except (KeyError, TypeError, ValueError):
+        return False
+
+    return (
+        0.0 <= x < 1.0
+        and 0.0 <= y < 1.0
+        and 0.02 <= width <= 1.0
+        and 0.02 <= height <= 1.0
+        and x + width <= 1.02
+        and y + height <= 1.02
+    )
+
+
+def is_valid_anchor(anchor: Dict[str, float]) -> bool:
+    try:
+        x = float(anchor["x"])
+        y = float(anchor["y"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0
+
+
+def wait_until(probe: Callable[[], Optional[T]], timeout: float, initial_interval: float = 0.05,
+               max_interval: float = 0.4) -> Optional[T]:
+    """
+    反复调用 probe 直到返回非空值（界面到达目标状态）或超时，间隔从 initial_interval 翻倍至 max_interval
+
+    Returns:
+        probe 的第一个非空返回值，超时返回 None
+    """
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    while True:
+        value = probe()
+        if value:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+class OCRNavigator:
+    """
+    以窗口相对比例描述界面区域，完成截图识别、搜索结果行定位和聊天标题复核
+
+    标定文件保存区域 {x, y, width, height} 和锚点 {x, y}（相对窗口的比例），窗口大小变化后仍然适用；
+    未标定的项使用构造时给出的默认值
+    """
+
+    def __init__(self, window_rect: Callable[[], Tuple[int, int, int, int]], calibration_path: str,
+                 default_regions: Dict[str, Dict[str, float]], default_anchors: Dict[str, Dict[str, float]],
+                 recognizer: Optional[PaddleOCRRecognizer] = None, snapshots=None,
+                 is_foreground: Optional[Callable[[], bool]] = None,
+                 ocr_threshold: float = 0.88, title_threshold: float = 0.80):
+        """
+        Args:
+            window_rect: 返回目标窗口当前矩形 (left, top, right, bottom)
+            calibration_path: 标定文件路径
+            default_regions: 默认区域 {名称: {x, y, width, height}}
+            default_anchors: 默认锚点 {名称: {x, y}}
+            recognizer: OCR 识别器，默认使用共享识别器
+            snapshots: 失败现场环形缓冲（failure_snapshots.SnapshotRing），可选
+            is_foreground: 截图前检查目标窗口是否在前台，可选
+            ocr_threshold: 搜索结果精确匹配的最低置信度
+            title_threshold: 聊天标题匹配的最低置信度
+        """
+        self.window_rect = window_rect
+        self.calibration_path = calibration_path
+        self.default_regions = default_regions
+        self.default_anchors = default_anchors
+        self.recognizer = recognizer or get_shared_recognizer()
+        self.snapshots = snapshots
+        self.is_foreground = is_foreground
+        self.ocr_threshold = ocr_threshold
+        self.title_threshold = title_threshold
+        self.calibration: Dict[str, Any] = {}
+        self.load_calibration()
+
+    @property
+    def available(self) -> bool:
+        return self.recognizer.available
+
+    def load_calibration(self) -> None:
+        if os.path.exists(self.calibration_path):
+            try:
+                with open(self.calibration_path, "r", encoding="utf-8") as file:
+                    self.calibration = json.load(file)
+                return
+            except Exception as exc:
+                logger.warning("读取标定文件 %s 失败，使用默认区域: %s", self.calibration_path, exc)
+        self.calibration = {}
+
+    def save_calibration(self) -> None:
+        with open(self.calibration_path, "w", encoding="utf-8") as file:
+            json.dump(self.calibration, file, ensure_ascii=False, indent=2)
+
+    def region(self, name: str) -> Dict[str, float]:
+        region = self.calibration.get(name)
+        if region and is_valid_region(region):
+            return region
+        if region:
+            logger.warning("标定区域 %s 非法，回退默认区域: %s", name, region)
+        return self.default_regions[name]
+
+    def anchor(self, name: str) -> Dict[str, float]:
+        anchor = self.calibration.get(name)
+        if anchor and is_valid_anchor(anchor):
+            return anchor
+        if anchor:
+            logger.warning("标定锚点 %s 非法，回退默认锚点: %s", name, anchor)
+        return self.default_anchors[name]
+
+    def result_tuning(self) -> Dict[str, float]:
+        tuning = dict(DEFAULT_RESULT_TUNING)
+        for key, value in self.calibration.get("result_tuning", {}).items():
+            try:
+                if key in tuning:
+                    tuning[key] = float(value)
+            except (TypeError, ValueError):
+                logger.warning("result_tuning.%s 非法，回退默认值", key)
+        return tuning
+
+    def to_screen_point(self, anchor: Dict[str, float]) -> Tuple[int, int]:
+        left, top, right, bottom = self.window_rect()
+        return (
+            int(left + (right - left) * float(anchor["x"])),
+            int(top + (bottom - top) * float(anchor["y"])),
+        )
+
+    def to_screen_region(self, region: Dict[str, float]) -> Tuple[int, int, int, int]:
+        left, top, right, bottom = self.window_rect()
+        width = right - left
+        height = bottom - top
+        return (
+            int(left + width * float(region["x"])),
+            int(top + height * float(region["y"])),
+            max(1, int(width * float(region["width"]))),
+            max(1, int(height * float(region["height"]))),
+        )
+
+    def to_normalized_point(self, point: Tuple[int, int]) -> Dict[str, float]:
+        left, top, right, bottom = self.window_rect()
+        return {
+            "x": round((point[0] - left) / max(1, right - left), 6),
+            "y": round((point[1] - top) / max(1, bottom - top), 6),
+        }
+
+    def to_normalized_region(self, start: Tuple[int, int], end: Tuple[int, int]) -> Dict[str, float]:
+        left, top, right, bottom = self.window_rect()
+        width = max(1, right - left)
+        height = max(1, bottom - top)
+        x1, x2 = sorted([start[0], end[0]])
+        y1, y2 = sorted([start[1], end[1]])
+        return {
+            "x": round((x1 - left) / width, 6),
+            "y": round((y1 - top) / height, 6),
+            "width": round((x2 - x1) / width, 6),
+            "height": round((y2 - y1) / height, 6),
+        }
+
+    def capture(self, name: str) -> Tuple[Any, Tuple[int, int, int, int]]:
+        """截取命名区域，返回 (截图, 屏幕区域)"""
+        import pyautogui
+
+        actual = self.to_screen_region(self.region(name))
+        return pyautogui.screenshot(region=actual), actual
+
+    def recognize(self, image, actual_region: Tuple[int, int, int, int], label: str) -> List[OCRMatch]:
+        """识别截图，截图与结果记入失败快照"""
+        matches = self.recognizer.recognize(image)
+        if self.snapshots is not None:
+            self.snapshots.capture(label, image, actual_region, matches)
+        return matches
+
+    def read(self, name: str) -> Optional[Tuple[Any, Tuple[int, int, int, int], List[OCRMatch]]]:
+        """
+        截取命名区域并识别，截图与结果记入失败快照
+
+        Returns:
+            (截图, 屏幕区域, 识别结果)；目标窗口不在前台时返回 None
+        """
+        if self.is_foreground is not None and not self.is_foreground():
+            logger.warning("目标窗口不在前台，跳过 %s 识别", name)
+            return None
+        image, actual = self.capture(name)
+        return image, actual, self.recognize(image, actual, name)
+
+    def locate_result_row(self, image, actual_region: Tuple[int, int, int, int], matches: List[OCRMatch],
+                          target_name: str) -> Optional[Dict[str, Any]]:
+        """在搜索结果截图中找到与目标完全一致的最靠上的一行，返回整行的点击位置"""
+        target_norm = normalize_text(target_name)
+        exact_matches = [
+            item for item in matches
+            if normalize_text(item.text) == target_norm and item.score >= self.ocr_threshold
+        ]
+        if not exact_matches:
+            return None
+
+        exact_matches.sort(key=lambda item: (min(point[1] for point in item.box), -item.score))
+        match = exact_matches[0]
+        wxbot_metrics.OCR_SCORE.observe(match.score, purpose="search_result")
+
+        text_left, text_top, text_right, text_bottom = box_bounds(match.box)
+        text_width = max(1, text_right - text_left)
+        text_height = max(1, text_bottom - text_top)
+        tuning = self.result_tuning()
+
+        # 由名字文字框反推出整行结果区域，点击整行中部偏左，而不是点字。
+        row_left = clamp(
+            text_left - max(int(tuning["left_expand_min"]), int(text_width * tuning["left_expand_ratio"])),
+            8,
+            image.width - 120,
+        )
+        row_right = clamp(image.width - 8, row_left + 120, image.width)
+        row_top = clamp(
+            text_top - max(int(tuning["top_expand_min"]), int(text_height * tuning["top_expand_ratio"])),
+            0,
+            image.height - 30,
+        )
+        row_bottom = clamp(
+            text_bottom + max(int(tuning["bottom_expand_min"]), int(text_height * tuning["bottom_expand_ratio"])),
+            row_top + 30,
+            image.height,
+        )
+
+        row_click_x = int(row_left + (row_right - row_left) * tuning["click_x_ratio"])
+        row_click_x = clamp(row_click_x, row_left + 36, row_right - 24)
+        row_click_y = int(row_top + (row_bottom - row_top) * tuning["click_y_ratio"])
+
+        return {
+            "match": match,
+            "screen_point": (actual_region[0] + row_click_x, actual_region[1] + row_click_y),
+            "row_image": image.crop((row_left, row_top, row_right, row_bottom)),
+            "actual_region": actual_region,
+            "row_box": (row_left, row_top, row_right, row_bottom),
+            "result_tuning": tuning,
+        }
+
+    def find_result_row(self, target_name: str, region: str = "search_results_region") -> Optional[Dict[str, Any]]:
+        captured = self.read(region)
+        if captured is None:
+            return None
+        image, actual, matches = captured
+        return self.locate_result_row(image, actual, matches, target_name)
+
+    def title_matches(self, target_name: str, region: str = "chat_title_region") -> bool:
+        """聊天标题区域是否显示目标群名（忽略末尾成员数）"""
+        captured = self.read(region)
+        if captured is None:
+            return False
+        return self.title_matched(captured[2], target_name)
+
+    def title_matched(self, matches: List[OCRMatch], target_name: str) -> bool:
+        """识别结果中是否有与目标群名一致（忽略末尾成员数）且置信度达标的标题"""
+        target_norm = normalize_chat_title(target_name)
+        scores = [item.score for item in matches if normalize_chat_title(item.text) == target_norm]
+        if scores:
+            wxbot_metrics.OCR_SCORE.observe(max(scores), purpose="chat_title")
+        return any(score >= self.title_threshold for score in scores)
+
+    def wait_for_result_row(self, target_name: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """等待搜索结果中出现目标行（结果随输入逐步刷新，出现即返回）"""
+        row = wait_until(lambda: self.find_result_row(target_name), timeout)
+        if row is None:
+            logger.error("%.1fs 内搜索结果中未出现“%s”", timeout, target_name)
+        return row
+
+    def wait_for_chat_title(self, target_name: str, timeout: float) -> bool:
+        """等待聊天标题切换为目标群名"""
+        if wait_until(lambda: self.title_matches(target_name), timeout):
+            return True
+        logger.error("%.1fs 内聊天标题未切换为“%s”", timeout, target_name)
+        return False
+
+    def calibrate(self, regions: Dict[str, str], anchors: Dict[str, str]) -> bool:
+        """
+        交互式标定：依次提示用户把鼠标移到各区域的左上/右下角和各锚点，结果保存到标定文件
+
+        Args:
+            regions: {区域名称: 提示文字}
+            anchors: {锚点名称: 提示文字}
+        """
+        import pyautogui
+
+        try:
+            left, top, right, bottom = self.window_rect()
+            calibration: Dict[str, Any] = {
+                "window_meta": {"baseline_window_size": {"width": right - left, "height": bottom - top}},
+            }
+            for name, label in regions.items():
+                input(f"{label}：请把鼠标移动到区域左上角后按回车...")
+                start = pyautogui.position()
+                input(f"{label}：请把鼠标移动到区域右下角后按回车...")
+                end = pyautogui.position()
+                calibration[name] = self.to_normalized_region((start.x, start.y), (end.x, end.y))
+                logger.info("%s 记录区域: %s", label, calibration[name])
+            for name, label in anchors.items():
+                input(f"{label}：请把鼠标移动到目标位置后按回车...")
+                point = pyautogui.position()
+                calibration[name] = self.to_normalized_point((point.x, point.y))
+                logger.info("%s 记录位置: %s", label, calibration[name])
+            if "result_tuning" in self.calibration:
+                calibration["result_tuning"] = self.calibration["result_tuning"]
+            self.calibration = calibration
+            self.save_calibration()
+            logger.info("标定完成，配置已保存到 %s", self.calibration_path)
+            return True
+        except Exception as exc:
+            logger.error("标定失败: %s", exc)
+            return False
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+微信/企业微信进程看门狗
+版本：v1.0.0
+创建日期：2026-10-19
+功能：以亚秒级间隔比较 PID 集合（只在集合变化时增量刷新共享的进程/窗口索引），
+      Windows 上同时等待被监视进程的句柄，进程退出立即被唤醒；
+      发出 start / exit / ready 事件，ready 以主窗口出现且可见为准，不再固定等待
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from desktop_snapshot import ProcessInfo, get_desktop_snapshot, invalidate_desktop_snapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCHED_APPS = {
+    "wxwork": {
+        "process_names": ["WXWork.exe", "wxwork.exe", "WeWork.exe"],
+        "main_classes": ["WeWorkWindow"],
+        "main_title": "企业微信",
+    },
+    "wechat": {
+        "process_names": ["WeChat.exe", "Weixin.exe"],
+        "main_classes": ["WeChatMainWndForPC"],
+        "main_title": "微信",
+    },
+}
+
+DEFAULT_WATCHDOG_SETTINGS = {
+    "interval_seconds": 0.5,
+    "ready_timeout": 60,
+}
+
+
+class ProcessEventKind:
+    """事件类型常量"""
+    START = "start"
+    EXIT = "exit"
+    READY = "ready"
+
+
+@dataclass
+class ProcessEvent:
+    kind: str
+    app: str
+    pid: int
+    create_time: float
+    hwnd: Optional[int] = None
+    timestamp: float = field(default_factory=time.time)
+
+    def describe(self) -> str:
+        window = f" 窗口 {self.hwnd}" if self.hwnd else ""
+        return f"{self.app} {self.kind} (PID {self.pid}{window})"
+
+
+class _ExitWaiter:
+    """Windows 上用进程句柄等待退出；其他平台退化为普通定时等待"""
+
+    def __init__(self):
+        try:
+            import win32api
+            import win32con
+            import win32event
+            self._win32api, self._win32con, self._win32event = win32api, win32con, win32event
+        except ImportError:
+            self._win32event = None
+        self._handles: Dict[Tuple[int, float], Any] = {}
+
+    def watch(self, key: Tuple[int, float]) -> None:
+        if self._win32event is None or key in self._handles:
+            return
+        try:
+            self._handles[key] = self._win32api.OpenProcess(self._win32con.SYNCHRONIZE, False, key[0])
+        except Exception as e:
+            logger.debug(f"无法打开进程句柄 {key[0]}，退化为轮询: {e}")
+
+    def forget(self, key: Tuple[int, float]) -> None:
+        handle = self._handles.pop(key, None)
+        if handle is not None:
+            try:
+                handle.Close()
+            except Exception:
+                pass
+
+    def wait(self, timeout: float, stop: threading.Event) -> List[Tuple[int, float]]:
+        """
+        等待最多 timeout 秒
+
+        Returns:
+            List[Tuple[int, float]]: 期间已退出的被监视进程（只有句柄等待可用时才会非空）
+        """
+        keys = list(self._handles)[:64]  # WaitForMultipleObjects 最多 64 个句柄
+        if not keys:
+            stop.wait(timeout)
+            return []
+        result = self._win32event.WaitForMultipleObjects(
+            [self._handles[key] for key in keys], False, int(timeout * 1000))
+        index = result - self._win32event.WAIT_OBJECT_0
+        if 0 <= index < len(keys):
+            return [keys[index]]
+        return []
+
+    def close(self) -> None:
+        for key in list(self._handles):
+            self.forget(key)
+
+
+class ProcessWatchdog:
+    """跟踪被监视程序的启动、退出和就绪"""
+
+    def __init__(self, apps: Optional[Dict[str, Dict[str, Any]]] = None, interval: float = 0.5,
+                 history: int = 200):
+        """
+        Args:
+            apps: 被监视的程序 {名称: {process_names, main_classes, main_title}}，默认微信和企业微信
+            interval: 轮询间隔（秒）
+            history: 保留的最近事件数（供 wait_for 使用）
+        """
+        self.apps = apps or DEFAULT_WATCHED_APPS
+        self.interval = float(interval)
+        self._pids: frozenset = frozenset()
+        self._running: Dict[str, Dict[Tuple[int, float], ProcessInfo]] = {app: {} for app in self.apps}
+        self._ready: Dict[str, ProcessEvent] = {}
+        self._events: Deque[Tuple[int, ProcessEvent]] = deque(maxlen=history)
+        self._sequence = 0
+        self._callbacks: List[Callable[[ProcessEvent], Any]] = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._exit_waiter = _ExitWaiter()
+        self._exited: List[Tuple[int, float]] = []
+
+    @classmethod
+    def from_config(cls, settings: Optional[Dict[str, Any]] = None, apps: Iterable[str] = ("wxwork",)
+                    ) -> "ProcessWatchdog":
+        """根据配置文件中的 watchdog 段创建看门狗，只监视 apps 中列出的程序"""
+        merged = dict(DEFAULT_WATCHDOG_SETTINGS)
+        merged.update(settings or {})
+        watched = dict(DEFAULT_WATCHED_APPS)
+        watched.update(merged.get("apps", {}))
+        return cls({app: watched[app] for app in apps}, float(merged["interval_seconds"]))
+
+    def subscribe(self, callback: Callable[[ProcessEvent], Any]) -> None:
+        """注册事件回调（在看门狗线程中调用，应尽快返回）"""
+        self._callbacks.append(callback)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name="wxbot-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 进程看门狗已启动: {list(self.apps)}（间隔 {self.interval:g}s）")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._exit_waiter.close()
+
+    def __enter__(self) -> "ProcessWatchdog":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.stop()
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._exited.extend(self._exit_waiter.wait(self.interval, self._stop))
+            if self._stop.is_set():
+                return
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"看门狗轮询出错: {e}")
+
+    def poll(self) -> List[ProcessEvent]:
+        """执行一次检查并分发事件"""
+        import psutil
+
+        events: List[ProcessEvent] = []
+        pids = frozenset(psutil.pids())
+        exited = set(self._exited)
+        self._exited.clear()
+        if pids != self._pids or exited:
+            self._pids = pids
+            snapshot = get_desktop_snapshot(0)
+            for app, spec in self.apps.items():
+                current = {p.key: p for p in snapshot.find_processes(spec["process_names"], exact=True, details=False)
+                           if p.key not in exited}
+                previous = self._running[app]
+                for key in previous.keys() - current.keys():
+                    events.append(ProcessEvent(ProcessEventKind.EXIT, app, key[0], key[1]))
+                    self._exit_waiter.forget(key)
+                    ready = self._ready.get(app)
+                    if ready and (ready.pid, ready.create_time) == key:
+                        del self._ready[app]
+                for key in current.keys() - previous.keys():
+                    events.append(ProcessEvent(ProcessEventKind.START, app, key[0], key[1]))
+                    self._exit_waiter.watch(key)
+                self._running[app] = current
+            if events:
+                invalidate_desktop_snapshot()
+
+        for app, spec in self.apps.items():
+            if app in self._ready or not self._running[app]:
+                continue
+            found = get_desktop_snapshot(self.interval).find_main_window(
+                spec["process_names"], spec["main_classes"], spec.get("main_title"), exact=True)
+            if found and found[1].visible:
+                process, window = found
+                event = ProcessEvent(ProcessEventKind.READY, app, process.pid, process.create_time, window.hwnd)
+                self._ready[app] = event
+                events.append(event)
+
+        for event in events:
+            self._dispatch(event)
+        return events
+
+    def _dispatch(self, event: ProcessEvent) -> None:
+        log = logger.warning if event.kind == ProcessEventKind.EXIT else logger.info
+        log(f"👀 {event.describe()}")
+        with self._condition:
+            self._sequence += 1
+            self._events.append((self._sequence, event))
+            self._condition.notify_all()
+        for callback in list(self._callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"看门狗事件回调出错: {e}")
+
+    def is_running(self, app: str) -> bool:
+        return bool(self._running.get(app))
+
+    def ready_event(self, app: str) -> Optional[ProcessEvent]:
+        """程序当前处于就绪状态时返回对应的 ready 事件"""
+        return self._ready.get(app)
+
+    def wait_for(self, kinds: Iterable[str], app: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Optional[ProcessEvent]:
+        """
+        等待调用之后发生的下一个指定类型的事件
+
+        Returns:
+            Optional[ProcessEvent]: 事件，超时返回 None
+        """
+        kinds = set(kinds)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            seen = self._sequence
+            while True:
+                for sequence, event in self._events:
+                    if sequence > seen and event.kind in kinds and (app is None or event.app == app):
+                        return event
+                seen = self._sequence
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def wait_ready(self, app: str, timeout: float = 60.0) -> Optional[ProcessEvent]:
+        """等待程序就绪（已就绪时立即返回）"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            ready = self._ready.get(app)
+            if ready:
+                return ready
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+                ready = self._ready.get(app)
+                if ready:
+                    return ready
+
+
+def main():
+    """命令行入口：打印微信/企业微信的进程事件"""
+    import argparse
+
+    from logging_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description="微信/企业微信进程看门狗")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WATCHDOG_SETTINGS["interval_seconds"])
+    parser.add_argument("apps", nargs="*", default=list(DEFAULT_WATCHED_APPS))
+    args = parser.parse_args()
+
+    setup_logging("process_watchdog.log")
+    watchdog = ProcessWatchdog({app: DEFAULT_WATCHED_APPS[app] for app in args.apps}, args.interval)
+    watchdog.subscribe(lambda event: print(f"{time.strftime('%H:%M:%S')} {event.describe()}"))
+    with watchdog:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
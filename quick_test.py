@@ -10,9 +10,8 @@ import time
 import win32gui
 import win32process
 import psutil
+from logging_setup import setup_logging
 
-# 设置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def test_wxwork_detection():
@@ -119,6 +118,7 @@ def test_wxwork_detection():
         return False
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info("🚀 企业微信检测快速测试")
     logger.info("=" * 50)
 
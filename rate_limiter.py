@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+发送限流器
+版本：v1.0.0
+创建日期：2026-10-19
+功能：全局、按发送器账号、按群聊三级令牌桶限流。
+      发送前计算满足所有限制所需的最短等待时间（而不是固定 sleep），并返回实际等待时长和起限制作用的桶
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMITS = {
+    "global": {"per_minute": 20, "burst": 5},
+    "per_sender": {"default": {"per_minute": 12, "burst": 3}},
+    "per_group": {"default": {"per_minute": 4, "burst": 1}},
+}
+
+
+def merge_rate_limits(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    按级别合并配置：只给出某一级的部分键时，其余键仍使用默认值；某一级设为 null 表示关闭该级限流
+
+    per_sender / per_group 中的每一项在默认项（同名项或 "default"）之上合并，
+    例如 {"per_group": {"default": {"per_minute": 6}}} 保留默认的 burst
+    """
+    merged: Dict[str, Any] = {}
+    overrides = config or {}
+    for level, defaults in DEFAULT_RATE_LIMITS.items():
+        if level in overrides and not overrides[level]:
+            merged[level] = None
+            continue
+        section = overrides.get(level) or {}
+        if level == "global":
+            merged[level] = dict(defaults, **section)
+            continue
+        entries = {key: dict(value) for key, value in defaults.items()}
+        for key, value in section.items():
+            if isinstance(value, dict):
+                base = entries.get(key) or entries.get("default") or {}
+                entries[key] = dict(base, **value)
+            else:
+                entries[key] = value
+        merged[level] = entries
+    for level, value in overrides.items():
+        merged.setdefault(level, value)
+    return merged
+
+
+class TokenBucket:
+    """令牌桶：容量为 burst，每秒补充 per_minute / 60 个令牌"""
+
+    def __init__(self, per_minute: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = max(float(per_minute), 1e-9) / 60.0
+        self.capacity = max(float(burst), 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """距离有一个可用令牌还需等待的秒数"""
+        now = self._clock() if now is None else now
+        self._refill(now)
+        if self._tokens >= 1.0 - 1e-9:
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def consume(self, now: Optional[float] = None) -> None:
+        now = self._clock() if now is None else now
+        self._refill(now)
+        self._tokens -= 1.0
+
+
+@dataclass
+class RateLimitDecision:
+    waited: float
+    limit: Optional[str]
+
+
+class RateLimiter:
+    """三级令牌桶限流器（线程安全，可在多个发送线程间共享）"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            config: 配置文件中的 rate_limits 段，缺失的级别使用 DEFAULT_RATE_LIMITS
+            clock: 单调时钟
+            sleep: 等待函数
+        """
+        self.config = merge_rate_limits(config)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+
+    def _bucket_settings(self, level: str, key: str) -> Optional[Dict[str, Any]]:
+        settings = self.config.get(level)
+        if not settings:
+            return None
+        if level == "global":
+            return settings
+        return settings.get(key, settings.get("default"))
+
+    def _bucket(self, name: str, level: str, key: str) -> Optional[TokenBucket]:
+        if name not in self._buckets:
+            settings = self._bucket_settings(level, key)
+            self._buckets[name] = (TokenBucket(settings["per_minute"], settings.get("burst", 1), self._clock)
+                                   if settings else None)
+        return self._buckets[name]
+
+    def _buckets_for(self, sender: str, group: str) -> List[Tuple[str, TokenBucket]]:
+        # 同名群在不同发送器（个人微信 / 企业微信）中是不同的会话，分别计数
+        candidates = [
+            ("global", self._bucket("global", "global", "")),
+            (f"sender:{sender}", self._bucket(f"sender:{sender}", "per_sender", sender)),
+            (f"group:{sender}:{group}", self._bucket(f"group:{sender}:{group}", "per_group", group)),
+        ]
+        return [(name, bucket) for name, bucket in candidates if bucket is not None]
+
+    def _longest_wait(self, buckets: List[Tuple[str, TokenBucket]], now: float) -> Tuple[float, Optional[str]]:
+        wait, limit = 0.0, None
+        for name, bucket in buckets:
+            bucket_wait = bucket.wait_time(now)
+            if bucket_wait > wait:
+                wait, limit = bucket_wait, name
+        return wait, limit
+
+    def reserve_wait(self, sender: str, group: str) -> Tuple[float, Optional[str]]:
+        """
+        计算发送到该群前需要等待的最短时间（不消耗令牌）
+
+        Returns:
+            Tuple[float, Optional[str]]: (等待秒数, 起限制作用的桶名；无需等待时为 None)
+        """
+        with self._lock:
+            return self._longest_wait(self._buckets_for(sender, group), self._clock())
+
+    def acquire(self, sender: str, group: str, max_wait: Optional[float] = None) -> Optional[RateLimitDecision]:
+        """
+        等待到所有限制都允许后消耗令牌
+
+        Args:
+            sender: 发送器（账号）
+            group: 群聊名称
+            max_wait: 最长等待秒数，超过时不等待并返回 None
+
+        Returns:
+            Optional[RateLimitDecision]: 实际等待时长与起限制作用的桶
+        """
+        waited = 0.0
+        first_limit = None
+        while True:
+            with self._lock:
+                now = self._clock()
+                buckets = self._buckets_for(sender, group)
+                wait, limit = self._longest_wait(buckets, now)
+                if wait <= 0:
+                    for _, bucket in buckets:
+                        bucket.consume(now)
+                    return RateLimitDecision(waited=round(waited, 3), limit=first_limit)
+            if max_wait is not None and waited + wait > max_wait:
+                return None
+            if first_limit is None:
+                first_limit = limit
+            logger.debug(f"⏳ 限流 {limit}: 等待 {wait:.2f}s 后发送到 {sender}:{group}")
+            self._sleep(wait)
+            waited += wait
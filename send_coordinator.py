@@ -0,0 +1,787 @@
+# -*- coding: utf-8 -*-
+"""
+分布式发送：协调者 / 工作节点
+版本：v1.0.0
+创建日期：2026-10-19
+功能：一个桌面同一时间只能执行一次界面发送，吞吐受限于单机。协调者持有持久化投递队列，
+      把领取的条目分配给多个工作节点（每个节点驱动自己的 Windows 会话和 MessageSenderInterface 发送器）。
+      工作节点定期心跳以延长租约，超时未心跳的节点被移除、其条目重新排队；
+      空闲节点可以从忙碌节点尚未开始的预取条目中窃取工作。
+      demo 命令在本机启动协调者和多个使用模拟发送器的工作进程，可在 Linux 上测试
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from delivery_queue import DeliveryItem, DeliveryQueue, DeliveryState, default_owner
+from logging_setup import load_logging_settings, setup_logging
+from message_sender_interface import MessageSenderFactory, MessageSenderInterface
+from rate_limiter import RateLimiter
+from wxbot_service import TERMINAL_STATES, ServiceClient, load_service_config
+import wxbot_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COORDINATOR_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8770,
+    "db_path": "coordinator_queue.db",
+    "token": None,
+    "lease_seconds": 120,
+    "heartbeat_seconds": 5,
+    "worker_timeout": 20,
+    "prefetch": 2,
+    "work_stealing": True,
+    "long_poll_seconds": 5,
+}
+
+
+def _item_payload(item: DeliveryItem) -> Dict[str, Any]:
+    return {"id": item.id, "sender": item.sender, "group": item.group_name, "content": item.content,
+            "attempts": item.attempts, "batch_id": item.batch_id}
+
+
+@dataclass
+class WorkerState:
+    """协调者记录的工作节点状态"""
+    worker_id: str
+    senders: Optional[List[str]]  # None 表示可发送任意发送器类型（例如模拟后端）
+    host: str
+    last_seen: float
+    # 已分配给该节点的条目 {item_id: 发送器类型}，按分配顺序
+    assigned: "OrderedDict[int, str]" = field(default_factory=OrderedDict)
+    started: Set[int] = field(default_factory=set)
+    current: Optional[int] = None
+    sent: int = 0
+    failed: int = 0
+    stolen: int = 0
+
+    @property
+    def owner(self) -> str:
+        return f"worker:{self.worker_id}"
+
+    def accepts(self, sender: str) -> bool:
+        return self.senders is None or sender in self.senders
+
+    def buffered(self) -> List[int]:
+        """已分配但尚未开始发送的条目（可被窃取）"""
+        return [item_id for item_id in self.assigned if item_id not in self.started]
+
+    def describe(self) -> Dict[str, Any]:
+        return {"host": self.host, "senders": self.senders, "assigned": list(self.assigned),
+                "current": self.current, "sent": self.sent, "failed": self.failed, "stolen": self.stolen,
+                "last_seen": round(time.time() - self.last_seen, 1)}
+
+
+class SendCoordinator:
+    """协调者：持久化队列 + 工作节点注册表，负责分配、租约续期、过期回收和工作窃取"""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 完整的 auto_report_config 配置（使用 coordinator、delivery_queue、default_sender 段）
+        """
+        self.config = config
+        self.settings = dict(DEFAULT_COORDINATOR_SETTINGS)
+        self.settings.update(config.get("coordinator", {}))
+        queue_config = dict(config.get("delivery_queue", {}), db_path=self.settings["db_path"])
+        self.queue = DeliveryQueue.from_config(queue_config)
+        self.lease_seconds = float(self.settings["lease_seconds"])
+        self.worker_timeout = float(self.settings["worker_timeout"])
+        self.prefetch = max(1, int(self.settings["prefetch"]))
+        self.workers: Dict[str, WorkerState] = {}
+        self.started_at = time.time()
+        self._work = threading.Condition(threading.RLock())
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    # ---------------------------------------------------------------- 生命周期
+
+    def start(self) -> None:
+        """恢复租约已过期的条目并启动过期节点回收线程"""
+        self.queue.recover()
+        self._reaper = threading.Thread(target=self._reap_loop, name="coordinator-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._work:
+            self._work.notify_all()
+        if self._reaper is not None:
+            self._reaper.join(5)
+        self.queue.close()
+
+    def _reap_loop(self) -> None:
+        interval = max(0.2, float(self.settings["heartbeat_seconds"]) / 2)
+        while not self._stop.wait(interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"回收过期工作节点失败: {e}")
+
+    def reap(self) -> List[str]:
+        """移除超过 worker_timeout 未心跳的节点，其条目（包括正在发送的）重新排队"""
+        cutoff = time.time() - self.worker_timeout
+        with self._work:
+            expired = [w for w in self.workers.values() if w.last_seen < cutoff]
+            for worker in expired:
+                released = sum(1 for item_id in worker.assigned if self.queue.release(item_id, worker.owner))
+                del self.workers[worker.worker_id]
+                wxbot_metrics.WORKER_EXPIRED.inc()
+                logger.warning(f"💀 工作节点 {worker.worker_id} 心跳超时，{released} 条条目重新排队")
+            if expired:
+                wxbot_metrics.COORDINATOR_WORKERS.set(len(self.workers))
+                self._work.notify_all()
+        return [w.worker_id for w in expired]
+
+    # ---------------------------------------------------------------- 队列
+
+    def enqueue(self, message: str, groups: List[str], sender: Optional[str] = None,
+                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """加入待发送消息（与 wxbot_service 的 /enqueue 相同）"""
+        sender_type = sender or self.config.get("default_sender", "wechat")
+        batch_id = f"api:{idempotency_key}" if idempotency_key else f"api:{uuid.uuid4().hex}"
+        items = []
+        for group in dict.fromkeys(groups):
+            item_id = self.queue.enqueue(batch_id, sender_type, group, message)
+            items.append({"id": item_id, "sender": sender_type, "group": group})
+        with self._work:
+            self._work.notify_all()
+        logger.info(f"📥 已入队 {len(items)} 条消息 (batch {batch_id})")
+        return {"batch_id": batch_id, "items": items}
+
+    def status(self, batch_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._work:
+            workers = {worker_id: worker.describe() for worker_id, worker in self.workers.items()}
+        result: Dict[str, Any] = {
+            "uptime": round(time.time() - self.started_at, 1),
+            "queue": self.queue.counts(),
+            "workers": workers,
+        }
+        if batch_id:
+            batch_items = self.queue.get_items(batch_id=batch_id)
+            result["batch"] = [
+                {"id": item.id, "sender": item.sender, "group": item.group_name, "state": item.state,
+                 "attempts": item.attempts, "worker": item.lease_owner, "last_error": item.last_error}
+                for item in batch_items
+            ]
+            result["batch_done"] = bool(batch_items) and all(item.state in TERMINAL_STATES
+                                                              for item in batch_items)
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        with self._work:
+            count = len(self.workers)
+        return {"status": "ok" if count else "degraded", "workers": count}
+
+    # ---------------------------------------------------------------- 工作节点协议
+
+    def register(self, worker_id: str, senders: Optional[List[str]] = None, host: str = "") -> Dict[str, Any]:
+        """
+        注册（或重新注册）工作节点；协调者重启后重新注册的节点接管数据库中仍属于它的条目
+
+        Returns:
+            Dict: 节点应使用的心跳间隔、预取数量和长轮询时长
+        """
+        with self._work:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                worker = WorkerState(worker_id, senders, host, time.time())
+                for item in self.queue.get_items(state=DeliveryState.IN_FLIGHT):
+                    if item.lease_owner == worker.owner:
+                        worker.assigned[item.id] = item.sender
+                self.workers[worker_id] = worker
+                wxbot_metrics.COORDINATOR_WORKERS.set(len(self.workers))
+                logger.info(f"🤝 工作节点 {worker_id} ({host or '-'}) 已注册，发送器: {senders or '任意'}")
+            else:
+                worker.senders, worker.host, worker.last_seen = senders, host, time.time()
+            self._work.notify_all()
+        return {"heartbeat_seconds": float(self.settings["heartbeat_seconds"]), "prefetch": self.prefetch,
+                "long_poll_seconds": float(self.settings["long_poll_seconds"]),
+                "assigned": list(worker.assigned)}
+
+    def heartbeat(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        心跳：延长节点所有条目的租约
+
+        Returns:
+            Optional[Dict]: {"revoked": [租约已不属于该节点的条目]}；节点未注册时返回 None
+        """
+        with self._work:
+            worker = self.workers.get(worker_id)
+            if worker is None:
+                return None
+            worker.last_seen = time.time()
+            revoked = [item_id for item_id in list(worker.assigned)
+                       if not self.queue.heartbeat(item_id, worker.owner, self.lease_seconds)]
+            for item_id in revoked:
+                self._unassign(worker, item_id)
+        return {"revoked": revoked}
+
+    def lease(self, worker_id: str, limit: int = 1, wait: float = 0.0) -> Optional[List[DeliveryItem]]:
+        """
+        为节点分配条目：先从队列领取，队列中没有可领取的条目时尝试窃取；都没有时最多等待 wait 秒
+
+        Returns:
+            Optional[List[DeliveryItem]]: 分配的条目；节点未注册时返回 None
+        """
+        deadline = time.monotonic() + max(0.0, min(wait, float(self.settings["long_poll_seconds"])))
+        with self._work:
+            while True:
+                worker = self.workers.get(worker_id)
+                if worker is None:
+                    return None
+                worker.last_seen = time.time()
+                items = self._assign(worker, limit)
+                remaining = deadline - time.monotonic()
+                if items or remaining <= 0 or self._stop.is_set():
+                    return items
+                # 失败条目的重试时间不会触发通知，因此最多等待 1 秒后重新检查
+                self._work.wait(min(remaining, 1.0))
+
+    def _assign(self, worker: WorkerState, limit: int) -> List[DeliveryItem]:
+        room = min(int(limit), self.prefetch - len(worker.assigned))
+        if room <= 0:
+            return []
+        items: List[DeliveryItem] = []
+        for sender in (worker.senders or [None]):
+            items.extend(self.queue.lease(worker.owner, limit=room - len(items), sender=sender,
+                                          lease_seconds=self.lease_seconds))
+            if len(items) >= room:
+                break
+        if not items and not worker.assigned and self.settings.get("work_stealing", True):
+            items = self._steal(worker)
+        for item in items:
+            worker.assigned[item.id] = item.sender
+        return items
+
+    def _steal(self, thief: WorkerState) -> List[DeliveryItem]:
+        """
+        空闲节点（没有任何已分配条目）从积压最多的节点窃取一条尚未开始的条目，
+        从其预取队列末尾取，保留它下一条要发的
+        """
+        victims = sorted((w for w in self.workers.values() if w is not thief),
+                         key=lambda w: len(w.buffered()), reverse=True)
+        for victim in victims:
+            buffered = victim.buffered()
+            # 空闲的节点马上会开始它的第一条，只有忙碌或积压两条以上时才窃取
+            if not buffered or (victim.current is None and len(buffered) < 2):
+                continue
+            for item_id in reversed(buffered):
+                if not thief.accepts(victim.assigned[item_id]):
+                    continue
+                item = self.queue.reassign(item_id, victim.owner, thief.owner, self.lease_seconds)
+                self._unassign(victim, item_id)
+                if item is None:
+                    continue
+                victim.stolen += 1
+                wxbot_metrics.WORK_STEALS.inc()
+                logger.info(f"🔀 {thief.worker_id} 从 {victim.worker_id} 窃取条目 {item_id} ({item.group_name})")
+                return [item]
+        return []
+
+    @staticmethod
+    def _unassign(worker: WorkerState, item_id: int) -> None:
+        worker.assigned.pop(item_id, None)
+        worker.started.discard(item_id)
+        if worker.current == item_id:
+            worker.current = None
+
+    def begin(self, worker_id: str, item_id: int) -> bool:
+        """节点开始发送前确认条目仍属于自己；确认后的条目不再被窃取"""
+        with self._work:
+            worker = self.workers.get(worker_id)
+            if worker is None or item_id not in worker.assigned:
+                return False
+            worker.last_seen = time.time()
+            worker.started.add(item_id)
+            worker.current = item_id
+            # 该节点开始忙碌，它预取的条目可被等待中的空闲节点窃取
+            self._work.notify_all()
+        return True
+
+    def complete(self, worker_id: str, item_id: int, success: bool, error: str = "") -> Dict[str, Any]:
+        """
+        记录发送结果
+
+        发送成功时无论租约是否仍属于该节点都标记为已发送（消息已经发出），并撤销其他节点尚未开始的同一条目
+        """
+        with self._work:
+            worker = self.workers.get(worker_id)
+            owned = worker is not None and item_id in worker.assigned
+            if worker is not None:
+                worker.last_seen = time.time()
+                self._unassign(worker, item_id)
+            if success:
+                self.queue.mark_sent(item_id)
+                if worker is not None:
+                    worker.sent += 1
+                for other in self.workers.values():
+                    if other is not worker and item_id in other.assigned and item_id not in other.started:
+                        self._unassign(other, item_id)
+                if not owned:
+                    logger.warning(f"⚠️ 条目 {item_id} 由 {worker_id} 在租约失效后发送成功")
+                state = DeliveryState.SENT
+            elif owned:
+                state = self.queue.mark_failed(item_id, error or "send failed")
+                worker.failed += 1
+            else:
+                state = "ignored"
+            self._work.notify_all()
+        return {"ok": owned, "state": state}
+
+
+def make_coordinator_handler(coordinator: SendCoordinator) -> type:
+    """创建绑定到协调者的请求处理器"""
+
+    class CoordinatorHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle(self):
+            try:
+                super().handle()
+            except ConnectionError:
+                # 工作节点在长轮询期间断开（退出或超时），它的条目由心跳超时回收
+                logger.debug("工作节点在响应前断开连接")
+
+        def _authorized(self) -> bool:
+            token = coordinator.settings.get("token")
+            if token and self.headers.get("X-Wxbot-Token") != token:
+                self._send_json(401, {"error": "unauthorized"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            path = url.path
+            if path == "/status":
+                batch_id = parse_qs(url.query).get("batch_id", [None])[0]
+                self._send_json(200, coordinator.status(batch_id))
+            elif path == "/health":
+                health = coordinator.health()
+                self._send_json(200 if health["status"] == "ok" else 503, health)
+            elif path == "/metrics":
+                body = wxbot_metrics.REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            except (ValueError, UnicodeDecodeError) as e:
+                self._send_json(400, {"error": f"invalid json: {e}"})
+                return
+
+            path = urlparse(self.path).path
+            if path == "/enqueue":
+                message = payload.get("message")
+                groups = payload.get("groups") or ([payload["group"]] if payload.get("group") else [])
+                if not message or not groups:
+                    self._send_json(400, {"error": "message and group(s) are required"})
+                    return
+                self._send_json(202, coordinator.enqueue(message, groups, payload.get("sender"),
+                                                         payload.get("idempotency_key")))
+                return
+
+            worker_id = payload.get("worker_id")
+            if not worker_id:
+                self._send_json(400, {"error": "worker_id is required"})
+                return
+            if path == "/workers/register":
+                self._send_json(200, coordinator.register(worker_id, payload.get("senders"),
+                                                          payload.get("host", "")))
+            elif path == "/workers/heartbeat":
+                result = coordinator.heartbeat(worker_id)
+                if result is None:
+                    self._send_json(409, {"error": "unknown worker"})
+                else:
+                    self._send_json(200, result)
+            elif path == "/workers/lease":
+                items = coordinator.lease(worker_id, int(payload.get("limit", 1)), float(payload.get("wait", 0)))
+                if items is None:
+                    self._send_json(409, {"error": "unknown worker"})
+                else:
+                    self._send_json(200, {"items": [_item_payload(item) for item in items]})
+            elif path == "/workers/start":
+                self._send_json(200, {"ok": coordinator.begin(worker_id, int(payload["item_id"]))})
+            elif path == "/workers/complete":
+                self._send_json(200, coordinator.complete(worker_id, int(payload["item_id"]),
+                                                          bool(payload.get("success")), payload.get("error", "")))
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            logger.debug("coordinator api: " + format, *args)
+
+    return CoordinatorHandler
+
+
+def start_coordinator_server(coordinator: SendCoordinator, host: str, port: int) -> ThreadingHTTPServer:
+    """在后台线程中启动协调者 HTTP 接口（port 为 0 时使用随机端口）"""
+    server = ThreadingHTTPServer((host, port), make_coordinator_handler(coordinator))
+    server.daemon_threads = True
+    coordinator.start()
+    threading.Thread(target=server.serve_forever, name="coordinator-http", daemon=True).start()
+    logger.info(f"🚀 发送协调者已启动: http://{host}:{server.server_port}")
+    return server
+
+
+class CoordinatorClient(ServiceClient):
+    """工作节点和命令行使用的协调者客户端（/enqueue、/status 与 wxbot_service 相同）"""
+
+    def register(self, worker_id: str, senders: Optional[List[str]], host: str) -> Dict[str, Any]:
+        return self._request("POST", "/workers/register", {"worker_id": worker_id, "senders": senders, "host": host})
+
+    def heartbeat(self, worker_id: str) -> Dict[str, Any]:
+        return self._request("POST", "/workers/heartbeat", {"worker_id": worker_id})
+
+    def lease(self, worker_id: str, limit: int, wait: float = 0.0) -> Dict[str, Any]:
+        return self._request("POST", "/workers/lease", {"worker_id": worker_id, "limit": limit, "wait": wait})
+
+    def start(self, worker_id: str, item_id: int) -> Dict[str, Any]:
+        return self._request("POST", "/workers/start", {"worker_id": worker_id, "item_id": item_id})
+
+    def complete(self, worker_id: str, item_id: int, success: bool, error: str = "") -> Dict[str, Any]:
+        return self._request("POST", "/workers/complete", {"worker_id": worker_id, "item_id": item_id,
+                                                           "success": success, "error": error})
+
+
+class SendWorker:
+    """工作节点：向协调者领取条目，用本机预热的发送器逐条发送并回报结果"""
+
+    def __init__(self, config: Dict[str, Any], client: CoordinatorClient, worker_id: Optional[str] = None,
+                 senders: Optional[List[str]] = None, backend: Optional[str] = None,
+                 sender_overrides: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            config: 完整的 auto_report_config 配置
+            client: 协调者客户端
+            worker_id: 节点标识，默认 主机名:PID
+            senders: 本节点可发送的发送器类型，None 表示不限（backend 给定时总是不限）
+            backend: 强制使用的发送器类型（如 "fake"）
+            sender_overrides: 覆盖各发送器配置的键（如模拟发送器的 send_delay）
+        """
+        self.config = config
+        self.client = client
+        self.worker_id = worker_id or default_owner()
+        self.backend = backend
+        self.senders = None if backend else senders
+        self.sender_overrides = sender_overrides or {}
+        self.rate_limiter = RateLimiter(config.get("rate_limits"))
+        self.heartbeat_seconds = float(DEFAULT_COORDINATOR_SETTINGS["heartbeat_seconds"])
+        self.prefetch = int(DEFAULT_COORDINATOR_SETTINGS["prefetch"])
+        self.long_poll = float(DEFAULT_COORDINATOR_SETTINGS["long_poll_seconds"])
+        self.sent = 0
+        self._senders: Dict[str, MessageSenderInterface] = {}
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._revoked: Set[int] = set()
+        self._registered = threading.Event()
+        self._stop = threading.Event()
+
+    def _sender_config(self, sender_type: str) -> Dict[str, Any]:
+        return dict(self.config.get("senders", {}).get(sender_type, {}), **self.sender_overrides)
+
+    def get_sender(self, sender_type: str) -> Optional[MessageSenderInterface]:
+        """获取已预热的发送器，首次使用时创建并初始化"""
+        sender_type = self.backend or sender_type
+        sender = self._senders.get(sender_type)
+        if sender is not None and sender.is_initialized:
+            return sender
+        sender = MessageSenderFactory.create_sender(sender_type, self._sender_config(sender_type))
+        if sender is None or not sender.initialize():
+            logger.error(f"❌ 发送器 {sender_type} 不可用")
+            return None
+        self._senders[sender_type] = sender
+        return sender
+
+    def register(self) -> None:
+        settings = self.client.register(self.worker_id, self.senders, default_owner())
+        if "error" in settings:
+            raise RuntimeError(settings["error"])
+        self.heartbeat_seconds = float(settings["heartbeat_seconds"])
+        self.prefetch = int(settings["prefetch"])
+        self.long_poll = float(settings["long_poll_seconds"])
+        # 重新注册后以协调者记录的分配为准
+        assigned = set(settings.get("assigned", []))
+        self._buffer = deque(item for item in self._buffer if item["id"] in assigned)
+        self._registered.set()
+        logger.info(f"🤝 已注册到协调者 {self.client.base_url}（节点 {self.worker_id}）")
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            if not self._registered.is_set():
+                continue
+            try:
+                result = self.client.heartbeat(self.worker_id)
+                if result.get("error"):
+                    logger.warning(f"协调者不认识本节点（{result['error']}），重新注册")
+                    self._registered.clear()
+                else:
+                    self._revoked.update(result.get("revoked", []))
+            except urllib.error.URLError as e:
+                logger.warning(f"心跳失败: {e.reason}")
+
+    def run(self) -> None:
+        """工作循环，直到 stop() 或 Ctrl+C"""
+        threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True).start()
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if not self._registered.is_set():
+                    self.register()
+                self.step()
+                backoff = 1.0
+            except (urllib.error.URLError, ConnectionError, RuntimeError) as e:
+                logger.warning(f"无法连接协调者: {getattr(e, 'reason', e)}，{backoff:.0f}s 后重试")
+                self._registered.clear()
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for sender in self._senders.values():
+            try:
+                sender.cleanup()
+            except Exception as e:
+                logger.error(f"清理发送器失败: {e}")
+
+    def step(self) -> bool:
+        """
+        补充预取队列并发送一条
+
+        Returns:
+            bool: 是否发送了条目
+        """
+        if len(self._buffer) < self.prefetch:
+            # 本地没有待发条目时长轮询等待，有待发条目时只做一次非阻塞补充
+            result = self.client.lease(self.worker_id, self.prefetch - len(self._buffer),
+                                       0.0 if self._buffer else self.long_poll)
+            if result.get("error"):
+                self._registered.clear()
+                return False
+            queued = {item["id"] for item in self._buffer}
+            self._buffer.extend(item for item in result.get("items", []) if item["id"] not in queued)
+        if not self._buffer:
+            return False
+
+        item = self._buffer.popleft()
+        if item["id"] in self._revoked or not self.client.start(self.worker_id, item["id"]).get("ok"):
+            self._revoked.discard(item["id"])
+            logger.info(f"↪️ 条目 {item['id']} ({item['group']}) 已被其他节点接管，跳过")
+            return False
+
+        success, error = self.send(item)
+        result = self.client.complete(self.worker_id, item["id"], success, error)
+        if success:
+            self.sent += 1
+        logger.info(f"{'✅' if success else '❌'} 条目 {item['id']} → {item['group']} ({result.get('state')})")
+        return True
+
+    def send(self, item: Dict[str, Any]) -> Tuple[bool, str]:
+        """通过本机发送器发送一个条目，返回 (是否成功, 错误信息)"""
+        sender = self.get_sender(item["sender"])
+        if sender is None:
+            return False, f"sender {item['sender']} unavailable on {self.worker_id}"
+
+        account = self._sender_config(item["sender"]).get("account", item["sender"])
+        decision = self.rate_limiter.acquire(account, item["group"])
+        if decision.limit:
+            wxbot_metrics.RATE_LIMIT_WAIT.observe(decision.waited, limit=decision.limit.split(":", 1)[0])
+
+        wxbot_metrics.SENDS_ATTEMPTED.inc(sender=item["sender"], group=item["group"])
+        started = time.perf_counter()
+        try:
+            sent = sender.send_message(item["content"], item["group"])
+            error = "" if sent else "send_message returned False"
+        except Exception as e:
+            sent, error = False, str(e)
+            logger.error(f"发送到 {item['sender']}:{item['group']} 时出错: {e}")
+        wxbot_metrics.SEND_DURATION.observe(time.perf_counter() - started, sender=item["sender"])
+        (wxbot_metrics.SENDS_SUCCEEDED if sent else wxbot_metrics.SENDS_FAILED).inc(
+            sender=item["sender"], group=item["group"])
+        return bool(sent), error
+
+
+def run_demo(config: Dict[str, Any], workers: int, messages: int, send_delay: float, skew: float) -> Dict[str, Any]:
+    """
+    本机演示：协调者 + workers 个使用模拟发送器的工作进程
+
+    每个工作进程使用独立的桌面锁目录（相当于各自的桌面）且不限流，第 i 个进程的发送耗时为 send_delay × (1 + i × skew)，
+    快的节点会从慢节点的预取队列中窃取条目
+    """
+    workdir = tempfile.mkdtemp(prefix="wxbot_coordinator_")
+    demo_config = dict(config, coordinator=dict(config.get("coordinator", {}),
+                                                 db_path=os.path.join(workdir, "queue.db"), token=None))
+    coordinator = SendCoordinator(demo_config)
+    server = start_coordinator_server(coordinator, "127.0.0.1", 0)
+    port = server.server_port
+
+    processes = []
+    for index in range(workers):
+        env = dict(os.environ, WXBOT_LOCK_DIR=os.path.join(workdir, f"desktop-{index + 1}"))
+        command = [sys.executable, os.path.abspath(__file__), "--port", str(port), "worker",
+                   "--backend", "fake", "--id", f"demo-{index + 1}",
+                   "--send-delay", str(send_delay * (1 + index * skew)), "--no-rate-limit",
+                   "--log-file", os.path.join(workdir, f"worker-{index + 1}.log")]
+        processes.append(subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+    try:
+        deadline = time.monotonic() + 30
+        while len(coordinator.workers) < workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+        started = time.monotonic()
+        batch = coordinator.enqueue("分布式发送演示", [f"演示群{n + 1}" for n in range(messages)], "fake")
+        timeout = started + messages * send_delay * (1 + workers * skew) + 60
+        status = coordinator.status(batch["batch_id"])
+        while not status["batch_done"] and time.monotonic() < timeout:
+            time.sleep(0.1)
+            status = coordinator.status(batch["batch_id"])
+        elapsed = time.monotonic() - started
+        return {
+            "workers": workers,
+            "messages": messages,
+            "elapsed": round(elapsed, 2),
+            "messages_per_minute": round(messages / elapsed * 60, 1) if elapsed else None,
+            "single_desktop_estimate": round(messages * send_delay, 2),
+            "queue": status["queue"],
+            "per_worker": {worker_id: {"sent": w["sent"], "failed": w["failed"], "stolen_from": w["stolen"]}
+                           for worker_id, w in status["workers"].items()},
+            "work_steals": int(wxbot_metrics.WORK_STEALS.get()),
+            "workdir": workdir,
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(10)
+        server.shutdown()
+        server.server_close()
+        coordinator.stop()
+
+
+def main():
+    """主程序入口"""
+    parser = argparse.ArgumentParser(description="wxbot 分布式发送：协调者 / 工作节点")
+    parser.add_argument('--host', type=str, default=None, help='协调者地址（默认取配置 coordinator.host）')
+    parser.add_argument('--port', type=int, default=None, help='协调者端口（默认取配置 coordinator.port）')
+    parser.add_argument('--token', type=str, default=None, help='API 令牌（与配置 coordinator.token 一致）')
+    subparsers = parser.add_subparsers(dest='command')
+
+    subparsers.add_parser('coordinator', help='启动协调者')
+
+    worker_parser = subparsers.add_parser('worker', help='启动工作节点')
+    worker_parser.add_argument('--id', type=str, default=None, help='节点标识（默认 主机名:PID）')
+    worker_parser.add_argument('--senders', type=str, default=None, help='本节点可发送的发送器类型，逗号分隔')
+    worker_parser.add_argument('--backend', type=str, default=None, help='强制使用的发送器类型，例如 fake')
+    worker_parser.add_argument('--send-delay', type=float, default=None, help='模拟发送器的单次发送耗时（秒）')
+    worker_parser.add_argument('--no-rate-limit', action='store_true', help='关闭本节点的发送限流（仅用于测试）')
+    worker_parser.add_argument('--log-file', type=str, default='send_worker.log', help='日志文件')
+
+    send_parser = subparsers.add_parser('send', help='提交消息')
+    send_parser.add_argument('message', type=str, help='消息内容')
+    send_parser.add_argument('-g', '--group', action='append', required=True, help='目标群聊（可重复）')
+    send_parser.add_argument('--sender', type=str, default=None, help='发送器类型')
+    send_parser.add_argument('--key', type=str, default=None, help='幂等键')
+    send_parser.add_argument('--wait', action='store_true', help='等待发送完成')
+
+    status_parser = subparsers.add_parser('status', help='查看队列和工作节点')
+    status_parser.add_argument('--batch-id', type=str, default=None, help='查看指定批次')
+
+    demo_parser = subparsers.add_parser('demo', help='本机启动协调者和多个模拟工作进程')
+    demo_parser.add_argument('--workers', type=int, default=3, help='工作进程数')
+    demo_parser.add_argument('--messages', type=int, default=24, help='消息（群聊）数')
+    demo_parser.add_argument('--send-delay', type=float, default=0.5, help='最快节点的单次发送耗时（秒）')
+    demo_parser.add_argument('--skew', type=float, default=1.0, help='节点间的发送耗时差异')
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return
+
+    config = load_service_config()
+    settings = dict(DEFAULT_COORDINATOR_SETTINGS)
+    settings.update(config.get("coordinator", {}))
+    host = args.host or settings["host"]
+    port = args.port or int(settings["port"])
+    token = args.token or settings.get("token")
+
+    if args.command == 'coordinator':
+        setup_logging('send_coordinator.log', load_logging_settings())
+        server = start_coordinator_server(SendCoordinator(config), host, port)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            logger.info("收到中断，正在停止协调者...")
+        finally:
+            server.shutdown()
+            server.server_close()
+        return
+
+    if args.command == 'worker':
+        setup_logging(args.log_file, load_logging_settings())
+        overrides = {"send_delay": args.send_delay} if args.send_delay is not None else {}
+        senders = [s.strip() for s in args.senders.split(",") if s.strip()] if args.senders else None
+        if args.no_rate_limit:
+            config = dict(config, rate_limits={"global": None, "per_sender": None, "per_group": None})
+        worker = SendWorker(config, CoordinatorClient(host, port, token), args.id, senders, args.backend, overrides)
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.stop()
+        return
+
+    if args.command == 'demo':
+        setup_logging(None, dict(load_logging_settings(), level="WARNING"))
+        print(json.dumps(run_demo(config, args.workers, args.messages, args.send_delay, args.skew),
+                         ensure_ascii=False, indent=2))
+        return
+
+    client = CoordinatorClient(host, port, token)
+    try:
+        if args.command == 'send':
+            result = client.enqueue(args.message, args.group, args.sender, args.key)
+            if args.wait and result.get("batch_id"):
+                result = client.wait_for_batch(result["batch_id"])
+        else:
+            result = client.status(args.batch_id)
+    except urllib.error.URLError as e:
+        print(f"❌ 无法连接协调者 {host}:{port}: {e.reason}")
+        sys.exit(2)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
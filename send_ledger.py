@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+发送幂等账本
+版本：v1.0.0
+创建日期：2026-10-19
+功能：记录每次成功发送的 (群聊, 发送器, 内容哈希, 报告日期)，
+      在任何桌面操作开始之前判断报告是否已在去重窗口内发送过，避免重跑时重复发送
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    sent_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sends_lookup ON sends (content_hash, sender, group_name, sent_at);
+"""
+
+
+class SendLedger:
+    """基于 SQLite 的发送记录"""
+
+    def __init__(self, db_path: str = "send_ledger.db", dedupe_window_hours: float = 24.0):
+        """
+        Args:
+            db_path: 数据库文件路径
+            dedupe_window_hours: 去重窗口（小时），窗口内同一内容发送到同一群聊视为重复；0 表示不限时间
+        """
+        self.db_path = db_path
+        self.dedupe_window_hours = float(dedupe_window_hours)
+        self._lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SendLedger":
+        """根据配置文件中的 send_ledger 段创建账本"""
+        return cls(
+            db_path=config.get("db_path", "send_ledger.db"),
+            dedupe_window_hours=float(config.get("dedupe_window_hours", 24)),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def record(self, sender: str, group_name: str, digest: str,
+               report_date: Optional[str] = None) -> None:
+        """记录一次成功发送"""
+        report_date = report_date or datetime.now().strftime("%Y%m%d")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sends (sender, group_name, content_hash, report_date, sent_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sender, group_name, digest, report_date, time.time()),
+            )
+
+    def last_sent(self, sender: str, group_name: str, digest: str) -> Optional[float]:
+        """返回该内容最近一次发送到该群聊的时间戳"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(sent_at) FROM sends WHERE content_hash = ? AND sender = ? AND group_name = ?",
+                (digest, sender, group_name),
+            ).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def is_duplicate(self, sender: str, group_name: str, digest: str) -> bool:
+        """是否已在去重窗口内发送过相同内容"""
+        sent_at = self.last_sent(sender, group_name, digest)
+        if sent_at is None:
+            return False
+        if self.dedupe_window_hours <= 0:
+            return True
+        return time.time() - sent_at <= self.dedupe_window_hours * 3600
+
+    def filter_pending(self, targets: Iterable[Tuple[str, str]], digest: str) -> List[Tuple[str, str]]:
+        """
+        过滤掉已发送过的目标
+
+        Args:
+            targets: (发送器, 群聊) 列表
+            digest: 内容哈希
+
+        Returns:
+            List[Tuple[str, str]]: 仍需发送的目标
+        """
+        return [(sender, group) for sender, group in targets
+                if not self.is_duplicate(sender, group, digest)]
+
+    def purge(self, older_than_days: float = 90.0) -> int:
+        """删除早于指定天数的记录"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sends WHERE sent_at < ?", (cutoff,))
+        return cursor.rowcount
+
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+发送器健康度统计与自适应排序
+版本：v1.0.0
+创建日期：2026-10-19
+功能：按发送器记录最近 N 次发送的成功率、P95 耗时和连续失败次数，持久化到 JSON 文件；
+      根据健康分数对发送器排序，连续失败的发送器进入冷却期，并以小概率探索非最优发送器
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEALTH_SETTINGS = {
+    "enabled": True,
+    "state_file": "sender_health.json",
+    "window": 50,
+    "max_age_days": 14,
+    "failure_cooldown": 3,
+    "cooldown_minutes": 30,
+    "exploration_rate": 0.1,
+    "latency_reference_seconds": 30.0,
+}
+
+
+@dataclass
+class SenderStats:
+    sender: str
+    samples: int
+    success_rate: float
+    p95_latency: Optional[float]
+    consecutive_failures: int
+    cooldown_until: float
+    score: float
+
+    @property
+    def in_cooldown(self) -> bool:
+        return self.cooldown_until > time.time()
+
+    def describe(self) -> str:
+        p95 = f"{self.p95_latency:.1f}s" if self.p95_latency is not None else "-"
+        cooldown = ""
+        if self.in_cooldown:
+            cooldown = f" | 冷却至 {time.strftime('%H:%M:%S', time.localtime(self.cooldown_until))}"
+        return (f"{self.sender}: 分数 {self.score:.2f} | 成功率 {self.success_rate:.0%} ({self.samples} 次)"
+                f" | P95 {p95} | 连续失败 {self.consecutive_failures}{cooldown}")
+
+
+def _percentile(values: Sequence[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percentile / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class SenderHealthTracker:
+    """发送器滚动健康统计"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, rng: Optional[random.Random] = None):
+        """
+        Args:
+            settings: 配置文件中的 adaptive_routing 段
+            rng: 随机数生成器（探索用，可注入固定种子）
+        """
+        self.settings = dict(DEFAULT_HEALTH_SETTINGS)
+        self.settings.update(settings or {})
+        self.state_file = self.settings["state_file"]
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as file:
+                return json.load(file).get("senders", {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"读取发送器健康状态失败，重新统计: {e}")
+            return {}
+
+    def save(self) -> bool:
+        """原子写入状态文件"""
+        try:
+            with self._lock:
+                data = json.dumps({"version": 1, "senders": self._state}, ensure_ascii=False, indent=2)
+            directory = os.path.dirname(os.path.abspath(self.state_file))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(data)
+            os.replace(tmp_path, self.state_file)
+            return True
+        except Exception as e:
+            logger.error(f"保存发送器健康状态失败: {e}")
+            return False
+
+    def _entry(self, sender: str) -> Dict[str, Any]:
+        return self._state.setdefault(sender, {"samples": [], "consecutive_failures": 0, "cooldown_until": 0.0})
+
+    def record(self, sender: str, success: bool, duration: Optional[float] = None) -> None:
+        """记录一次发送结果"""
+        now = time.time()
+        with self._lock:
+            entry = self._entry(sender)
+            entry["samples"].append([round(now, 3), bool(success), round(duration, 3) if duration else None])
+            max_age = float(self.settings["max_age_days"]) * 86400
+            entry["samples"] = [s for s in entry["samples"] if now - s[0] <= max_age][-int(self.settings["window"]):]
+            if success:
+                entry["consecutive_failures"] = 0
+                entry["cooldown_until"] = 0.0
+            else:
+                entry["consecutive_failures"] += 1
+                if entry["consecutive_failures"] >= int(self.settings["failure_cooldown"]):
+                    entry["cooldown_until"] = now + float(self.settings["cooldown_minutes"]) * 60
+                    logger.warning(f"🧊 发送器 {sender} 连续失败 {entry['consecutive_failures']} 次，"
+                                   f"冷却 {self.settings['cooldown_minutes']} 分钟")
+
+    def stats(self, sender: str) -> SenderStats:
+        """当前统计"""
+        with self._lock:
+            entry = self._state.get(sender) or {"samples": [], "consecutive_failures": 0, "cooldown_until": 0.0}
+            samples = list(entry["samples"])
+            consecutive = int(entry["consecutive_failures"])
+            cooldown_until = float(entry["cooldown_until"])
+
+        successes = sum(1 for s in samples if s[1])
+        # Beta(1,1) 先验：没有样本时成功率按 0.5 计，样本越多越接近真实值
+        success_rate = (successes + 1) / (len(samples) + 2)
+        p95 = _percentile([s[2] for s in samples if s[1] and s[2] is not None], 95)
+        latency_factor = 1.0
+        if p95 is not None:
+            latency_factor = 1.0 / (1.0 + p95 / float(self.settings["latency_reference_seconds"]))
+        score = success_rate * latency_factor * (0.5 ** consecutive)
+        return SenderStats(sender, len(samples), success_rate, p95, consecutive, cooldown_until, score)
+
+    def in_cooldown(self, sender: str) -> bool:
+        return self.stats(sender).in_cooldown
+
+    def rank(self, candidates: Sequence[str]) -> List[str]:
+        """
+        按健康分数排序发送器
+
+        冷却中的发送器排在最后；分数相同时保持传入顺序（即静态优先级）；
+        以 exploration_rate 的概率把一个非最优的健康发送器提到最前，保证统计能持续更新
+
+        Args:
+            candidates: 按静态优先级排列的发送器类型
+
+        Returns:
+            List[str]: 本次使用的顺序
+        """
+        stats = [self.stats(sender) for sender in candidates]
+        healthy = [s for s in stats if not s.in_cooldown]
+        cooling = [s for s in stats if s.in_cooldown]
+        healthy.sort(key=lambda s: -s.score)  # sort 稳定，分数相同时保持静态顺序
+        cooling.sort(key=lambda s: s.cooldown_until)
+        order = [s.sender for s in healthy] + [s.sender for s in cooling]
+
+        if len(healthy) > 1 and self._rng.random() < float(self.settings["exploration_rate"]):
+            explored = self._rng.choice(order[1:len(healthy)])
+            order.remove(explored)
+            order.insert(0, explored)
+            logger.info(f"🎲 探索发送器: {explored}")
+        return order
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+多账号 / 多实例发送器池
+版本：v1.0.0
+创建日期：2026-10-19
+功能：一台机器上同时运行多个微信/企业微信账号时，发现所有已登录的实例，按账号匹配规则识别每个实例属于哪个账号，
+      为每个账号创建绑定到该实例的发送器（虚拟发送器名 "<发送器>@<账号>"），把账号负责的群聊路由到对应实例；
+      同一实例的条目在一次桌面锁会话内连续发送，期间只做句柄有效性检查，不再重新发现
+"""
+
+import copy
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from desktop_lock import DEFAULT_LOCK_TIMEOUT, DesktopLockTimeout, desktop_session
+from desktop_snapshot import get_desktop_snapshot
+from process_watchdog import DEFAULT_WATCHED_APPS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SETTINGS = {
+    "enabled": False,
+    "accounts": [],
+}
+
+# 发送器类型对应的程序（发送器配置中可用 "app" 覆盖）
+SENDER_APPS = {
+    "wxwork": "wxwork",
+    "wechat": "wechat",
+    "wechat_v4": "wechat",
+}
+
+# Weixin 4.x 的主窗口不一定是 WeChatMainWndForPC 类：与个人微信发送器（v3 / v4）查找主窗口的规则一致，
+# 主窗口类优先，没有时退回到该进程有标题的可见窗口（发送器配置中可用 "window_fallback" 覆盖）
+SENDER_WINDOW_FALLBACK = {
+    "wechat": True,
+    "wechat_v4": True,
+}
+
+POOL_SEPARATOR = "@"
+
+
+@dataclass
+class AppInstance:
+    """一个已登录的程序实例"""
+    app: str
+    pid: int
+    create_time: float
+    hwnd: int
+    title: str
+    exe: str = ""
+    cmdline: str = ""
+    username: str = ""
+    index: int = 0  # 同一程序的实例按进程内存从大到小的序号
+
+    def describe(self) -> str:
+        return f"{self.app}#{self.index} (PID {self.pid}, 窗口 {self.hwnd}, {self.username or '-'}, {self.exe or '-'})"
+
+
+def _restored_size(hwnd: int) -> Tuple[int, int]:
+    import win32gui
+
+    left, top, right, bottom = win32gui.GetWindowPlacement(hwnd)[4]
+    return right - left, bottom - top
+
+
+def _process_identity(pid: int) -> Tuple[str, str]:
+    """(命令行, 用户名)，无权限读取时为空"""
+    import psutil
+
+    try:
+        proc = psutil.Process(pid)
+        with proc.oneshot():
+            cmdline = " ".join(proc.cmdline())
+            username = proc.username()
+        return cmdline, username
+    except Exception:
+        return "", ""
+
+
+def _fits(hwnd: int, min_size: Tuple[int, int]) -> bool:
+    try:
+        width, height = _restored_size(hwnd)
+    except Exception:
+        return False
+    return width >= min_size[0] and height >= min_size[1]
+
+
+def _main_window(snapshot, pid: int, spec: Dict[str, Any], classes: Sequence[str], fallback: bool,
+                 min_size: Tuple[int, int]):
+    """进程的已登录主窗口：主窗口类优先；fallback 时没有主窗口类则取有标题的可见窗口中标题最长者"""
+    windows = snapshot.windows_for_pid(pid)
+    main = [w for w in windows if w.class_name.lower() in classes]
+    if main:
+        window = max(main, key=lambda w: (w.visible, w.title == spec.get("main_title"), bool(w.title.strip())))
+        return window if _fits(window.hwnd, min_size) else None
+    if not fallback:
+        return None
+    titled = [w for w in windows if w.visible and w.title.strip() and _fits(w.hwnd, min_size)]
+    return max(titled, key=lambda w: (w.title == spec.get("main_title"), len(w.title))) if titled else None
+
+
+def discover_instances(apps: Sequence[str] = ("wxwork", "wechat"), min_size: Tuple[int, int] = (600, 400),
+                       main_classes: Optional[Dict[str, Sequence[str]]] = None,
+                       fallback_apps: Sequence[str] = ()) -> List[AppInstance]:
+    """
+    发现所有已登录的实例：进程拥有主窗口类的窗口，且窗口（按还原尺寸）不小于登录/扫码窗口
+
+    Args:
+        apps: 程序名（DEFAULT_WATCHED_APPS 中的键）
+        min_size: 已登录主窗口的最小尺寸
+        main_classes: 各程序额外认可的主窗口类（在 DEFAULT_WATCHED_APPS 的 main_classes 之外）
+        fallback_apps: 没有主窗口类时退回到有标题可见窗口的程序（Weixin 4.x）
+    """
+    snapshot = get_desktop_snapshot(0)
+    instances: List[AppInstance] = []
+    for app in apps:
+        spec = DEFAULT_WATCHED_APPS[app]
+        classes = {name.lower() for name in list(spec["main_classes"]) + list((main_classes or {}).get(app, []))}
+        processes = sorted(snapshot.find_processes(spec["process_names"], exact=True), key=lambda p: -p.memory_mb)
+        index = 0
+        for process in processes:
+            window = _main_window(snapshot, process.pid, spec, classes, app in fallback_apps, min_size)
+            if window is None:
+                logger.info(f"跳过没有已登录主窗口的 {app} 实例 PID {process.pid}")
+                continue
+            cmdline, username = _process_identity(process.pid)
+            instances.append(AppInstance(app, process.pid, process.create_time, window.hwnd, window.title,
+                                         process.exe, cmdline, username, index))
+            index += 1
+    return instances
+
+
+class AccountMatcher:
+    """
+    账号匹配规则，所有给出的条件都满足才算匹配：
+    exe_contains / cmdline_contains / title_contains（不区分大小写的包含匹配）、username（不区分大小写的完整匹配）、
+    index（同一程序按内存从大到小的实例序号）。没有任何条件时匹配该程序唯一的实例
+    """
+
+    KEYS = ("exe_contains", "cmdline_contains", "title_contains", "username", "index")
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        self.rules = {key: value for key, value in (rules or {}).items() if key in self.KEYS}
+
+    def matches(self, instance: AppInstance) -> bool:
+        for key, value in self.rules.items():
+            if key == "index":
+                if instance.index != int(value):
+                    return False
+            elif key == "username":
+                if instance.username.lower() != str(value).lower() and \
+                        instance.username.split("\\")[-1].lower() != str(value).lower():
+                    return False
+            else:
+                field = {"exe_contains": instance.exe, "cmdline_contains": instance.cmdline,
+                         "title_contains": instance.title}[key]
+                if str(value).lower() not in field.lower():
+                    return False
+        return True
+
+
+@dataclass
+class PoolAccount:
+    name: str
+    sender: str
+    app: str
+    groups: List[str]
+    matcher: AccountMatcher
+    overrides: Dict[str, Any]
+    main_classes: Sequence[str] = ()
+    window_fallback: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.sender}{POOL_SEPARATOR}{self.name}"
+
+
+class SenderPool:
+    """账号 → 实例的发现、绑定与调度"""
+
+    def __init__(self, accounts: List[PoolAccount]):
+        self.accounts = accounts
+        self.instances: Dict[str, AppInstance] = {}
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any], senders_config: Dict[str, Dict[str, Any]]) -> "SenderPool":
+        """
+        Args:
+            settings: 配置中的 sender_pool 段，accounts 每项为
+                {"name", "sender", "match": {...}, "groups": [...], 其余键覆盖发送器配置}
+            senders_config: 配置中的 senders 段
+        """
+        accounts = []
+        for item in settings.get("accounts", []):
+            sender = item.get("sender", "wxwork")
+            if sender not in senders_config:
+                logger.warning(f"账号 {item.get('name')} 引用了未配置的发送器 {sender}，忽略")
+                continue
+            app = senders_config[sender].get("app") or SENDER_APPS.get(senders_config[sender].get("type", sender))
+            if app not in DEFAULT_WATCHED_APPS:
+                logger.warning(f"无法确定发送器 {sender} 对应的程序，忽略账号 {item.get('name')}")
+                continue
+            overrides = {k: v for k, v in item.items() if k not in ("name", "sender", "match", "groups")}
+            sender_config = dict(senders_config[sender], **overrides)
+            fallback = sender_config.get("window_fallback",
+                                         SENDER_WINDOW_FALLBACK.get(sender_config.get("type", sender), False))
+            accounts.append(PoolAccount(item["name"], sender, app, list(item.get("groups", [])),
+                                        AccountMatcher(item.get("match")), overrides,
+                                        list(sender_config.get("main_classes", [])), bool(fallback)))
+        return cls(accounts)
+
+    def is_pool_key(self, sender_key: str) -> bool:
+        return any(account.key == sender_key for account in self.accounts)
+
+    def discover(self) -> Dict[str, AppInstance]:
+        """发现实例并为每个账号匹配唯一的实例（匹配不到或匹配到多个时该账号不可用）"""
+        apps = sorted({account.app for account in self.accounts})
+        main_classes: Dict[str, List[str]] = {}
+        for account in self.accounts:
+            main_classes.setdefault(account.app, []).extend(account.main_classes)
+        fallback_apps = {account.app for account in self.accounts if account.window_fallback}
+        instances = discover_instances(apps, main_classes=main_classes, fallback_apps=fallback_apps) if apps else []
+        for instance in instances:
+            logger.info(f"🔎 发现实例: {instance.describe()}")
+
+        self.instances = {}
+        claimed: Dict[Tuple[str, int], str] = {}
+        for account in self.accounts:
+            matched = [i for i in instances if i.app == account.app and account.matcher.matches(i)]
+            if len(matched) != 1:
+                logger.warning(f"⚠️ 账号 {account.key} 匹配到 {len(matched)} 个实例，暂不可用")
+                continue
+            instance = matched[0]
+            owner = claimed.get((instance.app, instance.pid))
+            if owner:
+                logger.warning(f"⚠️ 账号 {account.key} 与 {owner} 匹配到同一实例 PID {instance.pid}，暂不可用")
+                continue
+            claimed[(instance.app, instance.pid)] = account.key
+            self.instances[account.key] = instance
+            logger.info(f"👤 账号 {account.key} → {instance.describe()}")
+        return self.instances
+
+    def sender_config(self, account: PoolAccount, senders_config: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """账号的发送器配置：基础发送器配置 + 账号覆盖项，群聊为账号负责的群聊"""
+        config = copy.deepcopy(senders_config[account.sender])
+        config.update(copy.deepcopy(account.overrides))
+        config["account"] = account.name
+        config["target_groups"] = [{"name": group, "enabled": True} for group in account.groups]
+        if account.groups:
+            config["default_group"] = account.groups[0]
+        return config
+
+    def routed_groups(self, sender: str) -> List[str]:
+        """由账号负责的群聊（这些群聊不再通过基础发送器发送，避免从错误的账号发出）"""
+        return [group for account in self.accounts if account.sender == sender for group in account.groups]
+
+    def create_senders(self, senders_config: Dict[str, Dict[str, Any]],
+                       create: Callable[[str, Dict[str, Any]], Any]) -> Dict[str, Tuple[Any, Dict[str, Any]]]:
+        """
+        为每个已匹配实例的账号创建并绑定发送器
+
+        Args:
+            create: create(sender_type, config) → 发送器实例或 None
+
+        Returns:
+            Dict[str, Tuple[发送器, 配置]]: {"<发送器>@<账号>": (发送器, 配置)}
+        """
+        created = {}
+        for account in self.accounts:
+            instance = self.instances.get(account.key)
+            if instance is None:
+                continue
+            config = self.sender_config(account, senders_config)
+            sender = create(account.sender, config)
+            if sender is None:
+                continue
+            if not sender.bind_instance(instance.pid, instance.hwnd):
+                logger.warning(f"⚠️ 发送器 {account.sender} 不支持绑定实例，账号 {account.key} 不可用")
+                continue
+            created[account.key] = (sender, config)
+        return created
+
+    def expand_order(self, order: Sequence[str]) -> List[str]:
+        """在每个基础发送器之前插入其账号发送器（账号发送器只负责自己的群聊，不与基础发送器争抢）"""
+        expanded = []
+        for sender in order:
+            expanded.extend(account.key for account in self.accounts if account.sender == sender)
+            expanded.append(sender)
+        return list(dict.fromkeys(expanded))
+
+    @contextmanager
+    def batch_session(self, sender_key: str, timeout: Optional[float] = DEFAULT_LOCK_TIMEOUT) -> Iterator[bool]:
+        """
+        在一次桌面锁会话内连续发送同一实例的一批条目（锁可重入，发送方法内部的加锁直接通过）
+
+        Yields:
+            bool: 是否获得了会话锁（超时时各条目仍在发送时各自加锁）
+        """
+        if not self.is_pool_key(sender_key):
+            yield False
+            return
+        try:
+            session = desktop_session(f"pool:{sender_key}", timeout)
+            session.__enter__()
+        except DesktopLockTimeout as e:
+            logger.warning(f"⚠️ {e}")
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            session.__exit__(None, None, None)
+
+
+def main():
+    """列出已登录的实例及 auto_report_config.json 中各账号的匹配结果"""
+    import json
+
+    from logging_setup import setup_logging
+
+    setup_logging()
+    with open("auto_report_config.json", "r", encoding="utf-8") as f:
+        config = json.load(f)
+    print("已登录实例:")
+    for instance in discover_instances():
+        print(f"  {instance.describe()}  标题: {instance.title}")
+    settings = config.get("sender_pool", {})
+    if settings.get("accounts"):
+        pool = SenderPool.from_config(settings, config.get("senders", {}))
+        matched = pool.discover()
+        print("账号匹配:")
+        for account in pool.accounts:
+            instance = matched.get(account.key)
+            print(f"  {account.key}: {instance.describe() if instance else '未匹配'}  群聊: {account.groups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,98 +7,38 @@
 import logging
 import time
 import win32gui
-import win32process
-import psutil
 import json
 from datetime import datetime
 
+from wxwork_window_finder import find_wxwork_main_window as _find_main_window
+
 logger = logging.getLogger(__name__)
 
 def find_wxwork_main_window():
-    """查找企业微信主窗口 - 基于测试通过的逻辑"""
+    """查找企业微信主窗口 - 基于测试通过的逻辑（共享进程/窗口索引）"""
 
     logger.info("🔍 查找企业微信主窗口...")
 
-    # 1. 检测企业微信进程
-    wxwork_processes = []
-    process_names = ["WXWork.exe", "wxwork.exe"]
-
-    for proc in psutil.process_iter(['pid', 'name', 'exe', 'memory_info']):
-        try:
-            proc_name = proc.info['name']
-            if any(name.lower() in proc_name.lower() for name in process_names):
-                memory_mb = proc.info['memory_info'].rss / 1024 / 1024
-                wxwork_processes.append({
-                    'pid': proc.pid,
-                    'name': proc_name,
-                    'memory_mb': memory_mb
-                })
-                logger.info(f"  找到进程: {proc_name} (PID: {proc.pid}, 内存: {memory_mb:.1f}MB)")
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-
-    if not wxwork_processes:
-        logger.error("❌ 未找到企业微信进程")
-        return None
-
-    # 选择内存最大的进程（主进程）
-    main_process = max(wxwork_processes, key=lambda p: p['memory_mb'])
-    logger.info(f"✅ 选定主进程: PID {main_process['pid']} ({main_process['memory_mb']:.1f}MB)")
-
-    # 2. 枚举窗口
-    def enum_windows_callback(hwnd, windows_list):
-        try:
-            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-            class_name = win32gui.GetClassName(hwnd)
-            window_title = win32gui.GetWindowText(hwnd)
-            is_visible = win32gui.IsWindowVisible(hwnd)
-
-            windows_list.append({
-                'hwnd': hwnd,
-                'pid': window_pid,
-                'class': class_name,
-                'title': window_title,
-                'visible': is_visible
-            })
-        except Exception:
-            pass
-
-    windows_list = []
-    win32gui.EnumWindows(enum_windows_callback, windows_list)
-
-    # 查找属于企业微信进程的窗口
-    wxwork_windows = [w for w in windows_list if w['pid'] == main_process['pid']]
-
-    logger.info(f"  找到 {len(wxwork_windows)} 个企业微信窗口")
-
-    # 3. 查找主窗口
-    main_candidates = []
-    for w in wxwork_windows:
-        if w['class'].lower() == 'weworkwindow':
-            score = 0
-            if w['title'] == '企业微信':
-                score += 10
-            if w['visible']:
-                score += 5
-            if w['title'].strip():
-                score += 2
-
-            w['score'] = score
-            main_candidates.append(w)
-            logger.info(f"    候选窗口: '{w['title']}' (分数: {score})")
-
-    if not main_candidates:
-        logger.error("❌ 未找到 WeWorkWindow 类型的窗口")
+    # 1. 按自适应顺序运行各主窗口选择策略（标准特征、主进程打分、WeWorkWindow 类等）
+    found = _find_main_window(["WXWork.exe", "wxwork.exe"])
+    if not found:
+        logger.error("❌ 未找到企业微信进程或 WeWorkWindow 类型的窗口")
         return None
 
-    # 选择得分最高的窗口
-    best_window = max(main_candidates, key=lambda x: x['score'])
-    logger.info(f"✅ 找到主窗口: '{best_window['title']}' (句柄: {best_window['hwnd']})")
+    process, window = found
+    logger.info(f"✅ 选定进程: PID {process.pid} ({process.memory_mb:.1f}MB)")
+    logger.info(f"✅ 找到主窗口: '{window.title}' (句柄: {window.hwnd})")
 
-    # 4. 验证窗口
-    if win32gui.IsWindow(best_window['hwnd']) and win32gui.IsWindowVisible(best_window['hwnd']):
+    # 2. 验证窗口
+    if win32gui.IsWindow(window.hwnd) and win32gui.IsWindowVisible(window.hwnd):
         logger.info("✅ 窗口验证通过")
-        return best_window
+        return {
+            'hwnd': window.hwnd,
+            'pid': window.pid,
+            'class': window.class_name,
+            'title': window.title,
+            'visible': window.visible
+        }
     else:
         logger.error("❌ 窗口验证失败")
         return None
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+备用发送器热备
+版本：v1.0.0
+创建日期：2026-10-19
+功能：主发送器工作期间，在后台线程以较低频率调用备用发送器的 refresh_standby()，
+      保持其窗口句柄已解析、进程存活、已登录的验证状态（不抢占前台），
+      主发送器失败时回退可以立即开始，而不是从全量扫描和激活重试开始冷启动
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from message_sender_interface import MessageSenderInterface
+import wxbot_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STANDBY_SETTINGS = {
+    "enabled": True,
+    "refresh_seconds": 30.0,
+}
+
+
+class StandbyKeeper:
+    """后台刷新备用发送器的热备状态"""
+
+    def __init__(self, senders: Dict[str, MessageSenderInterface], standby: Sequence[str],
+                 refresh_seconds: float = 30.0):
+        """
+        Args:
+            senders: 已初始化的发送器
+            standby: 需要保持热备的发送器类型（通常为排在主发送器之后的发送器）
+            refresh_seconds: 刷新间隔（秒）
+        """
+        self.senders = senders
+        self.standby: List[str] = [t for t in standby if t in senders]
+        self.refresh_seconds = float(refresh_seconds)
+        self._ready: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.standby or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="wxbot-standby", daemon=True)
+        self._thread.start()
+        logger.info(f"🔥 热备发送器: {self.standby}（每 {self.refresh_seconds:g}s 刷新）")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def refresh(self) -> None:
+        """立即刷新一次所有备用发送器"""
+        for sender_type in self.standby:
+            if self._stop.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                ready = bool(self.senders[sender_type].refresh_standby())
+            except Exception as e:
+                logger.warning(f"热备刷新 {sender_type} 出错: {e}")
+                ready = False
+            with self._lock:
+                if ready:
+                    self._ready[sender_type] = time.monotonic()
+                else:
+                    self._ready.pop(sender_type, None)
+            wxbot_metrics.STANDBY_READY.set(1 if ready else 0, sender=sender_type)
+            logger.debug(f"热备刷新 {sender_type}: {'就绪' if ready else '不可用'} "
+                         f"({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    def is_ready(self, sender_type: str) -> bool:
+        """最近一次刷新是否确认该发送器就绪（且未超过两个刷新周期）"""
+        with self._lock:
+            refreshed_at = self._ready.get(sender_type)
+        return refreshed_at is not None and time.monotonic() - refreshed_at <= 2 * self.refresh_seconds
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.refresh_seconds)
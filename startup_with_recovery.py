@@ -4,6 +4,7 @@
 解决重启后识别不到问题的完整方案
 """
 
+import functools
 import sys
 import time
 import logging
@@ -11,26 +12,25 @@ import subprocess
 from datetime import datetime
 from auto_recovery_config import AutoRecoveryConfig
 from wxwork_sender_fixed import WXWorkSenderFixed
+from desktop_lock import DesktopLockTimeout, desktop_session
+from process_watchdog import DEFAULT_WATCHDOG_SETTINGS, ProcessEventKind, ProcessWatchdog
+from logging_setup import load_logging_settings, setup_logging as install_logging
+
+_logging_installed = False
 
 def setup_logging():
-    """设置日志"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('startup_recovery.log', encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    """设置日志（只安装一次，定时模式下重复调用 main() 不会重复添加处理器）"""
+    global _logging_installed
+    if _logging_installed:
+        return
+    install_logging('startup_recovery.log', load_logging_settings())
+    _logging_installed = True
 
 def check_wxwork_running():
     """检查企业微信是否运行"""
     try:
-        import psutil
-        for proc in psutil.process_iter(['name']):
-            if proc.info['name'].lower() in ['wxwork.exe', 'wework.exe']:
-                return True
-        return False
+        from desktop_snapshot import get_desktop_snapshot
+        return bool(get_desktop_snapshot().find_processes(['wxwork.exe', 'wework.exe'], exact=True, details=False))
     except Exception:
         return False
 
@@ -60,25 +60,38 @@ def start_wxwork():
         logger.error(f"启动企业微信失败: {e}")
         return False
 
-def wait_for_wxwork_ready(timeout=60):
-    """等待企业微信完全启动"""
+def wait_for_wxwork_ready(timeout=60, watchdog=None):
+    """等待企业微信完全启动（主窗口出现且可见即视为就绪，不再固定等待）"""
     logger = logging.getLogger(__name__)
     logger.info("等待企业微信完全启动...")
 
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        if check_wxwork_running():
-            # 额外等待UI完全加载
-            time.sleep(5)
-            logger.info("企业微信已启动")
-            return True
-        time.sleep(1)
+    if watchdog is not None:
+        ready = watchdog.wait_ready("wxwork", timeout)
+    else:
+        with ProcessWatchdog.from_config(AutoRecoveryConfig().config.get("watchdog")) as temporary:
+            ready = temporary.wait_ready("wxwork", timeout)
+
+    if ready:
+        logger.info(f"企业微信已就绪 (PID {ready.pid}, 窗口 {ready.hwnd})")
+        return True
 
     logger.error("等待企业微信启动超时")
     return False
 
-def main():
-    """主函数"""
+def invalidate_wxwork_handles(config, event):
+    """看门狗回调：企业微信进程退出或重新启动时立即清除配置中的旧窗口句柄"""
+    if event.kind in (ProcessEventKind.EXIT, ProcessEventKind.START):
+        # 与 main() 共用同一个配置对象和锁；清除前会重新读取配置文件，不覆盖其他进程写入的内容
+        config.invalidate_handles(event.app)
+
+def main(watchdog=None, config=None):
+    """
+    主函数
+
+    Args:
+        watchdog: 已启动的进程看门狗（定时模式下复用），为 None 时按需临时创建
+        config: 恢复配置（定时模式下与看门狗回调共用），为 None 时新建
+    """
     setup_logging()
     logger = logging.getLogger(__name__)
 
@@ -88,13 +101,14 @@ def main():
     logger.info("=" * 60)
 
     # 1. 初始化恢复配置
-    config = AutoRecoveryConfig()
+    config = config or AutoRecoveryConfig()
+    ready_timeout = config.config.get("watchdog", {}).get("ready_timeout", DEFAULT_WATCHDOG_SETTINGS["ready_timeout"])
 
     # 2. 检查企业微信是否运行
     if not check_wxwork_running():
         logger.info("企业微信未运行，尝试启动...")
         if start_wxwork():
-            if not wait_for_wxwork_ready():
+            if not wait_for_wxwork_ready(ready_timeout, watchdog):
                 logger.error("企业微信启动失败")
                 return False
         else:
@@ -102,6 +116,10 @@ def main():
             return False
     else:
         logger.info("企业微信已在运行")
+        # 刚重启的企业微信可能还在登录/加载，等主窗口出现（已就绪时立即返回）
+        if watchdog is not None and not wait_for_wxwork_ready(ready_timeout, watchdog):
+            logger.error("企业微信主窗口未就绪")
+            return False
 
     # 3. 清除旧的窗口句柄（确保重新检测）
     if config.is_recovery_enabled():
@@ -112,8 +130,15 @@ def main():
     logger.info("初始化企业微信发送器...")
     sender = WXWorkSenderFixed()
 
-    # 5. 尝试初始化（带重试机制）
-    if sender.initialize():
+    # 5. 尝试初始化（带重试机制；初始化会激活窗口，在桌面锁下进行，避免与其他发送任务抢占鼠标键盘）
+    try:
+        with desktop_session("startup_with_recovery"):
+            initialized = sender.initialize()
+    except DesktopLockTimeout as e:
+        logger.error(f"❌ {e}")
+        return False
+
+    if initialized:
         logger.info("✅ 企业微信发送器初始化成功！")
 
         # 6. 更新配置中的窗口句柄
@@ -139,29 +164,40 @@ def main():
         return False
 
 def run_with_schedule():
-    """定时运行版本"""
+    """定时运行版本：每 30 分钟检查一次，看门狗发现企业微信退出时立即恢复"""
+    setup_logging()
     logger = logging.getLogger(__name__)
 
-    while True:
-        try:
-            logger.info("\n" + "=" * 50)
-            logger.info("定时检查企业微信状态...")
-
-            if main():
-                logger.info("系统运行正常")
-            else:
-                logger.warning("系统检查发现问题")
-
-            # 每30分钟检查一次
-            logger.info("下次检查时间: 30分钟后")
-            time.sleep(30 * 60)
-
-        except KeyboardInterrupt:
-            logger.info("用户中断，程序退出")
-            break
-        except Exception as e:
-            logger.error(f"定时检查出错: {e}")
-            time.sleep(60)  # 出错后1分钟后重试
+    config = AutoRecoveryConfig()
+    watchdog = ProcessWatchdog.from_config(config.config.get("watchdog"))
+    watchdog.subscribe(functools.partial(invalidate_wxwork_handles, config))
+    watchdog.start()
+
+    try:
+        while True:
+            try:
+                logger.info("\n" + "=" * 50)
+                logger.info("定时检查企业微信状态...")
+
+                if main(watchdog, config):
+                    logger.info("系统运行正常")
+                else:
+                    logger.warning("系统检查发现问题")
+
+                # 每30分钟检查一次；期间企业微信退出则立即检查
+                logger.info("下次检查时间: 30分钟后（企业微信退出时立即检查）")
+                event = watchdog.wait_for([ProcessEventKind.EXIT], "wxwork", timeout=30 * 60)
+                if event:
+                    logger.warning(f"企业微信进程退出 (PID {event.pid})，立即恢复")
+
+            except KeyboardInterrupt:
+                logger.info("用户中断，程序退出")
+                break
+            except Exception as e:
+                logger.error(f"定时检查出错: {e}")
+                time.sleep(60)  # 出错后1分钟后重试
+    finally:
+        watchdog.stop()
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--schedule":
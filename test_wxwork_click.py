@@ -11,9 +11,8 @@ import win32con
 import pyautogui
 import sys
 from simple_wxwork_fix import find_wxwork_main_window
+from logging_setup import setup_logging
 
-# 设置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def test_window_activation(hwnd):
@@ -242,6 +241,7 @@ def main():
         return test_search_group(hwnd)
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         success = main()
         if success:
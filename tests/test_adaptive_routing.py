@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""冷却中的发送器排在最后但仍会尝试（单发送器时不能因冷却而整批不发送）"""
+
+import json
+from datetime import datetime
+
+from auto_daily_report_v2 import AutoReportSystemV2
+from delivery_queue import DeliveryState
+from fake_desktop import FakeDesktopSender
+
+GROUPS = ["日报群", "值班群"]
+
+
+def _system(tmp_path, monkeypatch, senders, groups=None):
+    monkeypatch.chdir(tmp_path)
+    groups = groups or {}
+    config = {
+        "version": "2.0",
+        "default_sender": senders[0],
+        "sender_priority": senders,
+        "senders": {name: {"type": "fake", "target_groups": [{"name": g, "enabled": True}
+                                                             for g in groups.get(name, GROUPS)]}
+                    for name in senders},
+        "rate_limits": {"global": None, "per_sender": None, "per_group": None},
+        "standby": {"enabled": False},
+    }
+    (tmp_path / "auto_report_config.json").write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    report = tmp_path / f"storage_report_{datetime.now().strftime('%Y%m%d')}.txt"
+    report.write_text("存储日报", encoding="utf-8")
+    system = AutoReportSystemV2()
+    system.available_senders = {name: FakeDesktopSender({}) for name in senders}
+    for sender in system.available_senders.values():
+        sender.initialize()
+    return system
+
+
+def _cool_down(system, sender):
+    for _ in range(int(system.sender_health.settings["failure_cooldown"])):
+        system.sender_health.record(sender, False, 1.0)
+    assert system.sender_health.in_cooldown(sender)
+
+
+def test_single_cooling_sender_still_sends(tmp_path, monkeypatch):
+    system = _system(tmp_path, monkeypatch, ["fake"])
+    _cool_down(system, "fake")
+
+    assert system.send_reports_with_fallback()
+    assert [m["group"] for m in system.available_senders["fake"].sent_messages] == GROUPS
+
+
+def test_cooling_sender_is_tried_last(tmp_path, monkeypatch):
+    system = _system(tmp_path, monkeypatch, ["wechat", "wxwork"])
+    _cool_down(system, "wechat")
+
+    assert system.rank_senders(["wechat", "wxwork"]) == ["wxwork", "wechat"]
+    assert system.send_reports_with_fallback()
+    assert system.available_senders["wechat"].sent_messages == []
+    assert len(system.available_senders["wxwork"].sent_messages) == len(GROUPS)
+
+
+def test_destination_served_only_by_cooling_sender_is_queued(tmp_path, monkeypatch):
+    system = _system(tmp_path, monkeypatch, ["wechat", "wxwork"], {"wxwork": GROUPS[:1]})
+    _cool_down(system, "wechat")
+
+    assert system.send_reports_with_fallback()
+    sent = {(item.sender, item.group_name) for item in system.delivery_queue.get_items(state=DeliveryState.SENT)}
+    assert sent == {("wxwork", GROUPS[0]), ("wechat", GROUPS[1])}
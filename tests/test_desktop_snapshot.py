@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""进程索引按 (pid, create_time) 识别进程：PID 被复用时不能沿用旧进程的名称"""
+
+import sys
+import types
+from contextlib import contextmanager
+
+import pytest
+
+from desktop_snapshot import DesktopSnapshot
+
+
+class FakePsutil(types.ModuleType):
+    """只实现 desktop_snapshot 用到的接口，进程表为 {pid: (name, create_time)}"""
+
+    class NoSuchProcess(Exception):
+        pass
+
+    class ZombieProcess(NoSuchProcess):
+        pass
+
+    class AccessDenied(Exception):
+        pass
+
+    def __init__(self):
+        super().__init__("psutil")
+        self.table = {}
+        fake = self
+
+        class Process:
+            def __init__(self, pid):
+                if pid not in fake.table:
+                    raise fake.NoSuchProcess(pid)
+                self.pid = pid
+
+            def _entry(self):
+                if self.pid not in fake.table:
+                    raise fake.NoSuchProcess(self.pid)
+                return fake.table[self.pid]
+
+            def as_dict(self, attrs, ad_value=None):
+                name, create_time = self._entry()
+                return {"name": name, "create_time": create_time}
+
+            def create_time(self):
+                return self._entry()[1]
+
+            @contextmanager
+            def oneshot(self):
+                yield
+
+            def memory_info(self):
+                return types.SimpleNamespace(rss=100 * 1024 * 1024)
+
+            def exe(self):
+                return f"C:/Program Files/{self._entry()[0]}"
+
+        self.Process = Process
+
+    def pids(self):
+        return list(self.table)
+
+
+@pytest.fixture
+def psutil(monkeypatch):
+    fake = FakePsutil()
+    monkeypatch.setitem(sys.modules, "psutil", fake)
+    return fake
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    snapshot = DesktopSnapshot()
+    monkeypatch.setattr(snapshot, "_refresh_windows", lambda: 0)
+    return snapshot
+
+
+def test_recycled_pid_is_reloaded(psutil, snapshot):
+    psutil.table = {100: ("notepad.exe", 1000.0)}
+    snapshot.refresh()
+    assert snapshot.find_processes(["WXWork.exe"], exact=True) == []
+
+    # notepad 退出后企业微信启动并拿到了同一个 PID
+    psutil.table = {100: ("WXWork.exe", 2000.0)}
+    snapshot.refresh()
+
+    found = snapshot.find_processes(["WXWork.exe"], exact=True)
+    assert [(p.pid, p.create_time) for p in found] == [(100, 2000.0)]
+
+
+def test_surviving_process_is_not_reloaded(psutil, snapshot):
+    psutil.table = {100: ("WXWork.exe", 1000.0)}
+    snapshot.refresh()
+    before = snapshot.find_processes(["WXWork.exe"], exact=True)[0]
+
+    snapshot.refresh()
+
+    after = snapshot.find_processes(["WXWork.exe"], exact=True)[0]
+    assert after is before
+    assert after.exe.endswith("WXWork.exe")
+
+
+def test_exited_process_is_dropped(psutil, snapshot):
+    psutil.table = {100: ("WXWork.exe", 1000.0), 200: ("Weixin.exe", 1500.0)}
+    snapshot.refresh()
+    del psutil.table[100]
+
+    snapshot.refresh()
+
+    assert [p.pid for p in snapshot.processes] == [200]
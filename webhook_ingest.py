@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+企业微信群机器人 Webhook 兼容入口
+版本：v1.0.0
+创建日期：2026-10-19
+功能：在本机监听与企业微信群机器人相同格式的请求（POST /cgi-bin/webhook/send?key=...，msgtype 为 text / markdown），
+      按 key 映射到配置的目标群聊，同一群聊在合并窗口内到达的多条消息合并为一次粘贴，
+      再交给常驻服务的发送队列，突发告警每个群只产生一次界面发送
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/cgi-bin/webhook/send"
+
+DEFAULT_WEBHOOK_SETTINGS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 8766,
+    "coalesce_seconds": 5.0,
+    "max_batch_messages": 20,
+    "max_batch_chars": 3000,
+    "separator": "\n\n",
+    "keys": {},
+}
+
+# 与企业微信接口一致的错误码
+ERR_OK = (0, "ok")
+ERR_INVALID_KEY = (93000, "invalid webhook url")
+ERR_INVALID_JSON = (40001, "invalid json")
+ERR_INVALID_MSGTYPE = (40008, "invalid message type")
+ERR_EMPTY_CONTENT = (44004, "empty content")
+ERR_INVALID_PARAM = (40035, "invalid parameter")
+# 请求体本身格式错误时以 HTTP 400 回复，其余错误与企业微信一致以 HTTP 200 + errcode 回复
+BAD_REQUEST_ERRORS = (ERR_INVALID_JSON, ERR_INVALID_PARAM)
+
+
+def markdown_to_text(content: str) -> str:
+    """把企业微信 markdown 转为适合粘贴的纯文本"""
+    text = re.sub(r"<font[^>]*>(.*?)</font>", r"\1", content, flags=re.S)
+    text = re.sub(r"\[([^\]]+)\]\(([^)]+)\)", r"\1 \2", text)
+    text = re.sub(r"^\s{0,3}#{1,6}\s*", "", text, flags=re.M)
+    text = re.sub(r"^\s{0,3}>\s?", "", text, flags=re.M)
+    text = re.sub(r"(\*\*|__|`)", "", text)
+    return text.strip()
+
+
+def parse_webhook_message(payload: Dict[str, Any]) -> Tuple[Optional[str], Tuple[int, str]]:
+    """
+    解析群机器人消息体
+
+    Returns:
+        Tuple[Optional[str], Tuple[int, str]]: (纯文本内容, (errcode, errmsg))
+    """
+    msgtype = payload.get("msgtype")
+    if msgtype not in ("text", "markdown"):
+        return None, ERR_INVALID_MSGTYPE
+    body = payload.get(msgtype) or {}
+    if not isinstance(body, dict):
+        return None, ERR_INVALID_PARAM
+    if msgtype == "text":
+        content = str(body.get("content", "")).strip()
+        mentioned = body.get("mentioned_list") or []
+        mentioned_mobiles = body.get("mentioned_mobile_list") or []
+        if not isinstance(mentioned, list) or not isinstance(mentioned_mobiles, list):
+            return None, ERR_INVALID_PARAM
+        mentions = [str(name) for name in mentioned + mentioned_mobiles if name]
+        if content and mentions:
+            content += "\n" + " ".join("@所有人" if name == "@all" else f"@{name}" for name in mentions)
+    else:
+        content = markdown_to_text(str(body.get("content", "")))
+    if not content:
+        return None, ERR_EMPTY_CONTENT
+    return content, ERR_OK
+
+
+class MessageCoalescer:
+    """按 (发送器, 群聊) 合并短时间内到达的消息"""
+
+    def __init__(self, flush: Callable[[str, str, str], Any], window: float = 5.0,
+                 max_messages: int = 20, max_chars: int = 3000, separator: str = "\n\n"):
+        """
+        Args:
+            flush: 合并完成后的回调 flush(sender, group, message)
+            window: 合并窗口（秒），从该群第一条消息到达开始计时
+            max_messages: 单次合并的最大消息条数
+            max_chars: 单次合并的最大字符数
+            separator: 消息之间的分隔
+        """
+        self._flush = flush
+        self.window = float(window)
+        self.max_messages = int(max_messages)
+        self.max_chars = int(max_chars)
+        self.separator = separator
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="wxbot-webhook-coalescer", daemon=True)
+        self._thread.start()
+
+    def add(self, sender: str, group: str, message: str) -> None:
+        """加入一条消息"""
+        ready = []
+        with self._condition:
+            key = (sender, group)
+            batch = self._pending.get(key)
+            if batch and (len(batch["messages"]) >= self.max_messages
+                          or batch["chars"] + len(self.separator) + len(message) > self.max_chars):
+                ready.append((key, self._pending.pop(key)))
+                batch = None
+            if batch is None:
+                batch = {"messages": [], "chars": 0, "deadline": time.monotonic() + self.window}
+                self._pending[key] = batch
+            batch["messages"].append(message)
+            batch["chars"] += len(message) + (len(self.separator) if len(batch["messages"]) > 1 else 0)
+            self._condition.notify()
+        self._emit(ready)
+
+    def flush_all(self) -> None:
+        """立即发出所有待合并的消息"""
+        with self._condition:
+            ready = list(self._pending.items())
+            self._pending.clear()
+        self._emit(ready)
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(5)
+        self.flush_all()
+
+    def _emit(self, ready: List[Tuple[Tuple[str, str], Dict[str, Any]]]) -> None:
+        for (sender, group), batch in ready:
+            count = len(batch["messages"])
+            try:
+                self._flush(sender, group, self.separator.join(batch["messages"]))
+                logger.info(f"📦 合并 {count} 条 webhook 消息发送到 {sender}:{group}")
+            except Exception as e:
+                logger.error(f"提交合并消息失败 {sender}:{group}: {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                ready = [(key, batch) for key, batch in self._pending.items() if batch["deadline"] <= now]
+                for key, _ in ready:
+                    del self._pending[key]
+                if not ready:
+                    deadlines = [batch["deadline"] for batch in self._pending.values()]
+                    self._condition.wait(max(0.01, min(deadlines) - now) if deadlines else None)
+                    continue
+            self._emit(ready)
+
+
+class WebhookIngestor:
+    """把 webhook 请求映射为目标群聊并合并后提交"""
+
+    def __init__(self, settings: Dict[str, Any], submit: Callable[[str, List[str], Optional[str]], Any]):
+        """
+        Args:
+            settings: 配置文件中的 webhook 段
+            submit: 提交回调 submit(message, groups, sender)，通常为 WxbotService.enqueue
+        """
+        self.settings = dict(DEFAULT_WEBHOOK_SETTINGS)
+        self.settings.update(settings or {})
+        self._submit = submit
+        self.coalescer = MessageCoalescer(
+            self._flush,
+            window=self.settings["coalesce_seconds"],
+            max_messages=self.settings["max_batch_messages"],
+            max_chars=self.settings["max_batch_chars"],
+            separator=self.settings["separator"],
+        )
+
+    def _flush(self, sender: str, group: str, message: str) -> None:
+        self._submit(message, [group], sender or None)
+
+    def handle(self, key: Optional[str], payload: Dict[str, Any]) -> Tuple[int, str]:
+        """
+        处理一条 webhook 消息
+
+        Returns:
+            Tuple[int, str]: (errcode, errmsg)
+        """
+        route = self.settings.get("keys", {}).get(key or "")
+        if not route:
+            return ERR_INVALID_KEY
+        content, error = parse_webhook_message(payload)
+        if content is None:
+            return error
+        for group in route.get("groups", []):
+            self.coalescer.add(route.get("sender") or "", group, content)
+        return ERR_OK
+
+    def stop(self) -> None:
+        self.coalescer.stop()
+
+
+def make_webhook_handler(ingestor: WebhookIngestor) -> type:
+    """创建 webhook 请求处理器"""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def _reply(self, error: Tuple[int, str], status: int = 200) -> None:
+            body = json.dumps({"errcode": error[0], "errmsg": error[1]}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != WEBHOOK_PATH:
+                self._reply((404, "not found"), 404)
+                return
+            key = parse_qs(url.query).get("key", [None])[0]
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            except (ValueError, UnicodeDecodeError):
+                self._reply(ERR_INVALID_JSON, 400)
+                return
+            error = ingestor.handle(key, payload if isinstance(payload, dict) else {})
+            self._reply(error, 400 if error in BAD_REQUEST_ERRORS else 200)
+
+        def log_message(self, format, *args):
+            logger.debug("webhook: " + format, *args)
+
+    return WebhookHandler
+
+
+def start_webhook_server(ingestor: WebhookIngestor, host: str, port: int) -> ThreadingHTTPServer:
+    """在后台线程启动 webhook 监听"""
+    server = ThreadingHTTPServer((host, port), make_webhook_handler(ingestor))
+    thread = threading.Thread(target=server.serve_forever, name="wxbot-webhook-http", daemon=True)
+    thread.start()
+    logger.info(f"🪝 Webhook 入口已启动: http://{host}:{server.server_port}{WEBHOOK_PATH}?key=...")
+    return server
@@ -13,8 +13,8 @@ import pyperclip
 import logging
 from datetime import datetime
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from logging_setup import setup_logging
+
 logger = logging.getLogger(__name__)
 
 class WeChatSender:
@@ -226,6 +226,7 @@ def main():
     """主程序入口"""
     import sys
     
+    setup_logging()
     sender = WeChatSender()
     
     if len(sys.argv) > 1:
@@ -18,8 +18,8 @@ import pyperclip
 import logging
 from datetime import datetime
 
-# 配置日志
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from logging_setup import setup_logging
+
 logger = logging.getLogger(__name__)
 
 class WeChatSenderV2:
@@ -581,6 +581,7 @@ def main():
     import sys
     import json
     
+    setup_logging()
     sender = WeChatSenderV2()
     
     if len(sys.argv) > 1:
@@ -7,6 +7,7 @@
 """
 
 import os
+import threading
 import time
 import win32gui
 import win32con
@@ -20,6 +21,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 
 from message_sender_interface import MessageSenderInterface, MessageSenderFactory, SendResult
+from desktop_snapshot import get_desktop_snapshot
+from desktop_lock import holds_desktop_lock
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -39,6 +42,10 @@ class WeChatSenderV3(MessageSenderInterface):
         self.wechat_process = None
         self.wechat_pid = None
         self.main_window_hwnd = None
+        # 发送器池绑定的实例 (pid, hwnd)，绑定后不再按进程名查找
+        self._bound_instance = None
+        # 保护进程/窗口句柄：发送期间一直持有，热备线程的刷新在发送进行中直接跳过
+        self._window_lock = threading.RLock()
         
         # 默认配置
         self.process_names = ["WeChat.exe", "Weixin.exe", "wechat.exe"]
@@ -67,25 +74,30 @@ class WeChatSenderV3(MessageSenderInterface):
             logger.error(f"初始化个人微信发送器失败: {e}")
             return False
     
+    def bind_instance(self, pid: int, hwnd: int) -> bool:
+        """绑定到指定的个人微信实例（多账号时由发送器池调用）"""
+        self._bound_instance = (int(pid), int(hwnd))
+        logger.info(f"已绑定个人微信实例: PID {pid}, 句柄 {hwnd}")
+        return True
+    
     def find_target_process(self) -> bool:
         """查找个人微信进程"""
         try:
-            wechat_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                try:
-                    proc_name = proc.info['name']
-                    if any(name.lower() in proc_name.lower() for name in self.process_names):
-                        wechat_processes.append(proc)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            if self._bound_instance:
+                self.wechat_pid = self._bound_instance[0]
+                self.wechat_process = psutil.Process(self.wechat_pid)
+                return True
+            
+            # 使用共享快照，与其他发送器并行初始化时只扫描一次进程列表
+            wechat_processes = get_desktop_snapshot().find_processes(self.process_names)
             
             if not wechat_processes:
                 logger.error("未找到个人微信进程，请先启动微信")
                 return False
             
             # 选择第一个微信进程
-            self.wechat_process = wechat_processes[0]
-            self.wechat_pid = self.wechat_process.pid
+            self.wechat_pid = wechat_processes[0].pid
+            self.wechat_process = psutil.Process(self.wechat_pid)
             logger.info(f"找到个人微信进程 PID: {self.wechat_pid}")
             return True
             
@@ -100,28 +112,32 @@ class WeChatSenderV3(MessageSenderInterface):
                 logger.error("请先查找个人微信进程")
                 return False
             
-            # 枚举所有窗口
-            windows_list = []
-            win32gui.EnumWindows(self._enum_windows_callback, windows_list)
+            if self._bound_instance:
+                hwnd = self._bound_instance[1]
+                if not win32gui.IsWindow(hwnd) or win32process.GetWindowThreadProcessId(hwnd)[1] != self.wechat_pid:
+                    logger.error(f"绑定的个人微信窗口 {hwnd} 已失效，需重新发现实例")
+                    return False
+                self.main_window_hwnd = hwnd
+                return True
             
-            # 查找属于微信进程的窗口
-            wechat_windows = [w for w in windows_list if w['pid'] == self.wechat_pid]
+            # 查找属于微信进程的可见窗口（共享快照中的 EnumWindows 结果）
+            wechat_windows = get_desktop_snapshot().windows_for_pid(self.wechat_pid, visible_only=True)
             
             if not wechat_windows:
                 logger.error("未找到个人微信窗口")
                 return False
             
             # 查找主窗口（通常类名包含WeChatMainWndForPC）
-            main_windows = [w for w in wechat_windows if 'WeChatMainWndForPC' in w['class']]
+            main_windows = [w for w in wechat_windows if 'WeChatMainWndForPC' in w.class_name]
             if main_windows:
-                self.main_window_hwnd = main_windows[0]['hwnd']
-                logger.info(f"找到个人微信主窗口: {main_windows[0]['title']}")
+                self.main_window_hwnd = main_windows[0].hwnd
+                logger.info(f"找到个人微信主窗口: {main_windows[0].title}")
             else:
                 # 备选方案：选择第一个有标题的窗口
-                titled_windows = [w for w in wechat_windows if w['title'].strip()]
+                titled_windows = [w for w in wechat_windows if w.title.strip()]
                 if titled_windows:
-                    self.main_window_hwnd = titled_windows[0]['hwnd']
-                    logger.info(f"使用备选个人微信窗口: {titled_windows[0]['title']}")
+                    self.main_window_hwnd = titled_windows[0].hwnd
+                    logger.info(f"使用备选个人微信窗口: {titled_windows[0].title}")
                 else:
                     logger.error("无法确定个人微信主窗口")
                     return False
@@ -132,22 +148,6 @@ class WeChatSenderV3(MessageSenderInterface):
             logger.error(f"查找个人微信窗口失败: {e}")
             return False
     
-    def _enum_windows_callback(self, hwnd, windows_list):
-        """枚举窗口回调函数"""
-        if win32gui.IsWindowVisible(hwnd):
-            window_text = win32gui.GetWindowText(hwnd)
-            class_name = win32gui.GetClassName(hwnd)
-            
-            # 获取窗口所属进程ID
-            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-            
-            windows_list.append({
-                'hwnd': hwnd,
-                'title': window_text,
-                'class': class_name,
-                'pid': window_pid
-            })
-    
     def activate_application(self) -> bool:
         """激活个人微信窗口"""
         try:
@@ -202,7 +202,23 @@ class WeChatSenderV3(MessageSenderInterface):
             logger.error(f"搜索个人微信群聊失败: {e}")
             return False
     
+    def refresh_standby(self) -> bool:
+        """热备刷新：确认进程和主窗口仍然有效（不激活窗口），发送进行中时跳过"""
+        if not self._window_lock.acquire(blocking=False):
+            logger.debug("个人微信发送器正在发送，跳过本次热备刷新")
+            return True
+        try:
+            return self.find_target_process() and self._find_wechat_windows()
+        finally:
+            self._window_lock.release()
+    
+    @holds_desktop_lock("wechat_v3")
     def send_message(self, message: str, target_group: str = None) -> bool:
+        """发送消息到个人微信（发送期间独占进程/窗口句柄，热备线程不会中途改写）"""
+        with self._window_lock:
+            return self._send_message(message, target_group)
+    
+    def _send_message(self, message: str, target_group: str = None) -> bool:
         """发送消息到个人微信"""
         try:
             logger.info("准备发送消息到个人微信")
@@ -374,7 +390,8 @@ def main():
     import json
     
     # 配置日志
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from logging_setup import setup_logging
+    setup_logging()
     
     sender = WeChatSenderV3()
     
@@ -15,81 +15,42 @@ import io
 import json
 import logging
 import os
-import re
-import time
-from dataclasses import dataclass
+import sys
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 
 import psutil
 import pyautogui
 import pyperclip
-import requests
 import win32con
 import win32gui
 import win32process
-from PIL import ImageDraw
 
+from cli_profiler import profile_cli
+from desktop_lock import holds_desktop_lock
+from desktop_snapshot import get_desktop_snapshot
+from failure_snapshots import DEFAULT_SNAPSHOT_DIR, SnapshotRing, get_snapshot_writer
 from human_like_operations import HumanLikeOperations
+from logging_setup import setup_logging
 from message_sender_interface import MessageSenderFactory, MessageSenderInterface
+from ocr_navigator import OCRMatch, OCRNavigator, box_bounds, clamp, get_shared_recognizer, normalize_text
+from window_activation import DEFAULT_ACTIVATION_SETTINGS, activate_window
+from window_state import WindowStateTracker, get_window_event_source
+import wxbot_metrics
 
 logger = logging.getLogger(__name__)
 
-try:
-    import numpy as np
-except ImportError:  # pragma: no cover - optional dependency
-    np = None
-
-try:
-    from paddleocr import PaddleOCR
-except ImportError:  # pragma: no cover - optional dependency
-    PaddleOCR = None
-
-
-@dataclass
-class OCRMatch:
-    text: str
-    score: float
-    box: List[Tuple[float, float]]
-
-
-class PaddleOCRRecognizer:
-    """对固定区域截图执行 OCR。"""
-
-    def __init__(self, use_angle_cls: bool = False, lang: str = "ch"):
-        self.available = PaddleOCR is not None and np is not None
-        self._ocr = None
-        if self.available:
-            try:
-                self._ocr = PaddleOCR(use_angle_cls=use_angle_cls, lang=lang, show_log=False)
-            except Exception as exc:
-                logger.error("初始化 PaddleOCR 失败: %s", exc)
-                self.available = False
-
-    def recognize(self, image) -> List[OCRMatch]:
-        if not self.available or self._ocr is None:
-            raise RuntimeError("PaddleOCR 不可用，请先安装 paddleocr 和 numpy")
-
-        rgb = image.convert("RGB")
-        result = self._ocr.ocr(np.array(rgb), cls=False)
-        matches: List[OCRMatch] = []
-
-        if not result:
-            return matches
-
-        lines = result[0] if isinstance(result[0], list) else result
-        for item in lines:
-            if not item or len(item) < 2:
-                continue
-            box = item[0]
-            text, score = item[1]
-            matches.append(
-                OCRMatch(
-                    text=str(text).strip(),
-                    score=float(score),
-                    box=[(float(x), float(y)) for x, y in box],
-                )
-            )
-        return matches
+# 个人微信主窗口布局的默认相对区域和锚点，可用 calibrate 命令或 wechat_visual_tuner 重新标定
+WECHAT_DEFAULT_REGIONS = {
+    "sidebar_region": {"x": 0.0, "y": 0.0, "width": 0.36, "height": 0.30},
+    "search_results_region": {"x": 0.0, "y": 0.10, "width": 0.36, "height": 0.70},
+    "chat_title_region": {"x": 0.34, "y": 0.0, "width": 0.46, "height": 0.10},
+    "send_button_region": {"x": 0.72, "y": 0.84, "width": 0.22, "height": 0.12},
+}
+WECHAT_DEFAULT_ANCHORS = {
+    "chat_input_anchor": {"x": 0.60, "y": 0.91},
+    "send_button_anchor": {"x": 0.91, "y": 0.91},
+}
 
 
 class LocalVLMVerifier:
@@ -107,6 +68,8 @@ class LocalVLMVerifier:
             return True
 
         try:
+            import requests
+
             buffer = io.BytesIO()
             image.save(buffer, format="PNG")
             image_b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
@@ -146,9 +109,12 @@ class LocalVLMVerifier:
                 )
             answer = str(content).strip().lower()
             logger.info("VLM 复核结果: %s", answer)
-            return answer.startswith("yes") or answer.startswith("是")
+            passed = answer.startswith("yes") or answer.startswith("是")
+            wxbot_metrics.VLM_VERDICTS.inc(verdict="yes" if passed else "no")
+            return passed
         except Exception as exc:
             logger.error("VLM 复核失败: %s", exc)
+            wxbot_metrics.VLM_VERDICTS.inc(verdict="error")
             return False
 
 
@@ -171,24 +137,33 @@ class WeChatSenderV4(MessageSenderInterface):
         self.verify_foreground_before_each_step = bool(
             self.config.get("verify_foreground_before_each_step", True)
         )
+        self.activation_deadline = float(
+            self.config.get("activation_deadline", DEFAULT_ACTIVATION_SETTINGS["deadline_seconds"])
+        )
         self.ocr_threshold = float(self.config.get("ocr_threshold", 0.88))
         self.chat_title_threshold = float(self.config.get("chat_title_threshold", 0.80))
         self.result_refresh_delay = float(self.config.get("result_refresh_delay", 1.6))
         self.post_click_delay = float(self.config.get("post_click_delay", 1.5))
         self.post_send_delay = float(self.config.get("post_send_delay", 1.0))
         self.search_keyword_threshold = float(self.config.get("search_keyword_threshold", 0.70))
-        self.calibration: Dict[str, Any] = {}
 
         self.wechat_process = None
         self.wechat_pid = None
         self.main_window_hwnd = None
+        # 发送器池绑定的实例 (pid, hwnd)：绑定后不再按进程名查找，实例失效即报错
+        self._bound_instance: Optional[Tuple[int, int]] = None
+        # 保护进程/窗口句柄：发送期间一直持有，热备线程的刷新在发送进行中直接跳过
+        self._window_lock = threading.RLock()
+        self.window_state: Optional[WindowStateTracker] = None
+        self.track_window_events = bool(self.config.get("track_window_events", True))
         self._topmost_enabled = False
 
         pyautogui.FAILSAFE = True
         pyautogui.PAUSE = 0.1
 
-        self.human = HumanLikeOperations()
-        self.ocr = PaddleOCRRecognizer(
+        self.human = HumanLikeOperations(typing_settings=self.config.get("typing"))
+        # 与企业微信发送器共享同一个识别器（模型只加载一次）及其识别结果缓存
+        self.ocr = get_shared_recognizer(
             use_angle_cls=bool(self.config.get("ocr_use_angle_cls", False)),
             lang=self.config.get("ocr_lang", "ch"),
         )
@@ -202,6 +177,36 @@ class WeChatSenderV4(MessageSenderInterface):
                 },
             )
         )
+        # 失败现场：内存中保留最近 N 帧，失败时由后台线程落盘
+        self.snapshot_writer = get_snapshot_writer(
+            self.config.get("snapshot_dir", DEFAULT_SNAPSHOT_DIR),
+            max_total_mb=float(self.config.get("snapshot_max_total_mb", 200)),
+            max_age_days=float(self.config.get("snapshot_max_age_days", 7)),
+        )
+        self.snapshots = SnapshotRing(
+            capacity=int(self.config.get("snapshot_frames", 12)),
+            writer=self.snapshot_writer,
+        )
+        # 区域/锚点标定、坐标换算、搜索结果行定位和标题匹配与企业微信发送器共用同一实现；
+        # 前台检查由各步骤的 _ensure_wechat_foreground 负责（可按配置关闭）
+        self.navigator = OCRNavigator(
+            window_rect=self._get_window_rect,
+            calibration_path=self.config_path,
+            default_regions=WECHAT_DEFAULT_REGIONS,
+            default_anchors=WECHAT_DEFAULT_ANCHORS,
+            recognizer=self.ocr,
+            snapshots=self.snapshots,
+            ocr_threshold=self.ocr_threshold,
+            title_threshold=self.chat_title_threshold,
+        )
+
+    @property
+    def calibration(self) -> Dict[str, Any]:
+        return self.navigator.calibration
+
+    @calibration.setter
+    def calibration(self, value: Dict[str, Any]) -> None:
+        self.navigator.calibration = value
 
     def initialize(self) -> bool:
         try:
@@ -220,15 +225,10 @@ class WeChatSenderV4(MessageSenderInterface):
             return False
 
     def _load_calibration(self) -> None:
-        if os.path.exists(self.config_path):
-            with open(self.config_path, "r", encoding="utf-8") as file:
-                self.calibration = json.load(file)
-        else:
-            self.calibration = {}
+        self.navigator.load_calibration()
 
     def _save_calibration(self) -> None:
-        with open(self.config_path, "w", encoding="utf-8") as file:
-            json.dump(self.calibration, file, ensure_ascii=False, indent=2)
+        self.navigator.save_calibration()
 
     def _get_search_tuning(self) -> Dict[str, float]:
         tuning = self.calibration.get("search_tuning", {})
@@ -261,25 +261,7 @@ class WeChatSenderV4(MessageSenderInterface):
         return tuning
 
     def _get_result_tuning(self) -> Dict[str, float]:
-        tuning = self.calibration.get("result_tuning", {})
-        defaults = {
-            "left_expand_ratio": 1.8,
-            "left_expand_min": 90.0,
-            "top_expand_ratio": 1.1,
-            "top_expand_min": 18.0,
-            "bottom_expand_ratio": 1.1,
-            "bottom_expand_min": 18.0,
-            "click_x_ratio": 0.22,
-            "click_y_ratio": 0.5,
-        }
-        result = defaults.copy()
-        for key in defaults:
-            try:
-                if key in tuning:
-                    result[key] = float(tuning[key])
-            except (TypeError, ValueError):
-                logger.warning("result_tuning.%s 非法，回退默认值", key)
-        return result
+        return self.navigator.result_tuning()
 
     def set_result_tuning(self, **kwargs: float) -> Dict[str, float]:
         tuning = self._get_result_tuning()
@@ -292,63 +274,59 @@ class WeChatSenderV4(MessageSenderInterface):
         self._save_calibration()
         return tuning
 
+    def bind_instance(self, pid: int, hwnd: int) -> bool:
+        self._bound_instance = (int(pid), int(hwnd))
+        logger.info("已绑定微信实例: PID %s, 句柄 %s", pid, hwnd)
+        return True
+
     def find_target_process(self) -> bool:
+        if self._bound_instance is not None:
+            pid = self._bound_instance[0]
+            try:
+                self.wechat_process = psutil.Process(pid)
+                self.wechat_pid = pid
+                return True
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as exc:
+                logger.error("绑定的微信实例 (PID %s) 已不可用: %s", pid, exc)
+                return False
         try:
-            candidates = []
-            for proc in psutil.process_iter(["pid", "name", "exe"]):
-                try:
-                    proc_name = str(proc.info.get("name", ""))
-                    if any(name.lower() == proc_name.lower() for name in self.process_names):
-                        candidates.append(proc)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
+            # 共享进程/窗口索引：只为名称匹配的进程读取可执行文件路径等属性
+            candidates = get_desktop_snapshot().find_processes(self.process_names, exact=True)
             if not candidates:
                 logger.error("未找到微信进程，请先启动微信")
                 return False
 
-            self.wechat_process = candidates[0]
-            self.wechat_pid = self.wechat_process.pid
+            self.wechat_pid = candidates[0].pid
+            self.wechat_process = psutil.Process(self.wechat_pid)
             logger.info("找到微信进程 PID: %s", self.wechat_pid)
             return True
         except Exception as exc:
             logger.error("查找微信进程失败: %s", exc)
             return False
 
-    def _enum_windows_callback(self, hwnd, windows_list):
-        if not win32gui.IsWindowVisible(hwnd):
-            return
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        windows_list.append(
-            {
-                "hwnd": hwnd,
-                "title": win32gui.GetWindowText(hwnd),
-                "class": win32gui.GetClassName(hwnd),
-                "pid": pid,
-            }
-        )
-
-    def _is_wechat_process_name(self, process_name: str) -> bool:
-        return any(name.lower() == str(process_name).lower() for name in self.process_names)
-
     def _get_candidate_window_list(self) -> List[Dict[str, Any]]:
+        snapshot = get_desktop_snapshot()
         windows_list: List[Dict[str, Any]] = []
-        win32gui.EnumWindows(self._enum_windows_callback, windows_list)
-
-        candidate_pids = set()
-        for proc in psutil.process_iter(["pid", "name"]):
-            try:
-                if self._is_wechat_process_name(proc.info.get("name", "")):
-                    candidate_pids.add(proc.info["pid"])
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-        return [item for item in windows_list if item["pid"] in candidate_pids]
+        for proc in snapshot.find_processes(self.process_names, exact=True, details=False):
+            for window in snapshot.windows_for_pid(proc.pid, visible_only=True):
+                windows_list.append(
+                    {"hwnd": window.hwnd, "title": window.title, "class": window.class_name, "pid": window.pid}
+                )
+        return windows_list
 
     def _find_wechat_windows(self) -> bool:
         if not self.wechat_pid and not self.find_target_process():
             return False
 
+        if self._bound_instance is not None:
+            pid, hwnd = self._bound_instance
+            if not win32gui.IsWindow(hwnd) or win32process.GetWindowThreadProcessId(hwnd)[1] != pid:
+                logger.error("绑定的微信窗口 %s 已失效，需重新发现实例", hwnd)
+                return False
+            self.main_window_hwnd = hwnd
+            self._track_window()
+            return True
+
         candidate_windows = self._get_candidate_window_list()
         wechat_windows = [item for item in candidate_windows if item["pid"] == self.wechat_pid]
         if not wechat_windows:
@@ -371,11 +349,23 @@ class WeChatSenderV4(MessageSenderInterface):
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 self.wechat_process = None
         logger.info("使用微信窗口: %s / %s", selected["class"], selected["title"])
+        self._track_window()
         return True
 
+    def _track_window(self) -> None:
+        """为主窗口建立状态跟踪：位置、最小化和前台归属缓存在内存中，由 WinEvent 事件使其失效"""
+        if self.window_state is not None:
+            if (self.window_state.hwnd, self.window_state.pid) == (self.main_window_hwnd, self.wechat_pid):
+                return
+            self.window_state.close()
+        source = get_window_event_source() if self.track_window_events else None
+        self.window_state = WindowStateTracker(self.main_window_hwnd, self.wechat_pid, source=source)
+
     def _get_window_rect(self) -> Tuple[int, int, int, int]:
         if not self.main_window_hwnd:
             raise RuntimeError("微信主窗口未初始化")
+        if self.window_state is not None:
+            return self.window_state.rect()
         return win32gui.GetWindowRect(self.main_window_hwnd)
 
     def _window_size(self) -> Tuple[int, int]:
@@ -383,9 +373,13 @@ class WeChatSenderV4(MessageSenderInterface):
         return right - left, bottom - top
 
     def _get_foreground_hwnd(self) -> int:
+        if self.window_state is not None:
+            return self.window_state.foreground()[0]
         return win32gui.GetForegroundWindow()
 
     def _is_wechat_foreground(self) -> bool:
+        if self.window_state is not None:
+            return self.window_state.is_foreground()
         hwnd = self._get_foreground_hwnd()
         if not hwnd:
             return False
@@ -404,12 +398,17 @@ class WeChatSenderV4(MessageSenderInterface):
         try:
             if not self.main_window_hwnd:
                 return False
-            if win32gui.IsIconic(self.main_window_hwnd):
-                win32gui.ShowWindow(self.main_window_hwnd, win32con.SW_RESTORE)
-            if self.force_foreground:
-                win32gui.SetForegroundWindow(self.main_window_hwnd)
-            time.sleep(0.8)
-            return self._is_wechat_foreground() if self.verify_foreground_before_each_step else True
+            result = activate_window(
+                self.main_window_hwnd,
+                pid=self.wechat_pid,
+                deadline=self.activation_deadline,
+                force=self.force_foreground,
+                sender="wechat",
+            )
+            if self.window_state is not None:
+                self.window_state.invalidate()
+            logger.info("激活微信窗口%s", result.describe())
+            return result.success if self.verify_foreground_before_each_step else True
         except Exception as exc:
             logger.error("激活微信窗口失败: %s", exc)
             return False
@@ -423,125 +422,27 @@ class WeChatSenderV4(MessageSenderInterface):
         win32gui.SetWindowPos(self.main_window_hwnd, insert_after, 0, 0, 0, 0, flags)
         self._topmost_enabled = enabled
 
-    def _normalized_to_screen_point(self, anchor: Dict[str, float]) -> Tuple[int, int]:
-        left, top, right, bottom = self._get_window_rect()
-        width = right - left
-        height = bottom - top
-        return (
-            int(left + width * float(anchor["x"])),
-            int(top + height * float(anchor["y"])),
-        )
-
-    def _normalized_to_screen_region(self, region: Dict[str, float]) -> Tuple[int, int, int, int]:
-        left, top, right, bottom = self._get_window_rect()
-        width = right - left
-        height = bottom - top
-        x = int(left + width * float(region["x"]))
-        y = int(top + height * float(region["y"]))
-        w = max(1, int(width * float(region["width"])))
-        h = max(1, int(height * float(region["height"])))
-        return x, y, w, h
-
-    def _to_normalized_point(self, point: Tuple[int, int]) -> Dict[str, float]:
-        left, top, right, bottom = self._get_window_rect()
-        width = max(1, right - left)
-        height = max(1, bottom - top)
-        return {
-            "x": round((point[0] - left) / width, 6),
-            "y": round((point[1] - top) / height, 6),
-        }
-
-    def _to_normalized_region(self, start: Tuple[int, int], end: Tuple[int, int]) -> Dict[str, float]:
-        left, top, right, bottom = self._get_window_rect()
-        width = max(1, right - left)
-        height = max(1, bottom - top)
-        x1, x2 = sorted([start[0], end[0]])
-        y1, y2 = sorted([start[1], end[1]])
-        return {
-            "x": round((x1 - left) / width, 6),
-            "y": round((y1 - top) / height, 6),
-            "width": round((x2 - x1) / width, 6),
-            "height": round((y2 - y1) / height, 6),
-        }
-
-    def _capture_region(self, region: Dict[str, float]):
-        actual = self._normalized_to_screen_region(region)
-        return pyautogui.screenshot(region=actual), actual
-
-    def _default_region(self, name: str) -> Dict[str, float]:
-        defaults = {
-            "sidebar_region": {"x": 0.0, "y": 0.0, "width": 0.36, "height": 0.30},
-            "search_results_region": {"x": 0.0, "y": 0.10, "width": 0.36, "height": 0.70},
-            "chat_title_region": {"x": 0.34, "y": 0.0, "width": 0.46, "height": 0.10},
-            "send_button_region": {"x": 0.72, "y": 0.84, "width": 0.22, "height": 0.12},
-        }
-        if name not in defaults:
-            raise KeyError(f"未定义默认区域: {name}")
-        return defaults[name]
-
-    def _default_anchor(self, name: str) -> Dict[str, float]:
-        defaults = {
-            "chat_input_anchor": {"x": 0.60, "y": 0.91},
-            "send_button_anchor": {"x": 0.91, "y": 0.91},
-        }
-        if name not in defaults:
-            raise KeyError(f"未定义默认锚点: {name}")
-        return defaults[name]
-
-    def _is_valid_region(self, region: Dict[str, float]) -> bool:
-        try:
-            x = float(region["x"])
-            y = float(region["y"])
-            width = float(region["width"])
-            height = float(region["height"])
-        except (KeyError, TypeError, ValueError):
-            return False
-
-        return (
-            0.0 <= x < 1.0
-            and 0.0 <= y < 1.0
-            and 0.02 <= width <= 1.0
-            and 0.02 <= height <= 1.0
-            and x + width <= 1.02
-            and y + height <= 1.02
-        )
-
-    def _is_valid_anchor(self, anchor: Dict[str, float]) -> bool:
-        try:
-            x = float(anchor["x"])
-            y = float(anchor["y"])
-        except (KeyError, TypeError, ValueError):
-            return False
-        return 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0
+    def _capture_region(self, name: str):
+        return self.navigator.capture(name)
 
     def _get_region_config(self, name: str) -> Dict[str, float]:
-        region = self.calibration.get(name)
-        if region and self._is_valid_region(region):
-            return region
-        if region:
-            logger.warning("标定区域 %s 非法，回退默认区域: %s", name, region)
-        return self._default_region(name)
+        return self.navigator.region(name)
 
     def _get_anchor_config(self, name: str) -> Dict[str, float]:
-        anchor = self.calibration.get(name)
-        if anchor and self._is_valid_anchor(anchor):
-            return anchor
-        if anchor:
-            logger.warning("标定锚点 %s 非法，回退默认锚点: %s", name, anchor)
-        return self._default_anchor(name)
+        return self.navigator.anchor(name)
 
     def _prompt_point(self, label: str) -> Dict[str, float]:
         input(f"{label}：请把鼠标移动到目标位置后按回车...")
         point = pyautogui.position()
         logger.info("%s 记录位置: %s", label, point)
-        return self._to_normalized_point((point.x, point.y))
+        return self.navigator.to_normalized_point((point.x, point.y))
 
     def _prompt_region(self, label: str) -> Dict[str, float]:
         input(f"{label}：请把鼠标移动到区域左上角后按回车...")
         start = pyautogui.position()
         input(f"{label}：请把鼠标移动到区域右下角后按回车...")
         end = pyautogui.position()
-        region = self._to_normalized_region((start.x, start.y), (end.x, end.y))
+        region = self.navigator.to_normalized_region((start.x, start.y), (end.x, end.y))
         logger.info("%s 记录区域: %s", label, region)
         return region
 
@@ -591,7 +492,7 @@ class WeChatSenderV4(MessageSenderInterface):
     def _click_anchor(self, key: str) -> bool:
         if not self._ensure_wechat_foreground():
             return False
-        point = self._normalized_to_screen_point(self._get_anchor_config(key))
+        point = self.navigator.to_screen_point(self._get_anchor_config(key))
         self.human.human_click(point[0], point[1])
         return True
 
@@ -616,56 +517,42 @@ class WeChatSenderV4(MessageSenderInterface):
         self.human.human_delay(0.2, 0.05)
         return True
 
-    def _normalize_text(self, value: str) -> str:
-        return "".join(str(value).strip().lower().split())
-
-    def _normalize_chat_title_text(self, value: str) -> str:
-        normalized = self._normalize_text(value)
-        return re.sub(r"[\(\uff08]\d+[\)\uff09]$", "", normalized)
-
     def _should_use_clipboard_for_search(self, text: str) -> bool:
         # 中文、特殊字符或长文本直接走剪贴板，更稳。
         return len(text) > 8 or any(ord(char) > 127 for char in text)
 
-    def _get_box_bounds(self, box: List[Tuple[float, float]]) -> Tuple[int, int, int, int]:
-        xs = [int(point[0]) for point in box]
-        ys = [int(point[1]) for point in box]
-        return min(xs), min(ys), max(xs), max(ys)
-
-    def _clamp(self, value: int, lower: int, upper: int) -> int:
-        return max(lower, min(value, upper))
-
     def _calculate_search_box_geometry(
         self, image, actual_region: Tuple[int, int, int, int], matches: List[OCRMatch]
     ) -> Optional[Dict[str, Any]]:
         keyword_matches = []
         for item in matches:
-            normalized = self._normalize_text(item.text)
+            normalized = normalize_text(item.text)
             if "搜索" in normalized and item.score >= self.search_keyword_threshold:
                 keyword_matches.append(item)
 
         if keyword_matches:
             keyword_matches.sort(key=lambda item: (min(point[1] for point in item.box), -item.score))
             match = keyword_matches[0]
-            text_left, text_top, text_right, text_bottom = self._get_box_bounds(match.box)
+            wxbot_metrics.OCR_SCORE.observe(match.score, purpose="search_box")
+            text_left, text_top, text_right, text_bottom = box_bounds(match.box)
 
             text_width = max(1, text_right - text_left)
             text_height = max(1, text_bottom - text_top)
             tuning = self._get_search_tuning()
 
             # 由“搜索”文本反推出整块输入框矩形，而不是直接点在文字上。
-            search_box_left = self._clamp(
+            search_box_left = clamp(
                 text_left - int(text_width * tuning["left_expand_ratio"]), 8, image.width - 40
             )
-            search_box_right = self._clamp(
+            search_box_right = clamp(
                 text_right + int(text_width * tuning["right_expand_ratio"]),
                 search_box_left + 80,
                 image.width - 8,
             )
-            search_box_top = self._clamp(
+            search_box_top = clamp(
                 text_top - int(text_height * tuning["top_expand_ratio"]), 8, image.height - 24
             )
-            search_box_bottom = self._clamp(
+            search_box_bottom = clamp(
                 text_bottom + int(text_height * tuning["bottom_expand_ratio"]),
                 search_box_top + 28,
                 image.height - 8,
@@ -707,8 +594,8 @@ class WeChatSenderV4(MessageSenderInterface):
         return None
 
     def _locate_search_box(self) -> Optional[Tuple[int, int]]:
-        image, actual_region = self._capture_region(self._get_region_config("sidebar_region"))
-        matches = self.ocr.recognize(image)
+        image, actual_region = self._capture_region("sidebar_region")
+        matches = self.navigator.recognize(image, actual_region, "search_box")
         geometry = self._calculate_search_box_geometry(image, actual_region, matches)
         return geometry["point"] if geometry else None
 
@@ -720,6 +607,8 @@ class WeChatSenderV4(MessageSenderInterface):
         point: Optional[Tuple[int, int]],
         actual_region: Tuple[int, int, int, int],
     ) -> str:
+        from PIL import ImageDraw
+
         canvas = image.copy()
         draw = ImageDraw.Draw(canvas)
 
@@ -735,8 +624,7 @@ class WeChatSenderV4(MessageSenderInterface):
             draw.line((local_x, local_y - 14, local_x, local_y + 14), fill="blue", width=2)
 
         debug_path = os.path.join(os.path.dirname(__file__), "debug_search_box_overlay.png")
-        canvas.save(debug_path)
-        return debug_path
+        return self.snapshot_writer.submit_image(canvas, debug_path)
 
     def debug_search_box(self) -> Dict[str, Any]:
         if not self.initialize():
@@ -746,9 +634,9 @@ class WeChatSenderV4(MessageSenderInterface):
         self._set_temporary_topmost(True)
         try:
             region = self._get_region_config("sidebar_region")
-            image, actual_region = self._capture_region(region)
+            image, actual_region = self._capture_region("sidebar_region")
             debug_path = os.path.join(os.path.dirname(__file__), "debug_search_box.png")
-            image.save(debug_path)
+            self.snapshot_writer.submit_image(image, debug_path)
             matches = self.ocr.recognize(image)
             geometry = self._calculate_search_box_geometry(image, actual_region, matches)
             point = geometry["point"] if geometry else None
@@ -793,15 +681,15 @@ class WeChatSenderV4(MessageSenderInterface):
             self.human.human_delay(self.result_refresh_delay, 0.25)
 
             region = self._get_region_config("search_results_region")
-            image, actual_region = self._capture_region(region)
+            image, actual_region = self._capture_region("search_results_region")
             debug_path = os.path.join(os.path.dirname(__file__), "debug_search_results.png")
-            image.save(debug_path)
+            self.snapshot_writer.submit_image(image, debug_path)
 
             matches = self.ocr.recognize(image)
-            target_norm = self._normalize_text(target_name)
+            target_norm = normalize_text(target_name)
             candidate_texts = []
             for item in matches:
-                normalized = self._normalize_text(item.text)
+                normalized = normalize_text(item.text)
                 candidate_texts.append(
                     {
                         "text": item.text,
@@ -827,8 +715,8 @@ class WeChatSenderV4(MessageSenderInterface):
         if not self._ensure_wechat_foreground():
             return None
 
-        image, actual_region = self._capture_region(self._get_region_config("search_results_region"))
-        matches = self.ocr.recognize(image)
+        image, actual_region = self._capture_region("search_results_region")
+        matches = self.navigator.recognize(image, actual_region, "search_results")
         return self._calculate_result_row_geometry(image, actual_region, matches, target_name)
 
     def _calculate_result_row_geometry(
@@ -838,61 +726,10 @@ class WeChatSenderV4(MessageSenderInterface):
         matches: List[OCRMatch],
         target_name: str,
     ) -> Optional[Dict[str, Any]]:
-        target_norm = self._normalize_text(target_name)
-
-        exact_matches = [
-            item
-            for item in matches
-            if self._normalize_text(item.text) == target_norm and item.score >= self.ocr_threshold
-        ]
-        if not exact_matches:
+        geometry = self.navigator.locate_result_row(image, actual_region, matches, target_name)
+        if geometry is None:
             logger.error("OCR 未找到群名“%s”的精确匹配", target_name)
-            return None
-
-        # 搜索结果列表里，越靠上通常越接近目标。先取最靠上的高置信结果。
-        exact_matches.sort(key=lambda item: (min(point[1] for point in item.box), -item.score))
-        match = exact_matches[0]
-
-        text_left, text_top, text_right, text_bottom = self._get_box_bounds(match.box)
-        text_width = max(1, text_right - text_left)
-        text_height = max(1, text_bottom - text_top)
-        tuning = self._get_result_tuning()
-
-        # 由名字文字框反推出整行结果区域，点击整行中部偏左，而不是点字。
-        row_left = self._clamp(
-            text_left - max(int(tuning["left_expand_min"]), int(text_width * tuning["left_expand_ratio"])),
-            8,
-            image.width - 120,
-        )
-        row_right = self._clamp(image.width - 8, row_left + 120, image.width)
-        row_top = self._clamp(
-            text_top - max(int(tuning["top_expand_min"]), int(text_height * tuning["top_expand_ratio"])),
-            0,
-            image.height - 30,
-        )
-        row_bottom = self._clamp(
-            text_bottom + max(int(tuning["bottom_expand_min"]), int(text_height * tuning["bottom_expand_ratio"])),
-            row_top + 30,
-            image.height,
-        )
-
-        row_click_x = int(row_left + (row_right - row_left) * tuning["click_x_ratio"])
-        row_click_x = self._clamp(row_click_x, row_left + 36, row_right - 24)
-        row_click_y = int(row_top + (row_bottom - row_top) * tuning["click_y_ratio"])
-
-        row_image = image.crop((row_left, row_top, row_right, row_bottom))
-
-        return {
-            "match": match,
-            "screen_point": (
-                actual_region[0] + row_click_x,
-                actual_region[1] + row_click_y,
-            ),
-            "row_image": row_image,
-            "actual_region": actual_region,
-            "row_box": (row_left, row_top, row_right, row_bottom),
-            "result_tuning": tuning,
-        }
+        return geometry
 
     def _verify_candidate_with_vlm(self, target_name: str, row_image) -> bool:
         if not self.vlm.enabled:
@@ -907,15 +744,9 @@ class WeChatSenderV4(MessageSenderInterface):
         if not self._ensure_wechat_foreground():
             return False
 
-        image, _ = self._capture_region(self._get_region_config("chat_title_region"))
-        matches = self.ocr.recognize(image)
-        target_norm = self._normalize_chat_title_text(target_name)
-        title_ok = any(
-            self._normalize_chat_title_text(item.text) == target_norm
-            and item.score >= self.chat_title_threshold
-            for item in matches
-        )
-        if not title_ok:
+        image, actual_region = self._capture_region("chat_title_region")
+        matches = self.navigator.recognize(image, actual_region, "chat_title")
+        if not self.navigator.title_matched(matches, target_name):
             logger.error("聊天标题 OCR 复核失败，目标=%s，识别结果=%s", target_name, [m.text for m in matches])
             return False
 
@@ -989,37 +820,75 @@ class WeChatSenderV4(MessageSenderInterface):
         if not self._ensure_wechat_foreground():
             return False
 
-        region = self._get_region_config("send_button_region")
-        x, y, w, h = self._normalized_to_screen_region(region)
+        x, y, w, h = self.navigator.to_screen_region(self._get_region_config("send_button_region"))
         self.human.human_click(x + int(w * 0.72), y + int(h * 0.55))
         return True
 
+    def refresh_standby(self) -> bool:
+        """热备刷新：确认进程仍然有效（不激活窗口），发送进行中时跳过。"""
+        if not self._window_lock.acquire(blocking=False):
+            logger.debug("微信发送器 v4 正在发送，跳过本次热备刷新")
+            return True
+        try:
+            return self.find_target_process()
+        finally:
+            self._window_lock.release()
+
+    @holds_desktop_lock("wechat_v4")
     def send_message(self, message: str, target_group: str = None) -> bool:
+        """发送期间独占进程/窗口句柄，热备线程不会中途改写。"""
+        with self._window_lock:
+            return self._send_message(message, target_group)
+
+    def _send_message(self, message: str, target_group: str = None) -> bool:
         target_name = target_group or self.default_group
+        self.snapshots.begin(group=target_name, sender=self.sender_type)
+        stage = "search_group"
         try:
             if not self.search_group(target_name):
-                return False
+                return self._fail_send(stage)
+            stage = "verify_chat_title"
             if not self._verify_chat_title(target_name):
-                return False
+                return self._fail_send(stage)
 
             formatted_message = self.format_report_message(message)
+            stage = "paste_message"
             if not self._paste_message_humanly(formatted_message):
-                return False
+                return self._fail_send(stage)
+            stage = "click_send_button"
             if not self._click_send_button():
-                return False
+                return self._fail_send(stage)
 
             self.human.human_delay(self.post_send_delay, 0.2)
             logger.info("消息发送完成: %s", target_name)
+            self.snapshots.clear()
             return True
         except Exception as exc:
             logger.error("发送消息失败: %s", exc)
-            return False
+            return self._fail_send(f"{stage}: {exc}")
         finally:
             self._set_temporary_topmost(False)
 
+    def _fail_send(self, reason: str) -> bool:
+        """记录整窗截图后把失败现场交给后台线程落盘，返回 False 便于直接 return。"""
+        try:
+            if self.main_window_hwnd:
+                left, top, right, bottom = self._get_window_rect()
+                region = (left, top, max(1, right - left), max(1, bottom - top))
+                self.snapshots.capture("failure_window", pyautogui.screenshot(region=region), region)
+        except Exception as exc:
+            logger.debug("失败整窗截图失败: %s", exc)
+        snapshot_dir = self.snapshots.flush(reason)
+        if snapshot_dir:
+            logger.info("失败现场快照将保存到: %s", snapshot_dir)
+        return False
+
     def cleanup(self) -> bool:
         try:
             self._set_temporary_topmost(False)
+            if self.window_state is not None:
+                self.window_state.close()
+                self.window_state = None
             self.wechat_process = None
             self.wechat_pid = None
             self.main_window_hwnd = None
@@ -1060,10 +929,11 @@ MessageSenderFactory.register_sender("wechat_v4", WeChatSenderV4)
 
 
 def main():
-    import sys
+    setup_logging()
+    profile_cli(run_cli, "wechat_sender_v4")
 
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def run_cli():
     sender = WeChatSenderV4()
     if len(sys.argv) < 2:
         print("个人微信自动发送工具 v4")
@@ -1072,6 +942,7 @@ def main():
         print("  python wechat_sender_v4.py recalibrate    # 重新标定")
         print("  python wechat_sender_v4.py test           # 查看调试信息")
         print("  python wechat_sender_v4.py send <群名> <消息>")
+        print("  任意命令后追加 --profile 可输出性能剖析结果")
         return
 
     command = sys.argv[1].lower()
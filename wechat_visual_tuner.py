@@ -17,6 +17,9 @@ from typing import Any, Dict, List, Optional, Tuple
 import pyautogui
 from PIL import ImageDraw, ImageTk
 
+from cli_profiler import profile_cli
+from logging_setup import setup_logging
+from ocr_navigator import box_bounds
 from wechat_sender_v4 import OCRMatch, WeChatSenderV4
 
 logger = logging.getLogger(__name__)
@@ -297,7 +300,7 @@ class WeChatVisualTuner:
         if active_mode == "result" and result_geometry:
             if result_geometry.get("match") and self.current_result_region:
                 rx, ry, _rw, _rh = self.current_result_region
-                x1, y1, x2, y2 = self.sender._get_box_bounds(result_geometry["match"].box)
+                x1, y1, x2, y2 = box_bounds(result_geometry["match"].box)
                 draw.rectangle((rx + x1, ry + y1, rx + x2, ry + y2), outline="red", width=2)
             if result_geometry.get("row_box") and self.current_result_region:
                 rx, ry, _rw, _rh = self.current_result_region
@@ -345,8 +348,7 @@ class WeChatVisualTuner:
             use_clipboard=self.sender._should_use_clipboard_for_search(target_name),
         )
         self.sender.human.human_delay(self.sender.result_refresh_delay, 0.25)
-        region = self.sender._get_region_config("search_results_region")
-        return self.sender._capture_region(region)
+        return self.sender._capture_region("search_results_region")
 
     def _apply_result_tuning_preview(self) -> Dict[str, Any]:
         image = self.current_result_image
@@ -430,8 +432,7 @@ class WeChatVisualTuner:
                 left, top, right, bottom = self.sender._get_window_rect()
                 self.current_window_region = (left, top, right - left, bottom - top)
                 self.current_window_image = pyautogui.screenshot(region=self.current_window_region)
-                region = self.sender._get_region_config("sidebar_region")
-                image, actual_region = self.sender._capture_region(region)
+                image, actual_region = self.sender._capture_region("sidebar_region")
                 matches = self.sender.ocr.recognize(image)
                 self.current_sidebar_image = image
                 self.current_sidebar_region = actual_region
@@ -447,8 +448,7 @@ class WeChatVisualTuner:
                 image, actual_region = self._prepare_result_region(target_name)
                 matches = self.sender.ocr.recognize(image)
                 self.current_window_image = pyautogui.screenshot(region=self.current_window_region)
-                sidebar_region = self.sender._get_region_config("sidebar_region")
-                sidebar_image, sidebar_actual_region = self.sender._capture_region(sidebar_region)
+                sidebar_image, sidebar_actual_region = self.sender._capture_region("sidebar_region")
                 sidebar_matches = self.sender.ocr.recognize(sidebar_image)
                 self.current_sidebar_image = sidebar_image
                 self.current_sidebar_region = sidebar_actual_region
@@ -544,7 +544,11 @@ class WeChatVisualTuner:
 
 
 def main():
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    setup_logging()
+    profile_cli(run_tuner, "wechat_visual_tuner")
+
+
+def run_tuner():
     app = WeChatVisualTuner()
     app.run()
 
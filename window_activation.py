@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+窗口前台激活
+版本：v1.0.0
+创建日期：2026-10-19
+功能：各发送器共用的前台激活流程。恢复/显示窗口后请求前台，以指数退避的细粒度间隔轮询前台状态，
+      窗口真正到达前台（且不再最小化）立即返回；每次尝试之间按需补充置顶等手段，整体受截止时间约束，
+      返回尝试次数和耗时
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import wxbot_metrics
+from window_state import Win32WindowReader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACTIVATION_SETTINGS = {
+    "deadline_seconds": 3.0,
+    "initial_poll_seconds": 0.01,
+    "max_poll_seconds": 0.2,
+    "retry_after_seconds": 0.6,
+}
+
+
+@dataclass
+class ActivationResult:
+    success: bool
+    attempts: int
+    elapsed: float
+    reason: str = ""
+
+    def describe(self) -> str:
+        state = "成功" if self.success else f"失败（{self.reason}）"
+        return f"{state}，尝试 {self.attempts} 次，耗时 {self.elapsed * 1000:.0f}ms"
+
+
+class Win32WindowController(Win32WindowReader):
+    """在窗口属性读取之外提供激活所需的操作（测试中可替换）"""
+
+    def __init__(self):
+        super().__init__()
+        import win32api
+        import win32con
+
+        self._win32api = win32api
+        self._win32con = win32con
+
+    def restore(self, hwnd: int) -> None:
+        self._win32gui.ShowWindow(hwnd, self._win32con.SW_RESTORE)
+
+    def show(self, hwnd: int) -> None:
+        self._win32gui.ShowWindow(hwnd, self._win32con.SW_SHOW)
+
+    def set_foreground(self, hwnd: int) -> None:
+        self._win32gui.SetForegroundWindow(hwnd)
+
+    def unlock_foreground(self) -> None:
+        """按一下 Alt，使本进程获得设置前台窗口的权限（Windows 的前台锁限制）"""
+        vk_menu = self._win32con.VK_MENU
+        self._win32api.keybd_event(vk_menu, 0, 0, 0)
+        self._win32api.keybd_event(vk_menu, 0, self._win32con.KEYEVENTF_KEYUP, 0)
+
+    def bring_to_top(self, hwnd: int) -> None:
+        flags = self._win32con.SWP_NOMOVE | self._win32con.SWP_NOSIZE | self._win32con.SWP_SHOWWINDOW
+        self._win32gui.SetWindowPos(hwnd, self._win32con.HWND_TOP, 0, 0, 0, 0, flags)
+        self._win32gui.BringWindowToTop(hwnd)
+
+
+_controller: Optional[Win32WindowController] = None
+
+
+def _default_controller() -> Win32WindowController:
+    global _controller
+    if _controller is None:
+        _controller = Win32WindowController()
+    return _controller
+
+
+def _is_foreground(controller, hwnd: int, pid: Optional[int]) -> bool:
+    """前台窗口是目标窗口（给定 pid 时属于同一进程即可），且目标窗口未最小化"""
+    foreground = controller.foreground()
+    if not foreground:
+        return False
+    if foreground != hwnd and (pid is None or controller.window_pid(foreground) != pid):
+        return False
+    return not controller.is_minimized(hwnd)
+
+
+def activate_window(hwnd: int, pid: Optional[int] = None, deadline: Optional[float] = None,
+                    force: bool = True, sender: str = "", controller=None,
+                    settings: Optional[dict] = None) -> ActivationResult:
+    """
+    激活窗口并等待其真正到达前台
+
+    每次尝试请求前台后，以 initial_poll_seconds 起步、翻倍至 max_poll_seconds 的间隔轮询前台状态；
+    retry_after_seconds 内仍未到达前台则发起下一次尝试（第二次起先解除前台锁，第三次起再置顶窗口），
+    直到 deadline 秒的总时限用完
+
+    Args:
+        hwnd: 目标窗口
+        pid: 目标进程；给定时前台窗口属于该进程即视为成功（子窗口/弹窗获得焦点的情况）
+        deadline: 总时限（秒），默认取 settings 中的 deadline_seconds
+        force: 是否主动请求前台；False 时只恢复最小化的窗口并等待
+        sender: 发送器名称（指标标签）
+        controller: 窗口操作实现，默认 Win32WindowController
+        settings: 覆盖 DEFAULT_ACTIVATION_SETTINGS 中的轮询参数
+
+    Returns:
+        ActivationResult: 是否成功、尝试次数和耗时
+    """
+    options = dict(DEFAULT_ACTIVATION_SETTINGS)
+    options.update(settings or {})
+    if deadline is None:
+        deadline = float(options["deadline_seconds"])
+    controller = controller or _default_controller()
+    started = time.monotonic()
+    end = started + max(0.0, deadline)
+    attempts = 0
+
+    def result(success: bool, reason: str = "") -> ActivationResult:
+        return ActivationResult(success, attempts, time.monotonic() - started, reason)
+
+    try:
+        if not controller.is_window(hwnd):
+            return result(False, "窗口句柄无效")
+        if _is_foreground(controller, hwnd, pid):
+            return result(True)
+
+        if controller.is_minimized(hwnd):
+            controller.restore(hwnd)
+        else:
+            controller.show(hwnd)
+
+        while True:
+            if force:
+                attempts += 1
+                if attempts > 1:
+                    wxbot_metrics.ACTIVATION_RETRIES.inc(sender=sender or "unknown")
+                try:
+                    if attempts >= 2:
+                        controller.unlock_foreground()
+                    if attempts >= 3:
+                        controller.bring_to_top(hwnd)
+                    controller.set_foreground(hwnd)
+                except Exception as e:
+                    logger.debug(f"第 {attempts} 次请求前台失败: {e}")
+
+            retry_at = min(end, time.monotonic() + float(options["retry_after_seconds"]))
+            delay = float(options["initial_poll_seconds"])
+            while True:
+                if _is_foreground(controller, hwnd, pid):
+                    return result(True)
+                now = time.monotonic()
+                if now >= retry_at:
+                    break
+                time.sleep(min(delay, retry_at - now))
+                delay = min(delay * 2, float(options["max_poll_seconds"]))
+
+            if time.monotonic() >= end:
+                if not controller.is_window(hwnd):
+                    return result(False, "窗口已关闭")
+                return result(False, f"{deadline:g}s 内未到达前台")
+    except Exception as e:
+        return result(False, str(e))
@@ -15,6 +15,8 @@ import time
 import threading
 from datetime import datetime
 
+from desktop_snapshot import get_desktop_snapshot
+
 class WindowInspector:
     def __init__(self):
         self.is_listening = False
@@ -172,11 +174,11 @@ class WindowInspector:
             
             wechat_processes = []
             
-            # 查找所有可能的微信进程
-            for proc in psutil.process_iter(['pid', 'name', 'exe', 'memory_info']):
+            # 查找所有可能的微信进程（共享索引，只为名称匹配的进程读取路径和内存）
+            for proc in get_desktop_snapshot().find_processes(['wechat', 'weixin']):
                 try:
-                    name = proc.info['name'].lower()
-                    exe = str(proc.info.get('exe', '')).lower()
+                    name = proc.name.lower()
+                    exe = proc.exe.lower()
                     
                     # 识别主微信进程的特征
                     is_main_wechat = False
@@ -200,15 +202,15 @@ class WindowInspector:
                         continue
                     
                     wechat_processes.append({
-                        'pid': proc.info['pid'],
-                        'name': proc.info['name'],
-                        'exe': proc.info.get('exe', '无法获取'),
-                        'memory_mb': round(proc.info['memory_info'].rss / 1024 / 1024, 1),
+                        'pid': proc.pid,
+                        'name': proc.name,
+                        'exe': proc.exe or '无法获取',
+                        'memory_mb': round(proc.memory_mb, 1),
                         'type': process_type,
                         'is_main': is_main_wechat
                     })
                     
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                except Exception:
                     continue
             
             if not wechat_processes:
@@ -250,21 +252,10 @@ class WindowInspector:
         try:
             print(f"\n🪟 查找PID {pid} 的所有窗口...")
             
-            windows = []
-            def enum_windows_callback(hwnd, param):
-                if win32gui.IsWindowVisible(hwnd):
-                    try:
-                        _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                        if window_pid == pid:
-                            windows.append({
-                                'hwnd': hwnd,
-                                'title': win32gui.GetWindowText(hwnd),
-                                'class': win32gui.GetClassName(hwnd)
-                            })
-                    except:
-                        pass
-            
-            win32gui.EnumWindows(enum_windows_callback, None)
+            windows = [
+                {'hwnd': w.hwnd, 'title': w.title, 'class': w.class_name}
+                for w in get_desktop_snapshot().windows_for_pid(pid, visible_only=True)
+            ]
             
             if not windows:
                 print("❌ 该进程没有可见窗口")
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+窗口状态跟踪
+版本：v1.0.0
+创建日期：2026-10-19
+功能：缓存目标窗口的位置、最小化状态和当前前台窗口，每一步操作前的检查变为内存读取。
+      Windows 上通过 WinEvent 钩子（前台切换、最小化/还原、位置/尺寸变化、窗口销毁）使缓存失效，
+      测试中可用 FakeWindowEventSource 手动发送事件；没有事件源时每次读取都直接查询系统
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+OBJID_WINDOW = 0
+
+# 回调签名：callback(event, hwnd)
+EventCallback = Callable[[int, int], None]
+
+
+class FakeWindowEventSource:
+    """测试用事件源：调用 emit() 模拟 WinEvent"""
+
+    def __init__(self):
+        self._callbacks: List[EventCallback] = []
+        self.watched_pids: List[int] = []
+
+    def subscribe(self, callback: EventCallback) -> None:
+        self._callbacks.append(callback)
+
+    def unsubscribe(self, callback: EventCallback) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def watch_process(self, pid: int) -> None:
+        self.watched_pids.append(pid)
+
+    def emit(self, event: int, hwnd: int) -> None:
+        for callback in list(self._callbacks):
+            callback(event, hwnd)
+
+
+class WinEventHookSource:
+    """
+    WinEvent 钩子事件源（WINEVENT_OUTOFCONTEXT，在专用线程上运行消息循环）
+
+    前台切换和最小化/还原为全局钩子（事件很少）；位置变化和窗口销毁事件量大，只按进程安装
+    """
+
+    WM_QUIT = 0x0012
+    WM_APP = 0x8000
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._user32.SetWinEventHook.restype = wintypes.HANDLE
+        self._proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                             wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        self._proc = self._proc_type(self._on_event)
+        self._callbacks: List[EventCallback] = []
+        self._callbacks_lock = threading.Lock()
+        self._pending: "queue.Queue[int]" = queue.Queue()
+        self._watched: Dict[int, List[int]] = {}
+        self._hooks: List[int] = []
+        self._thread_id: Optional[int] = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wxbot-winevent", daemon=True)
+        self._thread.start()
+        if not self._started.wait(5):
+            raise RuntimeError("WinEvent 钩子线程启动超时")
+
+    def subscribe(self, callback: EventCallback) -> None:
+        with self._callbacks_lock:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback: EventCallback) -> None:
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def watch_process(self, pid: int) -> None:
+        """为进程安装位置变化/销毁钩子（在钩子线程中完成）"""
+        self._pending.put(pid)
+        self._user32.PostThreadMessageW(self._thread_id, self.WM_APP, 0, 0)
+
+    def stop(self) -> None:
+        if self._thread_id is not None:
+            self._user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+        self._thread.join(5)
+
+    def _hook(self, event_min: int, event_max: int, pid: int = 0) -> Optional[int]:
+        handle = self._user32.SetWinEventHook(event_min, event_max, 0, self._proc, pid, 0, 0)
+        if handle:
+            self._hooks.append(handle)
+        return handle
+
+    def _install_pending(self) -> None:
+        while True:
+            try:
+                pid = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            if pid in self._watched:
+                continue
+            self._watched[pid] = [h for h in (
+                self._hook(EVENT_OBJECT_DESTROY, EVENT_OBJECT_DESTROY, pid),
+                self._hook(EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_LOCATIONCHANGE, pid),
+            ) if h]
+
+    def _run(self) -> None:
+        self._thread_id = self._kernel32.GetCurrentThreadId()
+        self._hook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND)
+        self._hook(EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND)
+        self._started.set()
+
+        msg = self._wintypes.MSG()
+        while self._user32.GetMessageW(self._ctypes.byref(msg), 0, 0, 0) > 0:
+            if msg.message == self.WM_APP:
+                self._install_pending()
+                continue
+            self._user32.TranslateMessage(self._ctypes.byref(msg))
+            self._user32.DispatchMessageW(self._ctypes.byref(msg))
+
+        for handle in self._hooks:
+            self._user32.UnhookWinEvent(handle)
+        self._hooks.clear()
+        self._watched.clear()
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread_id, event_time):
+        if id_object != OBJID_WINDOW or id_child != 0:
+            return
+        with self._callbacks_lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(event, hwnd or 0)
+            except Exception as e:
+                logger.debug(f"窗口事件回调出错: {e}")
+
+
+class Win32WindowReader:
+    """直接查询系统的窗口属性读取器（测试中可替换）"""
+
+    def __init__(self):
+        import win32gui
+        import win32process
+
+        self._win32gui = win32gui
+        self._win32process = win32process
+
+    def rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        return self._win32gui.GetWindowRect(hwnd)
+
+    def is_minimized(self, hwnd: int) -> bool:
+        return bool(self._win32gui.IsIconic(hwnd))
+
+    def is_window(self, hwnd: int) -> bool:
+        return bool(self._win32gui.IsWindow(hwnd))
+
+    def foreground(self) -> int:
+        return self._win32gui.GetForegroundWindow()
+
+    def window_pid(self, hwnd: int) -> int:
+        return self._win32process.GetWindowThreadProcessId(hwnd)[1]
+
+
+class WindowStateTracker:
+    """
+    单个窗口的状态缓存
+
+    有事件源时缓存一直有效，直到收到相关事件（另有 safety_max_age 兜底）；
+    没有事件源时缓存立即过期，行为与直接查询相同
+    """
+
+    _UNSET = object()
+
+    def __init__(self, hwnd: int, pid: int, source=None, reader=None, safety_max_age: float = 5.0):
+        """
+        Args:
+            hwnd: 跟踪的窗口
+            pid: 窗口所属进程（前台判断以进程为准）
+            source: 事件源（WinEventHookSource / FakeWindowEventSource），None 表示不缓存
+            reader: 窗口属性读取器，默认 Win32WindowReader
+            safety_max_age: 有事件源时缓存的最长有效期（秒），防止漏掉事件
+        """
+        self.hwnd = hwnd
+        self.pid = pid
+        self.source = source
+        self.reader = reader or Win32WindowReader()
+        self.max_age = float(safety_max_age) if source is not None else 0.0
+        self._lock = threading.Lock()
+        self._rect = self._UNSET
+        self._minimized = self._UNSET
+        self._foreground = self._UNSET
+        self._read_at: Dict[str, float] = {}
+        self._generation = 0  # 每次失效 +1，读取期间发生失效时不写回旧值
+        self.destroyed = False
+        self.reads = 0
+        if source is not None:
+            source.subscribe(self._on_event)
+            source.watch_process(pid)
+
+    def close(self) -> None:
+        if self.source is not None:
+            self.source.unsubscribe(self._on_event)
+            self.source = None
+
+    def invalidate(self) -> None:
+        """丢弃全部缓存（自身刚移动/激活/还原窗口后调用，不必等待异步事件）"""
+        with self._lock:
+            self._generation += 1
+            self._rect = self._minimized = self._foreground = self._UNSET
+
+    def _on_event(self, event: int, hwnd: int) -> None:
+        with self._lock:
+            if event != EVENT_SYSTEM_FOREGROUND and hwnd != self.hwnd:
+                return
+            self._generation += 1
+            if event == EVENT_SYSTEM_FOREGROUND:
+                self._foreground = self._UNSET
+            elif event == EVENT_OBJECT_LOCATIONCHANGE:
+                self._rect = self._UNSET
+            elif event in (EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND):
+                self._rect = self._minimized = self._UNSET
+            elif event == EVENT_OBJECT_DESTROY:
+                self.destroyed = True
+                self._rect = self._minimized = self._foreground = self._UNSET
+
+    def _cached(self, name: str, load: Callable[[], object]):
+        with self._lock:
+            value = getattr(self, name)
+            if value is not self._UNSET and time.monotonic() - self._read_at.get(name, 0.0) <= self.max_age:
+                return value
+            generation = self._generation
+        value = load()
+        with self._lock:
+            self.reads += 1
+            if generation == self._generation:
+                setattr(self, name, value)
+                self._read_at[name] = time.monotonic()
+        return value
+
+    def rect(self) -> Tuple[int, int, int, int]:
+        """窗口矩形 (left, top, right, bottom)"""
+        return self._cached("_rect", lambda: tuple(self.reader.rect(self.hwnd)))
+
+    def size(self) -> Tuple[int, int]:
+        left, top, right, bottom = self.rect()
+        return right - left, bottom - top
+
+    def is_minimized(self) -> bool:
+        return self._cached("_minimized", lambda: self.reader.is_minimized(self.hwnd))
+
+    def foreground(self) -> Tuple[int, int]:
+        """当前前台窗口 (hwnd, pid)，没有前台窗口时为 (0, 0)"""
+        def load():
+            hwnd = self.reader.foreground()
+            return (hwnd, self.reader.window_pid(hwnd)) if hwnd else (0, 0)
+        return self._cached("_foreground", load)
+
+    def is_foreground(self) -> bool:
+        """前台窗口是否属于被跟踪窗口的进程"""
+        return self.foreground()[1] == self.pid
+
+    def is_alive(self) -> bool:
+        return not self.destroyed and self.reader.is_window(self.hwnd)
+
+
+_event_source = None
+_event_source_lock = threading.Lock()
+
+
+def get_window_event_source():
+    """共享的 WinEvent 钩子事件源；非 Windows 或安装失败时返回 None（跟踪器退化为直接查询）"""
+    global _event_source
+    with _event_source_lock:
+        if _event_source is None:
+            try:
+                _event_source = WinEventHookSource()
+            except Exception as e:
+                logger.debug(f"WinEvent 钩子不可用，窗口状态不缓存: {e}")
+                _event_source = False
+        return _event_source or None
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+发送指标采集与导出
+版本：v1.0.0
+创建日期：2026-10-19
+功能：记录发送次数、各阶段耗时、OCR 置信度、VLM 复核结果、激活重试和回退事件，
+      以 Prometheus 文本格式原子写入文件，或通过可选的本地 HTTP 端点暴露
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+SCORE_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 1.0)
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """可任意设置的数值"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def get(self, **labels) -> Optional[float]:
+        return self._values.get(_label_key(labels))
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelKey, Dict[str, object]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """统计代码块耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get_count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return int(series["count"]) if series else 0
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, dict(value, counts=list(value["counts"])))
+                           for key, value in self._series.items())
+        for key, series in items:
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str,
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> bool:
+        """
+        原子写入 Prometheus 文本文件（先写临时文件再 os.replace），
+        适用于 node_exporter 的 textfile collector
+
+        Args:
+            path: 输出文件路径
+
+        Returns:
+            bool: 是否写入成功
+        """
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(self.render())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+            logger.info(f"📈 指标已写入: {path}")
+            return True
+        except Exception as e:
+            logger.error(f"写入指标文件失败: {e}")
+            return False
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> bool:
+        """
+        在后台线程启动 /metrics 端点（仅监听本机）
+
+        Args:
+            port: 端口
+            host: 监听地址
+
+        Returns:
+            bool: 是否启动成功
+        """
+        if self._server is not None:
+            return True
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("metrics endpoint: " + format, *args)
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+            thread = threading.Thread(target=self._server.serve_forever,
+                                      name="wxbot-metrics-http", daemon=True)
+            thread.start()
+            logger.info(f"📈 指标端点已启动: http://{host}:{self._server.server_port}/metrics")
+            return True
+        except Exception as e:
+            logger.error(f"启动指标端点失败: {e}")
+            self._server = None
+            return False
+
+    def stop_http_server(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# 全局注册表与 wxbot 预定义指标
+REGISTRY = MetricsRegistry()
+
+SENDS_ATTEMPTED = REGISTRY.counter(
+    "wxbot_sends_attempted_total", "Send attempts per sender and group")
+SENDS_SUCCEEDED = REGISTRY.counter(
+    "wxbot_sends_succeeded_total", "Successful sends per sender and group")
+SENDS_FAILED = REGISTRY.counter(
+    "wxbot_sends_failed_total", "Failed sends per sender and group")
+SEND_DURATION = REGISTRY.histogram(
+    "wxbot_send_duration_seconds", "Wall-clock duration of a single send per sender")
+STAGE_DURATION = REGISTRY.histogram(
+    "wxbot_stage_duration_seconds", "Duration of automation stages")
+OCR_SCORE = REGISTRY.histogram(
+    "wxbot_ocr_match_score", "Confidence of the OCR match used for a decision", SCORE_BUCKETS)
+VLM_VERDICTS = REGISTRY.counter(
+    "wxbot_vlm_verdicts_total", "VLM verification verdicts (yes/no/error)")
+ACTIVATION_RETRIES = REGISTRY.counter(
+    "wxbot_activation_retries_total", "Extra foreground activation attempts per sender")
+FALLBACK_EVENTS = REGISTRY.counter(
+    "wxbot_fallback_events_total", "Fallbacks from one sender to another")
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "wxbot_rate_limit_wait_seconds", "Time a send waited on a rate limit, per limiting bucket level")
+SENDER_HEALTH_SCORE = REGISTRY.gauge(
+    "wxbot_sender_health_score", "Rolling health score used to order senders")
+STANDBY_READY = REGISTRY.gauge(
+    "wxbot_standby_ready", "1 if the standby sender was validated by the last background refresh")
+COORDINATOR_WORKERS = REGISTRY.gauge(
+    "wxbot_coordinator_workers", "Send workers currently registered with the coordinator")
+WORK_STEALS = REGISTRY.counter(
+    "wxbot_work_steals_total", "Queued items moved from a busy worker to an idle one")
+WORKER_EXPIRED = REGISTRY.counter(
+    "wxbot_worker_expired_total", "Workers dropped after missing heartbeats (their items were requeued)")
+LAST_RUN_TIMESTAMP = REGISTRY.gauge(
+    "wxbot_last_run_timestamp_seconds", "Unix time when the last automation run finished")
+LAST_RUN_SUCCESS = REGISTRY.gauge(
+    "wxbot_last_run_success", "1 if the last automation run succeeded, else 0")
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+wxbot 常驻服务
+版本：v1.0.0
+创建日期：2026-10-19
+功能：常驻进程保持发送器预热（进程/窗口发现、校准、OCR 模型只加载一次），
+      通过仅监听本机的 HTTP API 接收消息：POST /enqueue、GET /status、GET /health。
+      消息写入持久化队列后由后台工作线程按限流和桌面锁逐条发送；附带命令行客户端。
+      使用 --backend fake 时所有消息交给模拟发送器，可在 Linux 上测试
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, quote, urlparse
+
+from auto_daily_report_v2 import AutoReportSystemV2
+from delivery_queue import DeliveryQueue, DeliveryState, default_owner
+from logging_setup import load_logging_settings, setup_logging
+from message_sender_interface import MessageSenderFactory, MessageSenderInterface
+from rate_limiter import RateLimiter
+import wxbot_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "db_path": "service_queue.db",
+    "warm_senders": None,
+    "poll_interval": 1.0,
+    "token": None,
+}
+
+TERMINAL_STATES = (DeliveryState.SENT, DeliveryState.DEAD, DeliveryState.SUPERSEDED)
+
+
+class WxbotService:
+    """常驻发送服务：预热的发送器 + 持久化队列 + 后台工作线程"""
+
+    def __init__(self, config: Dict[str, Any], backend: Optional[str] = None):
+        """
+        Args:
+            config: 完整的 auto_report_config 配置
+            backend: 强制所有消息使用的发送器类型（如 "fake"），None 表示按请求/配置选择
+        """
+        self.config = config
+        self.settings = dict(DEFAULT_SERVICE_SETTINGS)
+        self.settings.update(config.get("service", {}))
+        self.backend = backend
+        queue_config = dict(config.get("delivery_queue", {}), db_path=self.settings["db_path"])
+        self.queue = DeliveryQueue.from_config(queue_config)
+        self.rate_limiter = RateLimiter(config.get("rate_limits"))
+        self.owner = default_owner()
+        self.senders: Dict[str, MessageSenderInterface] = {}
+        self.sender_errors: Dict[str, str] = {}
+        self.started_at = time.time()
+        self.warmed_up = False
+        self.last_error: Optional[str] = None
+        self._senders_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    # ---------------------------------------------------------------- 发送器
+
+    def _sender_config(self, sender_type: str) -> Dict[str, Any]:
+        return self.config.get("senders", {}).get(sender_type, {})
+
+    def resolve_sender_type(self, requested: Optional[str] = None) -> str:
+        """确定消息使用的发送器类型"""
+        return self.backend or requested or self.config.get("default_sender", "wechat")
+
+    def get_sender(self, sender_type: str) -> Optional[MessageSenderInterface]:
+        """获取已预热的发送器，首次使用时创建并初始化"""
+        with self._senders_lock:
+            sender = self.senders.get(sender_type)
+            if sender is not None and sender.is_initialized:
+                return sender
+            sender = MessageSenderFactory.create_sender(sender_type, self._sender_config(sender_type))
+            if sender is None:
+                self.sender_errors[sender_type] = "unknown sender type"
+                return None
+            started = time.perf_counter()
+            if not sender.initialize():
+                self.sender_errors[sender_type] = "initialize failed"
+                logger.error(f"❌ 发送器 {sender_type} 初始化失败")
+                return None
+            self.senders[sender_type] = sender
+            self.sender_errors.pop(sender_type, None)
+            logger.info(f"🔥 发送器 {sender_type} 已预热 ({time.perf_counter() - started:.2f}s)")
+            return sender
+
+    def warm_up(self) -> None:
+        """启动时预热配置的发送器"""
+        warm = self.settings.get("warm_senders") or [self.resolve_sender_type()]
+        for sender_type in dict.fromkeys(self.resolve_sender_type(s) for s in warm):
+            self.get_sender(sender_type)
+        self.warmed_up = True
+
+    # ---------------------------------------------------------------- 队列
+
+    def enqueue(self, message: str, groups: List[str], sender: Optional[str] = None,
+                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        加入待发送消息
+
+        Args:
+            message: 消息内容
+            groups: 目标群聊列表
+            sender: 发送器类型（可选）
+            idempotency_key: 幂等键，相同键重复提交不会重复发送
+
+        Returns:
+            Dict: {"batch_id", "items": [{"id", "sender", "group"}]}
+        """
+        sender_type = self.resolve_sender_type(sender)
+        batch_id = f"api:{idempotency_key}" if idempotency_key else f"api:{uuid.uuid4().hex}"
+        items = []
+        for group in dict.fromkeys(groups):
+            item_id = self.queue.enqueue(batch_id, sender_type, group, message)
+            items.append({"id": item_id, "sender": sender_type, "group": group})
+        self._wake.set()
+        logger.info(f"📥 已入队 {len(items)} 条消息 (batch {batch_id})")
+        return {"batch_id": batch_id, "items": items}
+
+    def status(self, batch_id: Optional[str] = None) -> Dict[str, Any]:
+        """服务与队列状态"""
+        result: Dict[str, Any] = {
+            "uptime": round(time.time() - self.started_at, 1),
+            "warmed_up": self.warmed_up,
+            "queue": self.queue.counts(),
+            "senders": {name: sender.is_initialized for name, sender in self.senders.items()},
+            "sender_errors": dict(self.sender_errors),
+            "last_error": self.last_error,
+        }
+        if batch_id:
+            batch_items = self.queue.get_items(batch_id=batch_id)
+            result["batch"] = [
+                {"id": item.id, "sender": item.sender, "group": item.group_name, "state": item.state,
+                 "attempts": item.attempts, "last_error": item.last_error}
+                for item in batch_items
+            ]
+            result["batch_done"] = bool(batch_items) and all(item.state in TERMINAL_STATES
+                                                              for item in batch_items)
+        return result
+
+    def health(self) -> Dict[str, Any]:
+        """健康检查：工作线程存活且至少一个发送器可用"""
+        worker_alive = self._worker is not None and self._worker.is_alive()
+        ready = [name for name, sender in self.senders.items() if sender.is_initialized]
+        if not worker_alive:
+            state = "down"
+        elif not self.warmed_up:
+            state = "warming"
+        elif not ready:
+            state = "degraded"
+        else:
+            state = "ok"
+        return {"status": state, "worker_alive": worker_alive, "ready_senders": ready}
+
+    # ---------------------------------------------------------------- 工作线程
+
+    def start(self) -> None:
+        """恢复中断的条目并启动后台工作线程"""
+        self.queue.recover()
+        self._worker = threading.Thread(target=self._run, name="wxbot-service-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """停止工作线程并清理发送器"""
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        for sender_type, sender in list(self.senders.items()):
+            try:
+                sender.cleanup()
+            except Exception as e:
+                logger.error(f"清理 {sender_type} 失败: {e}")
+        self.senders.clear()
+        self.queue.close()
+
+    def _run(self) -> None:
+        try:
+            self.warm_up()
+        except Exception as e:
+            self.last_error = f"warm up: {e}"
+            logger.error(f"预热发送器失败: {e}")
+            self.warmed_up = True
+        while not self._stop.is_set():
+            try:
+                if not self.process_one():
+                    self._wake.wait(float(self.settings.get("poll_interval", 1.0)))
+                    self._wake.clear()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"处理队列失败: {e}")
+                time.sleep(1)
+
+    def process_one(self) -> bool:
+        """
+        领取并发送一条消息
+
+        Returns:
+            bool: 是否处理了条目（队列为空时返回 False）
+        """
+        leased = self.queue.lease(self.owner, limit=1)
+        if not leased:
+            return False
+        item = leased[0]
+        sender = self.get_sender(item.sender)
+        if sender is None:
+            self.queue.mark_failed(item.id, f"sender {item.sender} unavailable")
+            return True
+
+        account = self._sender_config(item.sender).get("account", item.sender)
+        decision = self.rate_limiter.acquire(account, item.group_name)
+        if decision.limit:
+            wxbot_metrics.RATE_LIMIT_WAIT.observe(decision.waited, limit=decision.limit.split(":", 1)[0])
+
+        log_fields = {"send_id": f"{item.id}", "sender": item.sender, "group": item.group_name,
+                      "stage": "service_send", "attempt": item.attempts,
+                      "rate_wait": decision.waited, "rate_limit": decision.limit}
+        wxbot_metrics.SENDS_ATTEMPTED.inc(sender=item.sender, group=item.group_name)
+        started = time.perf_counter()
+        error = "send_message returned False"
+        try:
+            sent = sender.send_message(item.content, item.group_name)
+        except Exception as e:
+            sent = False
+            error = self.last_error = str(e)
+            logger.error(f"发送到 {item.sender}:{item.group_name} 时出错: {e}")
+        duration = time.perf_counter() - started
+        wxbot_metrics.SEND_DURATION.observe(duration, sender=item.sender)
+        log_fields["duration"] = round(duration, 3)
+
+        if sent:
+            self.queue.mark_sent(item.id)
+            wxbot_metrics.SENDS_SUCCEEDED.inc(sender=item.sender, group=item.group_name)
+            logger.info(f"✅ 成功发送到 {item.sender}:{item.group_name}",
+                        extra=dict(log_fields, result="success"))
+        else:
+            state = self.queue.mark_failed(item.id, error)
+            wxbot_metrics.SENDS_FAILED.inc(sender=item.sender, group=item.group_name)
+            logger.error(f"❌ 发送到 {item.sender}:{item.group_name} 失败 ({state})",
+                         extra=dict(log_fields, result="failed"))
+        return True
+
+
+def make_handler(service: WxbotService) -> type:
+    """创建绑定到服务实例的请求处理器"""
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            token = service.settings.get("token")
+            if token and self.headers.get("X-Wxbot-Token") != token:
+                self._send_json(401, {"error": "unauthorized"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            url = urlparse(self.path)
+            if url.path == "/health":
+                health = service.health()
+                self._send_json(200 if health["status"] in ("ok", "warming") else 503, health)
+            elif url.path == "/status":
+                batch_id = parse_qs(url.query).get("batch_id", [None])[0]
+                self._send_json(200, service.status(batch_id))
+            elif url.path == "/metrics":
+                body = wxbot_metrics.REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if urlparse(self.path).path != "/enqueue":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+            except (ValueError, UnicodeDecodeError) as e:
+                self._send_json(400, {"error": f"invalid json: {e}"})
+                return
+            message = payload.get("message")
+            groups = payload.get("groups") or ([payload["group"]] if payload.get("group") else [])
+            if not message or not groups:
+                self._send_json(400, {"error": "message and group(s) are required"})
+                return
+            result = service.enqueue(message, groups, payload.get("sender"), payload.get("idempotency_key"))
+            self._send_json(202, result)
+
+        def log_message(self, format, *args):
+            logger.debug("service api: " + format, *args)
+
+    return ServiceHandler
+
+
+def serve(service: WxbotService, host: str, port: int, webhook: bool = False) -> None:
+    """启动 HTTP API（以及可选的 webhook 入口）并阻塞运行，Ctrl+C 退出"""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    service.start()
+    logger.info(f"🚀 wxbot 服务已启动: http://{host}:{server.server_port}")
+
+    ingestor = webhook_server = None
+    webhook_settings = service.config.get("webhook", {})
+    if webhook or webhook_settings.get("enabled"):
+        from webhook_ingest import WebhookIngestor, start_webhook_server
+
+        ingestor = WebhookIngestor(webhook_settings, service.enqueue)
+        webhook_server = start_webhook_server(ingestor, ingestor.settings["host"], int(ingestor.settings["port"]))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("收到中断，正在停止服务...")
+    finally:
+        if webhook_server is not None:
+            webhook_server.shutdown()
+            webhook_server.server_close()
+            # 未到合并窗口的消息写入持久化队列，下次启动时继续发送
+            ingestor.stop()
+        server.server_close()
+        service.stop()
+
+
+class ServiceClient:
+    """命令行 / 脚本使用的轻量客户端"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, token: Optional[str] = None,
+                 timeout: float = 10.0):
+        self.base_url = f"http://{host}:{port}"
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json; charset=utf-8")
+        if self.token:
+            request.add_header("X-Wxbot-Token", self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read().decode("utf-8") or "{}")
+
+    def enqueue(self, message: str, groups: List[str], sender: Optional[str] = None,
+                idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        return self._request("POST", "/enqueue", {"message": message, "groups": groups, "sender": sender,
+                                                  "idempotency_key": idempotency_key})
+
+    def status(self, batch_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._request("GET", f"/status?batch_id={quote(batch_id)}" if batch_id else "/status")
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def wait_for_batch(self, batch_id: str, timeout: float = 300.0, interval: float = 0.2) -> Dict[str, Any]:
+        """轮询直到批次内所有条目都进入终态（sent / dead）或超时"""
+        deadline = time.monotonic() + timeout
+        status = self.status(batch_id)
+        while not status.get("batch_done") and time.monotonic() < deadline:
+            time.sleep(interval)
+            status = self.status(batch_id)
+        return status
+
+
+def load_service_config() -> Dict[str, Any]:
+    """读取 auto_report_config.json（复用 v2 的默认值合并逻辑）"""
+    return AutoReportSystemV2().config
+
+
+def main():
+    """主程序入口"""
+    parser = argparse.ArgumentParser(description="wxbot 常驻服务与客户端")
+    parser.add_argument('--host', type=str, default=None, help='服务地址（默认 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=None, help='服务端口（默认 8765）')
+    parser.add_argument('--token', type=str, default=None, help='API 令牌（与配置 service.token 一致）')
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help='启动常驻服务')
+    serve_parser.add_argument('--backend', type=str, default=None,
+                              help='强制使用的发送器类型，例如 fake（Linux 测试）')
+    serve_parser.add_argument('--webhook', action='store_true',
+                              help='同时启动企业微信群机器人兼容的 webhook 入口（也可在配置 webhook.enabled 中开启）')
+
+    send_parser = subparsers.add_parser('send', help='提交消息')
+    send_parser.add_argument('message', type=str, help='消息内容')
+    send_parser.add_argument('-g', '--group', action='append', required=True, help='目标群聊（可重复）')
+    send_parser.add_argument('--sender', type=str, default=None, help='发送器类型')
+    send_parser.add_argument('--key', type=str, default=None, help='幂等键')
+    send_parser.add_argument('--wait', action='store_true', help='等待发送完成')
+
+    status_parser = subparsers.add_parser('status', help='查看服务状态')
+    status_parser.add_argument('--batch-id', type=str, default=None, help='查看指定批次')
+    subparsers.add_parser('health', help='健康检查')
+
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return
+
+    config = load_service_config()
+    settings = dict(DEFAULT_SERVICE_SETTINGS)
+    settings.update(config.get("service", {}))
+    host = args.host or settings["host"]
+    port = args.port or int(settings["port"])
+    token = args.token or settings.get("token")
+
+    if args.command == 'serve':
+        setup_logging('wxbot_service.log', load_logging_settings())
+        serve(WxbotService(config, backend=args.backend), host, port, webhook=args.webhook)
+        return
+
+    client = ServiceClient(host, port, token)
+    try:
+        if args.command == 'send':
+            result = client.enqueue(args.message, args.group, args.sender, args.key)
+            if args.wait and result.get("batch_id"):
+                result = client.wait_for_batch(result["batch_id"])
+        elif args.command == 'status':
+            result = client.status(args.batch_id)
+        else:
+            result = client.health()
+    except urllib.error.URLError as e:
+        print(f"❌ 无法连接 wxbot 服务 {host}:{port}: {e.reason}")
+        sys.exit(2)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.command == 'health' and result.get("status") not in ("ok", "warming"):
+        sys.exit(1)
+    if args.command == 'send' and args.wait and not all(
+            item.get("state") == DeliveryState.SENT for item in result.get("batch", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,9 +27,9 @@ class WXWorkSenderAdapter(MessageSenderInterface):
         self.default_group = config.get('default_group', '蓝光统计') if config else '蓝光统计'
 
     def initialize(self) -> bool:
-        """初始化发送器"""
+        """初始化发送器（只做进程/窗口发现，不抢占前台；激活在发送时进行）"""
         try:
-            success = self.sender.test_connection()
+            success = self.sender.find_wxwork_window() is not None
             self.is_initialized = success
             return success
         except Exception as e:
@@ -45,12 +45,26 @@ class WXWorkSenderAdapter(MessageSenderInterface):
             logger.error(f"查找企业微信进程失败: {e}")
             return False
 
+    def refresh_standby(self) -> bool:
+        """热备刷新：验证并缓存企业微信主窗口，回退时直接使用"""
+        try:
+            return self.sender.prepare_standby()
+        except Exception as e:
+            logger.warning(f"企业微信热备刷新失败: {e}")
+            return False
+
+    def bind_instance(self, pid: int, hwnd: int) -> bool:
+        """绑定到指定的企业微信实例"""
+        return self.sender.bind_instance(pid, hwnd)
+
     def activate_application(self) -> bool:
         """激活应用程序"""
         try:
             hwnd = self.sender.find_wxwork_window()
+            if hwnd and self.sender.activate_window(hwnd):
+                return True
             if hwnd:
-                return self.sender.activate_window(hwnd)
+                self.sender.invalidate_window()
             return False
         except Exception as e:
             logger.error(f"激活企业微信失败: {e}")
@@ -64,6 +78,8 @@ class WXWorkSenderAdapter(MessageSenderInterface):
                 # 这里可以实现搜索群聊的逻辑，但由于send_message已经包含了搜索
                 # 我们直接返回True
                 return True
+            if hwnd:
+                self.sender.invalidate_window()
             return False
         except Exception as e:
             logger.error(f"搜索群聊失败: {e}")
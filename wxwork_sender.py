@@ -1,25 +1,40 @@
 # -*- coding: utf-8 -*-
 """
 企业微信发送器 - 彻底解决重启问题版本
-基于完全重新检测的机制，不依赖任何缓存的窗口句柄
+窗口句柄只在每次使用前验证通过时复用（句柄存在、PID 一致、类名为 WeWorkWindow、进程创建时间一致），
+验证失败才完全重新检测，企业微信重启后不会使用失效的句柄
 """
 
 import os
-import time
+import sys
+import threading
 import win32gui
-import win32con
-import win32api
 import win32process
 import psutil
 import pyautogui
-import pyperclip
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 from human_like_operations import HumanLikeOperations
+from desktop_snapshot import DEFAULT_MAX_AGE, invalidate_desktop_snapshot
+from window_activation import DEFAULT_ACTIVATION_SETTINGS, activate_window
+from cli_profiler import profile_cli
+from desktop_lock import holds_desktop_lock
+from logging_setup import setup_logging
+from ocr_navigator import OCRNavigator, get_shared_recognizer
+from wxwork_window_finder import WXWORK_MAIN_CLASS, find_wxwork_main_window
 
 logger = logging.getLogger(__name__)
 
+# 企业微信主窗口布局的默认相对区域（左侧导航栏 + 会话列表 + 聊天区），可用 calibrate 命令重新标定
+WXWORK_DEFAULT_REGIONS = {
+    "search_results_region": {"x": 0.05, "y": 0.06, "width": 0.30, "height": 0.70},
+    "chat_title_region": {"x": 0.30, "y": 0.0, "width": 0.50, "height": 0.08},
+}
+WXWORK_DEFAULT_ANCHORS = {
+    "chat_input_anchor": {"x": 0.62, "y": 0.88},
+}
+
 class WXWorkSenderRobust:
     """企业微信发送器 - 抗重启版本"""
 
@@ -28,172 +43,228 @@ class WXWorkSenderRobust:
         self.config = config or {}
 
         # 初始化人性化操作模块
-        self.human_ops = HumanLikeOperations()
+        self.human_ops = HumanLikeOperations(typing_settings=self.config.get("typing"))
 
         # 企业微信配置
         self.process_names = ["WXWork.exe", "wxwork.exe"]
         self.default_group = self.config.get('default_group', '蓝光统计')
 
-        # 不缓存任何窗口信息，每次都重新检测
+        # 缓存的主窗口 {hwnd, pid, create_time}，每次使用前重新验证，失效即重新检测
         self.initialized = False
+        self._window: Optional[Dict[str, Any]] = None
+        # 保护 _window / _bound：热备线程（prepare_standby）与发送线程会同时验证和重写缓存，
+        # 发送期间一直持有，热备刷新在发送进行中直接跳过
+        self._window_lock = threading.RLock()
+        # 发送器池绑定的实例 {hwnd, pid, create_time}，绑定后只使用该实例，失效时不再查找其他实例
+        self._bound: Optional[Dict[str, Any]] = None
+        self.activation_deadline = float(self.config.get(
+            'activation_deadline', DEFAULT_ACTIVATION_SETTINGS['deadline_seconds']))
+
+        # OCR 导航：搜索结果行和聊天标题经 OCR 确认后才继续，PaddleOCR 不可用时退回原来的盲操作流程。
+        # 未配置 ocr_navigation 时只在已标定（存在 wxwork_ocr_config.json）时启用，默认区域只是估计值
+        ocr_config_path = self.config.get(
+            'ocr_config_path', os.path.join(os.path.dirname(__file__), 'wxwork_ocr_config.json'))
+        self.ocr_navigation = bool(self.config.get('ocr_navigation', os.path.exists(ocr_config_path)))
+        self.search_timeout = float(self.config.get('search_timeout', 5.0))
+        self.title_timeout = float(self.config.get('title_timeout', 5.0))
+        self.navigator = OCRNavigator(
+            window_rect=self._window_rect,
+            calibration_path=ocr_config_path,
+            default_regions=WXWORK_DEFAULT_REGIONS,
+            default_anchors=WXWORK_DEFAULT_ANCHORS,
+            recognizer=get_shared_recognizer(lang=self.config.get('ocr_lang', 'ch')),
+            is_foreground=self._is_foreground,
+            ocr_threshold=float(self.config.get('ocr_threshold', 0.88)),
+            title_threshold=float(self.config.get('chat_title_threshold', 0.80)),
+        )
+
+    def _validated_window(self) -> Optional[int]:
+        """缓存的句柄仍然有效时返回句柄：窗口存在、属于同一 PID、类名为 WeWorkWindow、进程创建时间未变"""
+        with self._window_lock:
+            cached = self._window
+            if not cached:
+                return None
+            hwnd = cached['hwnd']
+            try:
+                if (win32gui.IsWindow(hwnd)
+                        and win32process.GetWindowThreadProcessId(hwnd)[1] == cached['pid']
+                        and win32gui.GetClassName(hwnd) == WXWORK_MAIN_CLASS
+                        and psutil.Process(cached['pid']).create_time() == cached['create_time']):
+                    return hwnd
+            except Exception:
+                pass
+            logger.info(f"♻️ 缓存的企业微信窗口句柄已失效: {hwnd}，重新检测")
+            self._window = None
+            return None
+
+    def invalidate_window(self) -> None:
+        """丢弃缓存的窗口句柄（激活失败等情况下调用），下次使用时重新检测"""
+        with self._window_lock:
+            self._window = None
+        invalidate_desktop_snapshot()
 
-    def find_wxwork_window(self) -> Optional[int]:
-        """实时查找企业微信窗口 - 每次都重新检测"""
+    def bind_instance(self, pid: int, hwnd: int) -> bool:
+        """绑定到指定的企业微信实例（多账号时由发送器池调用）"""
         try:
-            logger.info("🔍 实时查找企业微信窗口...")
-
-            # 1. 查找企业微信进程
-            wxwork_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-                try:
-                    proc_name = proc.info['name']
-                    if any(name.lower() in proc_name.lower() for name in self.process_names):
-                        memory_mb = proc.info['memory_info'].rss / 1024 / 1024
-                        wxwork_processes.append({
-                            'pid': proc.pid,
-                            'name': proc_name,
-                            'memory_mb': memory_mb
-                        })
-                        logger.debug(f"  进程: {proc_name} (PID: {proc.pid}, 内存: {memory_mb:.1f}MB)")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            if not wxwork_processes:
-                logger.error("❌ 未找到企业微信进程")
-                return None
+            create_time = psutil.Process(pid).create_time()
+        except Exception as e:
+            logger.error(f"❌ 绑定企业微信实例失败 (PID {pid}): {e}")
+            return False
+        with self._window_lock:
+            self._bound = {'hwnd': hwnd, 'pid': pid, 'create_time': create_time}
+            self._window = dict(self._bound)
+        logger.info(f"📌 已绑定企业微信实例: PID {pid}, 句柄 {hwnd}")
+        return True
+
+    def find_wxwork_window(self, max_snapshot_age: float = DEFAULT_MAX_AGE) -> Optional[int]:
+        """
+        获取企业微信主窗口：缓存的句柄验证通过时直接返回，否则用 wxwork_window_finder 实时查找（基于共享的
+        进程/窗口索引，索引超过 max_snapshot_age 秒即增量刷新）并缓存结果；绑定了实例时只使用绑定的实例
+
+        Args:
+            max_snapshot_age: 允许复用的索引最大年龄（秒），0 表示强制刷新
+        """
+        with self._window_lock:
+            hwnd = self._validated_window()
+            if hwnd:
+                logger.debug(f"使用已验证的企业微信窗口句柄: {hwnd}")
+                return hwnd
+
+            if self._bound:
+                # 已绑定实例：只重新验证绑定的句柄，不能退回到其他账号的实例
+                self._window = dict(self._bound)
+                hwnd = self._validated_window()
+                if not hwnd:
+                    logger.error(f"❌ 绑定的企业微信实例 (PID {self._bound['pid']}) 已失效，需重新发现实例")
+                return hwnd
 
-            # 2. 选择主进程（内存最大的）
-            main_process = max(wxwork_processes, key=lambda p: p['memory_mb'])
-            logger.info(f"✅ 主进程: PID {main_process['pid']} ({main_process['memory_mb']:.1f}MB)")
-
-            # 3. 枚举该进程的所有窗口
-            def enum_windows_callback(hwnd, windows_list):
-                try:
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == main_process['pid']:
-                        class_name = win32gui.GetClassName(hwnd)
-                        window_title = win32gui.GetWindowText(hwnd)
-                        is_visible = win32gui.IsWindowVisible(hwnd)
-
-                        windows_list.append({
-                            'hwnd': hwnd,
-                            'class': class_name,
-                            'title': window_title,
-                            'visible': is_visible
-                        })
-                except Exception:
-                    pass
-
-            windows_list = []
-            win32gui.EnumWindows(enum_windows_callback, windows_list)
-
-            logger.debug(f"  找到 {len(windows_list)} 个窗口")
-
-            # 4. 查找主窗口 - 多重策略
-            candidates = []
-
-            # 策略1: 标准企业微信主窗口
-            for w in windows_list:
-                if (w['class'].lower() == 'weworkwindow' and
-                    w['title'] == '企业微信' and
-                    w['visible']):
-                    candidates.append((w, 100))  # 最高优先级
-
-            # 策略2: WeWorkWindow类但标题可能不同
-            if not candidates:
-                for w in windows_list:
-                    if w['class'].lower() == 'weworkwindow' and w['visible']:
-                        candidates.append((w, 80))
-
-            # 策略3: WeWorkWindow类不管是否可见
-            if not candidates:
-                for w in windows_list:
-                    if w['class'].lower() == 'weworkwindow':
-                        candidates.append((w, 60))
-
-            if not candidates:
-                logger.error("❌ 未找到 WeWorkWindow 窗口")
+            try:
+                logger.info("🔍 实时查找企业微信窗口...")
+                found = find_wxwork_main_window(self.process_names, max_age=max_snapshot_age)
+                if not found:
+                    logger.error("❌ 未找到企业微信进程或 WeWorkWindow 窗口")
+                    return None
+
+                process, window = found
+                logger.info(f"✅ 找到企业微信窗口: '{window.title}' (句柄: {window.hwnd}, "
+                            f"PID: {process.pid}, 内存: {process.memory_mb:.1f}MB)")
+                self._window = {'hwnd': window.hwnd, 'pid': process.pid, 'create_time': process.create_time}
+                return window.hwnd
+
+            except Exception as e:
+                logger.error(f"❌ 查找企业微信窗口失败: {e}")
                 return None
 
-            # 选择优先级最高的窗口
-            best_window, priority = max(candidates, key=lambda x: x[1])
-            hwnd = best_window['hwnd']
+    def _window_rect(self):
+        window = self._window
+        if window is None:
+            raise RuntimeError("企业微信主窗口未初始化或句柄已失效")
+        return win32gui.GetWindowRect(window['hwnd'])
+
+    def _is_foreground(self) -> bool:
+        """前台窗口属于企业微信主进程（搜索弹出层等子窗口获得焦点也算）"""
+        window = self._window
+        foreground = win32gui.GetForegroundWindow()
+        if not foreground or window is None:
+            return False
+        return win32process.GetWindowThreadProcessId(foreground)[1] == window['pid']
 
-            # 5. 验证窗口有效性
-            if not win32gui.IsWindow(hwnd):
-                logger.error("❌ 窗口句柄无效")
-                return None
+    def _use_ocr(self) -> bool:
+        if not self.ocr_navigation:
+            return False
+        if self.navigator.available:
+            return True
+        logger.warning("⚠️ PaddleOCR 不可用，使用盲操作流程（不验证搜索结果和聊天标题）")
+        self.ocr_navigation = False
+        return False
 
-            logger.info(f"✅ 找到企业微信窗口: '{best_window['title']}' (句柄: {hwnd})")
-            return hwnd
+    def _open_chat_verified(self, target_group: str) -> bool:
+        """
+        搜索并进入群聊，每一步以界面状态确认：当前已是目标群聊则跳过搜索；
+        否则等待搜索结果中出现与群名完全一致的行再点击，最后等待聊天标题切换为目标群名
+        """
+        if self.navigator.title_matches(target_group):
+            logger.info(f"✅ 当前已在群聊: {target_group}")
+            return True
 
-        except Exception as e:
-            logger.error(f"❌ 查找企业微信窗口失败: {e}")
-            return None
+        self.human_ops.human_hotkey('ctrl', 'f')
+        self.human_ops.human_hotkey('ctrl', 'a')
+        self.human_ops.human_type_text(target_group, use_clipboard=True)
 
-    def activate_window(self, hwnd: int) -> bool:
-        """激活企业微信窗口 - 强力版本"""
-        try:
-            logger.info(f"🎯 激活企业微信窗口: {hwnd}")
+        row = self.navigator.wait_for_result_row(target_group, self.search_timeout)
+        if not row:
+            pyautogui.press('esc')
+            return False
 
-            # 1. 检查窗口是否有效
-            if not win32gui.IsWindow(hwnd):
-                logger.error("❌ 窗口句柄无效")
-                return False
+        x, y = row['screen_point']
+        logger.info(f"🎯 OCR 匹配搜索结果: '{row['match'].text}' ({row['match'].score:.2f})")
+        self.human_ops.human_click(x, y)
+        return self.navigator.wait_for_chat_title(target_group, self.title_timeout)
 
-            # 2. 强制显示窗口
-            win32gui.ShowWindow(hwnd, win32con.SW_SHOW)
-            time.sleep(0.3)
-
-            # 3. 恢复窗口（如果被最小化）
-            if win32gui.IsIconic(hwnd):
-                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                time.sleep(0.3)
-
-            # 4. 多次尝试激活窗口
-            for attempt in range(3):
-                try:
-                    win32gui.SetForegroundWindow(hwnd)
-                    time.sleep(0.5)
-
-                    # 验证是否成功
-                    foreground_hwnd = win32gui.GetForegroundWindow()
-                    if foreground_hwnd == hwnd:
-                        logger.info("✅ 窗口激活成功")
-                        return True
-                    else:
-                        logger.warning(f"⚠️ 第 {attempt + 1} 次激活尝试失败")
-                        if attempt < 2:
-                            time.sleep(1)
-
-                except Exception as e:
-                    logger.warning(f"⚠️ 激活尝试 {attempt + 1} 失败: {e}")
-                    if attempt < 2:
-                        time.sleep(1)
-
-            # 5. 最后的尝试 - 使用置顶
-            try:
-                win32gui.SetWindowPos(hwnd, win32con.HWND_TOP,
-                                     0, 0, 0, 0,
-                                     win32con.SWP_NOMOVE | win32con.SWP_NOSIZE | win32con.SWP_SHOWWINDOW)
-                time.sleep(0.5)
-                logger.info("🔧 使用置顶方式激活窗口")
+    def calibrate(self) -> bool:
+        """交互式标定搜索结果区域、聊天标题区域和输入框位置"""
+        hwnd = self.find_wxwork_window()
+        if not hwnd or not self.activate_window(hwnd):
+            return False
+        print("\n=== 企业微信发送器标定模式 ===")
+        print("请保持企业微信窗口可见，后续窗口大小可以变化，但布局应保持一致。")
+        return self.navigator.calibrate(
+            regions={
+                "search_results_region": "搜索结果区域（先在企业微信中搜索任意群名）",
+                "chat_title_region": "聊天标题区域",
+            },
+            anchors={"chat_input_anchor": "输入框中心点"},
+        )
+
+    @staticmethod
+    def _is_logged_in(hwnd: int) -> bool:
+        """主窗口是否已登录：登录/扫码窗口尺寸较小，已登录的主窗口明显更大（按还原尺寸判断，最小化也适用）"""
+        left, top, right, bottom = win32gui.GetWindowPlacement(hwnd)[4]
+        return right - left >= 600 and bottom - top >= 400
+
+    def prepare_standby(self) -> bool:
+        """
+        热备刷新：验证（必要时重新查找）主窗口并确认已登录，句柄缓存供 send_message 直接使用（不激活窗口）
+
+        Returns:
+            bool: 是否处于可立即发送的状态
+        """
+        if not self._window_lock.acquire(blocking=False):
+            # 发送线程正在使用本发送器，窗口刚刚验证过，不与之争抢缓存
+            logger.debug("企业微信发送器正在发送，跳过本次热备刷新")
+            return True
+        try:
+            hwnd = self.find_wxwork_window()
+            if hwnd and self._is_logged_in(hwnd):
                 return True
-            except Exception as e:
-                logger.error(f"❌ 最终激活失败: {e}")
-                return False
-
-        except Exception as e:
-            logger.error(f"❌ 激活窗口失败: {e}")
+            if hwnd:
+                logger.warning("⚠️ 企业微信主窗口尺寸异常，可能未登录")
             return False
+        finally:
+            self._window_lock.release()
 
+    def activate_window(self, hwnd: int) -> bool:
+        """激活企业微信窗口：轮询到真正处于前台即返回，超过 activation_deadline 秒判定失败"""
+        logger.info(f"🎯 激活企业微信窗口: {hwnd}")
+        result = activate_window(hwnd, deadline=self.activation_deadline, sender="wxwork")
+        if result.success:
+            logger.info(f"✅ 窗口激活{result.describe()}")
+        else:
+            logger.error(f"❌ 窗口激活{result.describe()}")
+        return result.success
+
+    @holds_desktop_lock("wxwork")
     def send_message(self, message: str, target_group: str = None) -> bool:
-        """发送消息 - 完全重新检测版本"""
+        """发送消息 - 完全重新检测版本（发送期间独占窗口缓存，热备线程不会中途改写）"""
+        with self._window_lock:
+            return self._send_message(message, target_group)
+
+    def _send_message(self, message: str, target_group: str = None) -> bool:
         try:
             target_group = target_group or self.default_group
             logger.info(f"📤 开始发送消息到: {target_group}")
 
-            # 1. 实时查找企业微信窗口（不使用缓存）
+            # 1. 获取窗口（缓存句柄验证通过时直接使用，否则实时查找）
             hwnd = self.find_wxwork_window()
             if not hwnd:
                 logger.error("❌ 找不到企业微信窗口")
@@ -201,17 +272,30 @@ class WXWorkSenderRobust:
 
             # 2. 激活窗口
             if not self.activate_window(hwnd):
+                self.invalidate_window()
                 logger.error("❌ 激活企业微信窗口失败")
                 return False
 
             # 3. 搜索群聊
             logger.info(f"🔍 搜索群聊: {target_group}")
-
-            # 模拟思考停顿
-            self.human_ops.simulate_reading_pause()
-
-            # 使用人性化搜索
-            self.human_ops.human_search_and_enter(target_group)
+            use_ocr = self._use_ocr()
+
+            if use_ocr and not self._open_chat_verified(target_group):
+                if self.navigator.calibration:
+                    # 已标定时以 OCR 结果为准，宁可失败也不盲发
+                    logger.error(f"❌ 未能确认进入群聊: {target_group}")
+                    return False
+                # 未标定时默认区域可能不准，退回盲操作流程
+                logger.warning(f"⚠️ 未标定的 OCR 区域未能确认群聊 {target_group}，退回盲操作流程"
+                               f"（python wxwork_sender.py calibrate 可标定）")
+                use_ocr = False
+                self.human_ops.human_search_and_enter(target_group)
+            elif not use_ocr:
+                # 模拟思考停顿
+                self.human_ops.simulate_reading_pause()
+
+                # 使用人性化搜索
+                self.human_ops.human_search_and_enter(target_group)
 
             logger.info(f"✅ 已进入群聊: {target_group}")
 
@@ -225,10 +309,13 @@ class WXWorkSenderRobust:
             # 随机小幅移动，模拟查看内容
             self.human_ops.random_small_move()
 
-            # 获取窗口位置，计算输入框位置
-            rect = win32gui.GetWindowRect(hwnd)
-            input_x = rect[0] + (rect[2] - rect[0]) // 2
-            input_y = rect[3] - 50  # 输入框通常在底部
+            # 获取输入框位置：OCR 模式下使用标定的相对锚点，否则按窗口底部估算
+            if use_ocr:
+                input_x, input_y = self.navigator.to_screen_point(self.navigator.anchor("chat_input_anchor"))
+            else:
+                rect = win32gui.GetWindowRect(hwnd)
+                input_x = rect[0] + (rect[2] - rect[0]) // 2
+                input_y = rect[3] - 50  # 输入框通常在底部
 
             # 人性化点击输入框
             self.human_ops.human_click(input_x, input_y)
@@ -257,8 +344,10 @@ class WXWorkSenderRobust:
     def test_connection(self) -> bool:
         """测试连接"""
         hwnd = self.find_wxwork_window()
+        if hwnd and self.activate_window(hwnd):
+            return True
         if hwnd:
-            return self.activate_window(hwnd)
+            self.invalidate_window()
         return False
 
 # 兼容性接口
@@ -277,10 +366,16 @@ class WXWorkSender(WXWorkSenderRobust):
         """兼容原接口"""
         return self.send_message(message, target_group)
 
-if __name__ == "__main__":
-    # 测试代码
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+def main():
+    """命令行测试入口（python wxwork_sender.py calibrate 进入标定模式）"""
+    setup_logging()
+    if len(sys.argv) > 1 and sys.argv[1].lower() == "calibrate":
+        print("标定结果:", "成功" if WXWorkSenderRobust().calibrate() else "失败")
+        return
+    profile_cli(run_connection_test, "wxwork_sender")
 
+def run_connection_test():
+    """测试连接并发送一条测试消息"""
     sender = WXWorkSenderRobust()
 
     print("🧪 测试企业微信连接...")
@@ -294,4 +389,7 @@ if __name__ == "__main__":
         else:
             print("❌ 消息发送失败！")
     else:
-        print("❌ 连接失败！")
\ No newline at end of file
+        print("❌ 连接失败！")
+
+if __name__ == "__main__":
+    main()
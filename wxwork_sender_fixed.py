@@ -18,6 +18,8 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from wxwork_window_finder import find_wxwork_main_window
+
 # from message_sender_interface import MessageSenderInterface, MessageSenderFactory, SendResult
 
 # 临时基类，避免导入错误
@@ -135,92 +137,37 @@ class WXWorkSenderFixed(MessageSenderInterface):
             return False
 
     def _find_wxwork_windows_enhanced(self) -> bool:
-        """查找企业微信窗口 - 增强版"""
+        """查找企业微信主窗口（与各发送器共用 wxwork_window_finder，保证恢复流程和发送流程选中同一个窗口）"""
         try:
             if not self.wxwork_pid:
                 logger.error("请先查找企业微信进程")
                 return False
 
-            # 枚举所有窗口
-            windows_list = []
-            win32gui.EnumWindows(self._enum_windows_callback, windows_list)
-
-            # 查找属于企业微信进程的窗口
-            wxwork_windows = [w for w in windows_list if w['pid'] == self.wxwork_pid]
-
-            if not wxwork_windows:
-                logger.error("未找到企业微信窗口")
-                return False
-
-            logger.info(f"找到 {len(wxwork_windows)} 个企业微信窗口")
-
-            # 多重策略查找主窗口
-            main_window = self._find_main_window_multi_strategy(wxwork_windows)
-
-            if main_window:
-                self.main_window_hwnd = main_window['hwnd']
-                logger.info(f"找到企业微信主窗口: '{main_window['title']}' (类名: {main_window['class']})")
-
-                # 验证窗口是否有效
-                if self._validate_window(self.main_window_hwnd):
-                    return True
-                else:
-                    logger.warning("主窗口验证失败，重新查找")
-                    return False
-            else:
+            # 初始化带重试，每次都读取最新的进程/窗口索引
+            found = find_wxwork_main_window(self.process_names, max_age=0)
+            if not found:
                 logger.error("无法确定企业微信主窗口")
                 return False
 
+            process, window = found
+            if process.pid != self.wxwork_pid:
+                # 主窗口所属进程才是真正的主进程
+                logger.info(f"主窗口属于进程 PID {process.pid}，改用该进程")
+                self.wxwork_pid = process.pid
+                self.wxwork_process = psutil.Process(process.pid)
+            self.main_window_hwnd = window.hwnd
+            logger.info(f"找到企业微信主窗口: '{window.title}' (类名: {window.class_name})")
+
+            # 验证窗口是否有效
+            if self._validate_window(self.main_window_hwnd):
+                return True
+            logger.warning("主窗口验证失败，重新查找")
+            return False
+
         except Exception as e:
             logger.error(f"查找企业微信窗口失败: {e}")
             return False
 
-    def _find_main_window_multi_strategy(self, windows) -> Optional[Dict]:
-        """多策略查找主窗口"""
-
-        # 策略1: 标准企业微信窗口特征
-        for w in windows:
-            if (w['class'].lower() == 'weworkwindow' and
-                w['title'] == '企业微信' and
-                w.get('visible', False)):
-                logger.info("策略1命中: 标准企业微信主窗口")
-                return w
-
-        # 策略2: WeWorkWindow类但可能标题不同
-        wework_windows = [w for w in windows if w['class'].lower() == 'weworkwindow']
-        if wework_windows:
-            # 优先选择有标题且可见的
-            visible_titled = [w for w in wework_windows if w['title'].strip() and w.get('visible', False)]
-            if visible_titled:
-                logger.info(f"策略2命中: WeWorkWindow类窗口 '{visible_titled[0]['title']}'")
-                return visible_titled[0]
-
-            # 备选: 任何WeWorkWindow
-            logger.info(f"策略2备选: 使用第一个WeWorkWindow")
-            return wework_windows[0]
-
-        # 策略3: 最大的可见窗口
-        visible_windows = [w for w in windows if w.get('visible', False) and w['title'].strip()]
-        if visible_windows:
-            # 按窗口大小排序（需要计算窗口面积）
-            for w in visible_windows:
-                try:
-                    rect = win32gui.GetWindowRect(w['hwnd'])
-                    w['area'] = (rect[2] - rect[0]) * (rect[3] - rect[1])
-                except:
-                    w['area'] = 0
-
-            visible_windows.sort(key=lambda x: x['area'], reverse=True)
-            logger.info(f"策略3命中: 最大可见窗口 '{visible_windows[0]['title']}'")
-            return visible_windows[0]
-
-        # 策略4: 最后的备选方案
-        if windows:
-            logger.info("策略4: 使用第一个找到的窗口")
-            return windows[0]
-
-        return None
-
     def _validate_window(self, hwnd) -> bool:
         """验证窗口是否有效且可用"""
         try:
@@ -243,30 +190,6 @@ class WXWorkSenderFixed(MessageSenderInterface):
             logger.warning(f"窗口验证失败: {e}")
             return False
 
-    def _enum_windows_callback(self, hwnd, windows_list):
-        """枚举窗口回调函数"""
-        try:
-            # 获取窗口所属进程ID
-            _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-
-            # 获取窗口信息
-            class_name = win32gui.GetClassName(hwnd)
-            window_title = win32gui.GetWindowText(hwnd)
-
-            # 检查窗口是否可见
-            is_visible = win32gui.IsWindowVisible(hwnd)
-
-            windows_list.append({
-                'hwnd': hwnd,
-                'pid': window_pid,
-                'class': class_name,
-                'title': window_title,
-                'visible': is_visible
-            })
-
-        except Exception:
-            pass  # 忽略无法访问的窗口
-
     def send_message(self, message: str, target_group: str = None) -> SendResult:
         """发送消息 - 带重连机制"""
 
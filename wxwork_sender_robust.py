@@ -9,14 +9,14 @@ import time
 import win32gui
 import win32con
 import win32api
-import win32process
-import psutil
 import pyautogui
 import pyperclip
 import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from human_like_operations import HumanLikeOperations
+from desktop_lock import holds_desktop_lock
+from wxwork_window_finder import find_wxwork_main_window
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ class WXWorkSenderRobust:
         self.config = config or {}
 
         # 初始化人性化操作模块
-        self.human_ops = HumanLikeOperations()
+        self.human_ops = HumanLikeOperations(typing_settings=self.config.get("typing"))
 
         # 企业微信配置
         self.process_names = ["WXWork.exe", "wxwork.exe"]
@@ -38,94 +38,18 @@ class WXWorkSenderRobust:
         self.initialized = False
 
     def find_wxwork_window(self) -> Optional[int]:
-        """实时查找企业微信窗口 - 每次都重新检测"""
+        """实时查找企业微信窗口（wxwork_window_finder 在共享进程/窗口索引上按自适应顺序运行各选择策略）"""
         try:
             logger.info("🔍 实时查找企业微信窗口...")
-
-            # 1. 查找企业微信进程
-            wxwork_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-                try:
-                    proc_name = proc.info['name']
-                    if any(name.lower() in proc_name.lower() for name in self.process_names):
-                        memory_mb = proc.info['memory_info'].rss / 1024 / 1024
-                        wxwork_processes.append({
-                            'pid': proc.pid,
-                            'name': proc_name,
-                            'memory_mb': memory_mb
-                        })
-                        logger.debug(f"  进程: {proc_name} (PID: {proc.pid}, 内存: {memory_mb:.1f}MB)")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            if not wxwork_processes:
-                logger.error("❌ 未找到企业微信进程")
-                return None
-
-            # 2. 选择主进程（内存最大的）
-            main_process = max(wxwork_processes, key=lambda p: p['memory_mb'])
-            logger.info(f"✅ 主进程: PID {main_process['pid']} ({main_process['memory_mb']:.1f}MB)")
-
-            # 3. 枚举该进程的所有窗口
-            def enum_windows_callback(hwnd, windows_list):
-                try:
-                    _, window_pid = win32process.GetWindowThreadProcessId(hwnd)
-                    if window_pid == main_process['pid']:
-                        class_name = win32gui.GetClassName(hwnd)
-                        window_title = win32gui.GetWindowText(hwnd)
-                        is_visible = win32gui.IsWindowVisible(hwnd)
-
-                        windows_list.append({
-                            'hwnd': hwnd,
-                            'class': class_name,
-                            'title': window_title,
-                            'visible': is_visible
-                        })
-                except Exception:
-                    pass
-
-            windows_list = []
-            win32gui.EnumWindows(enum_windows_callback, windows_list)
-
-            logger.debug(f"  找到 {len(windows_list)} 个窗口")
-
-            # 4. 查找主窗口 - 多重策略
-            candidates = []
-
-            # 策略1: 标准企业微信主窗口
-            for w in windows_list:
-                if (w['class'].lower() == 'weworkwindow' and
-                    w['title'] == '企业微信' and
-                    w['visible']):
-                    candidates.append((w, 100))  # 最高优先级
-
-            # 策略2: WeWorkWindow类但标题可能不同
-            if not candidates:
-                for w in windows_list:
-                    if w['class'].lower() == 'weworkwindow' and w['visible']:
-                        candidates.append((w, 80))
-
-            # 策略3: WeWorkWindow类不管是否可见
-            if not candidates:
-                for w in windows_list:
-                    if w['class'].lower() == 'weworkwindow':
-                        candidates.append((w, 60))
-
-            if not candidates:
-                logger.error("❌ 未找到 WeWorkWindow 窗口")
-                return None
-
-            # 选择优先级最高的窗口
-            best_window, priority = max(candidates, key=lambda x: x[1])
-            hwnd = best_window['hwnd']
-
-            # 5. 验证窗口有效性
-            if not win32gui.IsWindow(hwnd):
-                logger.error("❌ 窗口句柄无效")
+            found = find_wxwork_main_window(self.process_names)
+            if not found:
+                logger.error("❌ 未找到企业微信进程或 WeWorkWindow 窗口")
                 return None
 
-            logger.info(f"✅ 找到企业微信窗口: '{best_window['title']}' (句柄: {hwnd})")
-            return hwnd
+            process, window = found
+            logger.info(f"✅ 找到企业微信窗口: '{window.title}' (句柄: {window.hwnd}, "
+                        f"PID: {process.pid}, 内存: {process.memory_mb:.1f}MB)")
+            return window.hwnd
 
         except Exception as e:
             logger.error(f"❌ 查找企业微信窗口失败: {e}")
@@ -187,6 +111,7 @@ class WXWorkSenderRobust:
             logger.error(f"❌ 激活窗口失败: {e}")
             return False
 
+    @holds_desktop_lock("wxwork_robust")
     def send_message(self, message: str, target_group: str = None) -> bool:
         """发送消息 - 完全重新检测版本"""
         try:
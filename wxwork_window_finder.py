@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+企业微信主窗口查找器
+版本：v1.0.0
+创建日期：2026-10-19
+功能：把各版本企业微信发送器（wxwork_sender / _robust / _fixed / _backup / simple_wxwork_fix）中的
+      主窗口选择逻辑统一为可插拔的打分策略，在同一份窗口场景（共享进程/窗口索引的一次读取，或录制的窗口列表）上运行；
+      按本机历史上"成功率高、耗时短"的程度自适应调整策略顺序；并提供对录制场景的准确率/耗时基准
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from desktop_snapshot import DEFAULT_MAX_AGE, ProcessInfo, WindowInfo, get_desktop_snapshot
+
+logger = logging.getLogger(__name__)
+
+WXWORK_PROCESS_NAMES = ["WXWork.exe", "wxwork.exe"]
+WXWORK_MAIN_CLASS = "WeWorkWindow"
+WXWORK_MAIN_TITLE = "企业微信"
+DEFAULT_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wxwork_finder_stats.json")
+# 已登录主窗口的最小（还原）尺寸，登录/扫码窗口和各类小弹窗都比它小
+MIN_MAIN_WINDOW_SIZE = (600, 400)
+
+Rect = Tuple[int, int, int, int]
+
+
+class WindowScene:
+    """一次查找所面对的窗口场景：名称匹配的进程（按内存从大到小）及其顶层窗口"""
+
+    def __init__(self, processes: List[ProcessInfo], windows: List[WindowInfo],
+                 rects: Optional[Dict[int, Rect]] = None, name: str = "live"):
+        self.name = name
+        self.processes = sorted(processes, key=lambda p: -p.memory_mb)
+        rank = {p.pid: index for index, p in enumerate(self.processes)}
+        self.windows = sorted((w for w in windows if w.pid in rank), key=lambda w: rank[w.pid])
+        self._process_by_pid = {p.pid: p for p in self.processes}
+        self._rects: Dict[int, Rect] = dict(rects or {})
+        self._live = rects is None
+
+    @classmethod
+    def capture(cls, process_names: Sequence[str] = WXWORK_PROCESS_NAMES,
+                max_age: float = DEFAULT_MAX_AGE) -> "WindowScene":
+        """从共享进程/窗口索引读取当前场景（标题和可见性为最新值，窗口矩形按需读取）"""
+        snapshot = get_desktop_snapshot(max_age)
+        processes = snapshot.find_processes(process_names)
+        windows: List[WindowInfo] = []
+        for process in processes:
+            windows.extend(snapshot.windows_for_pid(process.pid))
+        return cls(processes, windows)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WindowScene":
+        processes = [ProcessInfo(**item) for item in data.get("processes", [])]
+        windows, rects = [], {}
+        for item in data.get("windows", []):
+            item = dict(item)
+            rect = item.pop("rect", None)
+            window = WindowInfo(**item)
+            windows.append(window)
+            rects[window.hwnd] = tuple(rect) if rect else (0, 0, 0, 0)
+        return cls(processes, windows, rects, name=data.get("name", "recorded"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        windows = []
+        for window in self.windows:
+            item = asdict(window)
+            item["rect"] = list(self.rect(window.hwnd))
+            windows.append(item)
+        return {
+            "name": self.name,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "processes": [asdict(p) for p in self.processes],
+            "windows": windows,
+        }
+
+    def process(self, pid: int) -> Optional[ProcessInfo]:
+        return self._process_by_pid.get(pid)
+
+    def rect(self, hwnd: int) -> Rect:
+        """窗口的还原矩形（最小化时也是正常尺寸）；实时场景下首次访问时才读取，无法读取时为 (0, 0, 0, 0)"""
+        if hwnd not in self._rects:
+            rect = (0, 0, 0, 0)
+            if self._live:
+                try:
+                    import win32gui
+                    rect = tuple(win32gui.GetWindowPlacement(hwnd)[4])
+                except Exception:
+                    pass
+            self._rects[hwnd] = rect
+        return self._rects[hwnd]
+
+    def size(self, hwnd: int) -> Tuple[int, int]:
+        left, top, right, bottom = self.rect(hwnd)
+        return max(0, right - left), max(0, bottom - top)
+
+    def area(self, hwnd: int) -> int:
+        width, height = self.size(hwnd)
+        return width * height
+
+    def main_pid(self) -> Optional[int]:
+        """主进程：拥有 WeWorkWindow 的进程中内存最大的一个"""
+        return next((w.pid for w in self.windows if _is_main_class(w)), None)
+
+
+# 打分函数：返回 None 表示窗口不是该策略的候选，否则分数越高越优先（同分时按场景顺序取靠前者）
+Scorer = Callable[[WindowInfo, WindowScene], Optional[float]]
+
+
+@dataclass
+class WindowStrategy:
+    name: str
+    description: str
+    scorer: Scorer
+
+    def pick(self, scene: WindowScene) -> Optional[WindowInfo]:
+        best, best_score = None, None
+        for window in scene.windows:
+            score = self.scorer(window, scene)
+            if score is not None and (best_score is None or score > best_score):
+                best, best_score = window, score
+        return best
+
+
+def _is_main_class(window: WindowInfo) -> bool:
+    return window.class_name.lower() == WXWORK_MAIN_CLASS.lower()
+
+
+def _score_standard(window: WindowInfo, scene: WindowScene) -> Optional[float]:
+    # wxwork_sender_fixed 策略1 / wxwork_sender_backup：WeWorkWindow + 标题"企业微信" + 可见
+    if _is_main_class(window) and window.title == WXWORK_MAIN_TITLE and window.visible:
+        return 1.0
+    return None
+
+
+def _score_main_process(window: WindowInfo, scene: WindowScene) -> Optional[float]:
+    # wxwork_sender / wxwork_sender_robust / simple_wxwork_fix：内存最大且拥有 WeWorkWindow 的进程中，
+    # 可见 +20、标题为"企业微信" +10、标题非空 +2
+    if not _is_main_class(window) or window.pid != scene.main_pid():
+        return None
+    return ((20 if window.visible else 0) + (10 if window.title == WXWORK_MAIN_TITLE else 0)
+            + (2 if window.title.strip() else 0))
+
+
+def _score_main_class(window: WindowInfo, scene: WindowScene) -> Optional[float]:
+    # wxwork_sender_fixed 策略2：任意进程的 WeWorkWindow，可见且有标题的优先
+    if not _is_main_class(window):
+        return None
+    return 1.0 if window.visible and window.title.strip() else 0.0
+
+
+def _score_largest_visible(window: WindowInfo, scene: WindowScene) -> Optional[float]:
+    # wxwork_sender_fixed 旧策略3：面积最大的可见有标题窗口
+    if not (window.visible and window.title.strip()):
+        return None
+    return float(scene.area(window.hwnd))
+
+
+def _score_first_titled(window: WindowInfo, scene: WindowScene) -> Optional[float]:
+    # wxwork_sender_backup 旧备选方案：第一个有标题的窗口
+    return 0.0 if window.title.strip() else None
+
+
+DEFAULT_STRATEGIES: List[WindowStrategy] = [
+    WindowStrategy("standard", "WeWorkWindow + 标题企业微信 + 可见", _score_standard),
+    WindowStrategy("main_process", "主进程中打分最高的 WeWorkWindow", _score_main_process),
+    WindowStrategy("main_class", "任意进程的 WeWorkWindow", _score_main_class),
+]
+
+# 旧版本的兜底规则：选不出 WeWorkWindow 时才会用到，而此时结果必然通不过 accept_main_window，
+# 因此不参与实际查找，只在 benchmark 中作为对照
+LEGACY_STRATEGIES: List[WindowStrategy] = [
+    WindowStrategy("largest_visible", "面积最大的可见窗口", _score_largest_visible),
+    WindowStrategy("first_titled", "第一个有标题的窗口", _score_first_titled),
+]
+
+
+def accept_main_window(window: WindowInfo, scene: WindowScene) -> bool:
+    """
+    默认的结果验证：WeWorkWindow 类窗口、属于主进程，且（还原）尺寸不小于已登录主窗口
+    （尺寸未知时不检查）。登录窗口、其他进程中的同类窗口都判为失败，计入策略的失败统计
+    """
+    if not _is_main_class(window) or window.pid != scene.main_pid():
+        return False
+    width, height = scene.size(window.hwnd)
+    if width == 0 and height == 0:
+        return True
+    return width >= MIN_MAIN_WINDOW_SIZE[0] and height >= MIN_MAIN_WINDOW_SIZE[1]
+
+
+class StrategyStats:
+    """各策略在本机上的历史表现（尝试次数、成功次数、累计耗时），保存为 JSON"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_STATS_PATH, save_interval: float = 60.0):
+        """
+        Args:
+            path: 统计文件路径，None 表示只在内存中统计
+            save_interval: maybe_save 两次写盘的最小间隔（秒），查找热路径上不逐次写盘
+        """
+        self.path = path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = float("-inf")
+        self.data: Dict[str, Dict[str, float]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取窗口查找统计失败，重新统计: {e}")
+
+    def record(self, name: str, success: bool, seconds: float) -> None:
+        with self._lock:
+            entry = self.data.setdefault(name, {"attempts": 0, "successes": 0, "seconds": 0.0})
+            entry["attempts"] += 1
+            entry["successes"] += 1 if success else 0
+            entry["seconds"] += seconds
+            self._dirty = True
+
+    def expected_cost(self, name: str) -> float:
+        """期望的"找到正确窗口所需时间"：平均耗时 / 成功率（成功率做拉普拉斯平滑；调用方保证已有记录）"""
+        entry = self.data[name]
+        attempts = entry["attempts"]
+        rate = (entry["successes"] + 1) / (attempts + 2)
+        return (entry["seconds"] / attempts) / rate
+
+    def maybe_save(self) -> None:
+        """距上次写盘超过 save_interval 且有新记录时才写盘"""
+        if self._dirty and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self.data, ensure_ascii=False, indent=2)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"保存窗口查找统计失败: {e}")
+
+
+@dataclass
+class FinderResult:
+    window: WindowInfo
+    process: Optional[ProcessInfo]
+    strategy: str
+    seconds: float
+    tried: List[str] = field(default_factory=list)
+
+
+class WXWorkWindowFinder:
+    """按自适应顺序依次运行各策略，第一个通过验证的结果即为主窗口"""
+
+    def __init__(self, strategies: Optional[List[WindowStrategy]] = None, stats: Optional[StrategyStats] = None,
+                 adaptive: bool = True, min_attempts: int = 3,
+                 accept: Callable[[WindowInfo, WindowScene], bool] = accept_main_window):
+        """
+        Args:
+            strategies: 策略列表（默认 DEFAULT_STRATEGIES，列表顺序即冷启动顺序）
+            stats: 历史统计，None 表示不记录
+            adaptive: 是否按历史统计调整顺序
+            min_attempts: 策略至少有这么多次记录后才参与重排，之前保持默认位置
+            accept: 结果验证函数
+        """
+        self.strategies = list(strategies or DEFAULT_STRATEGIES)
+        self.stats = stats
+        self.adaptive = adaptive
+        self.min_attempts = min_attempts
+        self.accept = accept
+
+    def order(self) -> List[WindowStrategy]:
+        if not self.adaptive or self.stats is None:
+            return list(self.strategies)
+
+        def key(item: Tuple[int, WindowStrategy]):
+            index, strategy = item
+            entry = self.stats.data.get(strategy.name)
+            if not entry or entry["attempts"] < self.min_attempts:
+                return (1, index, 0.0)  # 数据不足的策略排在有数据的策略之后，保持默认相对顺序
+            return (0, self.stats.expected_cost(strategy.name), index)
+
+        return [strategy for _, strategy in sorted(enumerate(self.strategies), key=key)]
+
+    def find_in_scene(self, scene: WindowScene, record: bool = True) -> Optional[FinderResult]:
+        """在给定场景中查找主窗口，record 为 True 时把每个被尝试策略的成败和耗时计入统计"""
+        started = time.perf_counter()
+        tried: List[str] = []
+        result = None
+        for strategy in self.order():
+            strategy_started = time.perf_counter()
+            window = strategy.pick(scene)
+            success = window is not None and self.accept(window, scene)
+            elapsed = time.perf_counter() - strategy_started
+            tried.append(strategy.name)
+            if record and self.stats is not None:
+                self.stats.record(strategy.name, success, elapsed)
+            if success:
+                result = FinderResult(window, scene.process(window.pid), strategy.name,
+                                      time.perf_counter() - started, tried)
+                break
+        if record and self.stats is not None:
+            self.stats.maybe_save()
+        return result
+
+    def find(self, process_names: Sequence[str] = WXWORK_PROCESS_NAMES,
+             max_age: float = DEFAULT_MAX_AGE) -> Optional[FinderResult]:
+        """在当前桌面上查找企业微信主窗口"""
+        scene = WindowScene.capture(process_names, max_age)
+        if not scene.windows:
+            return None
+        result = self.find_in_scene(scene)
+        if result:
+            logger.info(f"🪟 窗口查找策略 {result.strategy} 命中（依次尝试 {', '.join(result.tried)}，"
+                        f"{result.seconds * 1000:.1f}ms）")
+        return result
+
+
+_finder: Optional[WXWorkWindowFinder] = None
+_finder_lock = threading.Lock()
+
+
+def get_window_finder() -> WXWorkWindowFinder:
+    """进程内共享的查找器（统计保存在 wxwork_finder_stats.json）"""
+    global _finder
+    with _finder_lock:
+        if _finder is None:
+            _finder = WXWorkWindowFinder(stats=StrategyStats())
+            # 节流后最近的记录可能还没写盘，退出时补写
+            atexit.register(_finder.stats.save)
+        return _finder
+
+
+def find_wxwork_main_window(process_names: Sequence[str] = WXWORK_PROCESS_NAMES,
+                            max_age: float = DEFAULT_MAX_AGE) -> Optional[Tuple[ProcessInfo, WindowInfo]]:
+    """
+    查找企业微信主窗口
+
+    Returns:
+        Optional[Tuple[ProcessInfo, WindowInfo]]: (主窗口所属进程, 主窗口)
+    """
+    result = get_window_finder().find(process_names, max_age)
+    if result is None or result.process is None:
+        return None
+    return result.process, result.window
+
+
+def load_scenes(paths: Sequence[str]) -> List[Tuple[WindowScene, Optional[int]]]:
+    """读取录制的场景文件，返回 (场景, 期望的主窗口句柄)"""
+    scenes = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for item in data if isinstance(data, list) else [data]:
+            scenes.append((WindowScene.from_dict(item), item.get("expected_hwnd")))
+    return scenes
+
+
+def benchmark(scenes: List[Tuple[WindowScene, Optional[int]]], strategies: Optional[List[WindowStrategy]] = None,
+              repeat: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    在录制的场景上逐个评估策略
+
+    Returns:
+        Dict[str, Dict[str, Any]]: {策略名: {correct, picked, scenes, mean_ms}}，
+        correct 为选中期望窗口的场景数，picked 为给出结果的场景数
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    labelled = [(scene, expected) for scene, expected in scenes if expected is not None]
+    for strategy in strategies or DEFAULT_STRATEGIES + LEGACY_STRATEGIES:
+        correct = picked = 0
+        elapsed = 0.0
+        for scene, expected in labelled:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                window = strategy.pick(scene)
+            elapsed += time.perf_counter() - started
+            if window is not None:
+                picked += 1
+                correct += 1 if window.hwnd == expected else 0
+        runs = max(1, len(labelled) * repeat)
+        report[strategy.name] = {
+            "correct": correct,
+            "picked": picked,
+            "scenes": len(labelled),
+            "mean_ms": round(elapsed / runs * 1000, 4),
+        }
+    return report
+
+
+def main():
+    """命令行入口：find / record / benchmark / stats"""
+    from logging_setup import setup_logging
+
+    parser = argparse.ArgumentParser(description="企业微信主窗口查找器")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("find", help="在当前桌面上查找主窗口")
+    record = sub.add_parser("record", help="把当前窗口场景录制为 JSON（用于基准）")
+    record.add_argument("path")
+    record.add_argument("--expected", type=int, help="正确的主窗口句柄（默认取查找结果）")
+    bench = sub.add_parser("benchmark", help="在录制的场景上评估各策略的准确率和耗时")
+    bench.add_argument("paths", nargs="+")
+    bench.add_argument("--repeat", type=int, default=20)
+    sub.add_parser("stats", help="查看本机的策略统计和当前顺序")
+    args = parser.parse_args()
+
+    setup_logging()
+    finder = get_window_finder()
+    if args.command == "find":
+        result = finder.find(max_age=0)
+        if result:
+            print(f"主窗口: {result.window.hwnd} '{result.window.title}' (PID {result.window.pid})，"
+                  f"策略 {result.strategy}，尝试 {result.tried}，{result.seconds * 1000:.2f}ms")
+        else:
+            print("未找到企业微信主窗口")
+    elif args.command == "record":
+        scene = WindowScene.capture(max_age=0)
+        data = scene.to_dict()
+        expected = args.expected
+        if expected is None:
+            result = finder.find_in_scene(scene, record=False)
+            expected = result.window.hwnd if result else None
+        data["expected_hwnd"] = expected
+        with open(args.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"已录制 {len(scene.windows)} 个窗口到 {args.path}（期望主窗口 {expected}）")
+    elif args.command == "benchmark":
+        report = benchmark(load_scenes(args.paths), repeat=args.repeat)
+        print(f"{'策略':<18}{'正确':>6}{'有结果':>8}{'场景':>6}{'平均耗时(ms)':>14}")
+        for name, row in report.items():
+            print(f"{name:<18}{row['correct']:>6}{row['picked']:>8}{row['scenes']:>6}{row['mean_ms']:>14}")
+    elif args.command == "stats":
+        for strategy in finder.order():
+            entry = finder.stats.data.get(strategy.name)
+            if entry:
+                print(f"{strategy.name:<18} 尝试 {entry['attempts']:>5} 成功 {entry['successes']:>5} "
+                      f"平均 {entry['seconds'] / entry['attempts'] * 1000:.3f}ms")
+            else:
+                print(f"{strategy.name:<18} 无记录")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()